@@ -0,0 +1,62 @@
+"""
+Headless problem engine for the 7th grade practice app.
+
+Nothing in here imports Streamlit, so the generators and the answer checker
+can be used from the web app, a command line script, a worker process or a
+test.
+
+Only the problem engine itself is imported here. The app's session pieces
+(math_core.prefetch, .textcache, .store, .events, .adaptive, .review) start
+threads or pull in heavier modules, so import them from their modules when
+they are needed. NoRepeat (which needs hashlib) is still importable from
+here, but is only loaded the first time it is asked for.
+"""
+
+from math_core.checking import AnswerRule, canonical_answer, check_answer, parse_polynomial, parse_quantity
+from math_core.generators import (
+    GENERATOR_SETS,
+    format_answer_string,
+    generate_new_problem,
+    gen_distribute_combine,
+    gen_distribute_negative,
+    gen_multi_distribute,
+    gen_fraction_simplify,
+    gen_fraction_simplify_mixed,
+    gen_multi_variable_combine,
+    gen_linear_eq,
+    gen_fraction_eq,
+    gen_distribute_eq,
+    gen_unit_rate_basic,
+    gen_unit_rate_reverse,
+    gen_equivalent_ratios,
+    gen_comparing_rates,
+    gen_ratio_fractions,
+    gen_solving_proportions,
+    gen_constant_proportionality,
+    gen_proportional_graph,
+    gen_unit_rate,
+    gen_rectangle_area,
+    gen_triangle_area,
+    gen_perimeter,
+    gen_circle_area,
+    gen_geometry,
+    gen_basic_percentage,
+    gen_percentage_increase,
+    gen_percentage_decrease,
+    gen_find_percentage,
+    gen_percent_decimal_fraction,
+    gen_percent_as_proportion,
+    gen_percent_of_change,
+    gen_percentage,
+)
+from math_core.problem import Problem
+from math_core.registry import Topic, get_topic, register
+from math_core.rng import make_rng, new_seed, session_rng
+from math_core.text import LazyText, StaticText
+
+
+def __getattr__(name):
+    if name == 'NoRepeat':
+        from math_core.norepeat import NoRepeat
+        return NoRepeat
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
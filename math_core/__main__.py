@@ -0,0 +1,57 @@
+"""
+Command line tools for the problem engine.
+
+    python -m math_core build-bank --count 1000000
+    python -m math_core bench --save bench.json
+    python -m math_core compact
+    python -m math_core grade answers.csv -o graded.csv
+    python -m math_core loadtest --sessions 20 --save load.json
+    python -m math_core selfcheck --count 1000000
+    python -m math_core serve --port 8000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from math_core import analytics, api, bank, bench, grading, loadtest, selfcheck
+from math_core.generators import PROBLEM_TYPES
+from math_core.rng import session_rng
+
+
+def build_bank_command(args):
+    os.makedirs(args.out, exist_ok=True)
+    rng = session_rng(args.seed)
+    for problem_type in args.types:
+        start = time.perf_counter()
+        path = bank.bank_path(problem_type, args.out)
+        n_strings = bank.build_bank(problem_type, args.count, path, rng)
+        print(f"{problem_type}: {args.count} problems, {n_strings} distinct strings, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m math_core')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build-bank', help="generate precomputed problem banks")
+    build.add_argument('--count', type=int, default=1_000_000, help="problems per problem_type")
+    build.add_argument('--types', nargs='+', default=PROBLEM_TYPES, choices=PROBLEM_TYPES)
+    build.add_argument('--out', default=bank.BANK_DIR, help="output directory")
+    build.add_argument('--seed', type=int, help="seed for the problem seeds, to rebuild the same banks")
+    build.set_defaults(func=build_bank_command)
+
+    analytics.add_parser(commands)
+    api.add_parser(commands)
+    bench.add_parser(commands)
+    grading.add_parser(commands)
+    loadtest.add_parser(commands)
+    selfcheck.add_parser(commands)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Adaptive topic picks for Mixed Practice.
+
+A plain Mixed Practice pick ignores how the student is doing. AdaptiveMix
+weights each problem_type by
+
+    topic weight  x  (FLOOR + recent error rate)  x  recency
+
+so topics the student keeps missing come up more, mastered ones still come
+up now and then, and a topic that was just picked waits a few problems
+before it's likely again. The error rate is a running average over the
+student's answers in that topic (PRIOR_ERROR before the first one);
+recency steps back up to 1 as the number of picks since the topic was last
+picked passes each limit in RECENCY.
+
+The weights live in a Fenwick tree, so a pick and the weight change after
+an answer are O(log n) in the number of topics: a pick only changes the
+picked topic's weight and those of the few topics that just moved to the
+next recency step. That keeps it cheap with hundreds of topic-pack types.
+The state is saved with the rest of the student's progress (to_dict /
+from_dict); the tree is rebuilt from it on the first pick.
+"""
+
+import collections
+
+from math_core.registry import mixed_types, topics_version
+
+FLOOR = 0.2
+PRIOR_ERROR = 0.5
+ERROR_SMOOTHING = 0.3
+# (picks since last picked, weight factor up to there); 1.0 after the last limit
+RECENCY = ((2, 0.1), (5, 0.4), (10, 0.7))
+# Rebuild the tree from the weights this often so float error can't build up
+REBUILD_EVERY = 10_000
+
+
+class FenwickTree:
+    """Non-negative weights with O(log n) update and weighted pick."""
+
+    def __init__(self, weights):
+        self.weights = [float(w) for w in weights]
+        self.n = len(self.weights)
+        self._tree = [0.0] * (self.n + 1)
+        for i, weight in enumerate(self.weights, 1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self._tree[parent] += self._tree[i]
+        self.total = sum(self.weights)
+        self._top = 1 << (self.n.bit_length() - 1) if self.n else 0
+
+    def __len__(self):
+        return self.n
+
+    def set(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i <= self.n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, value):
+        """The index where the running total of weights passes value (0 <= value < total)."""
+        pos = 0
+        step = self._top
+        tree = self._tree
+        while step:
+            next_pos = pos + step
+            if next_pos <= self.n and tree[next_pos] <= value:
+                pos = next_pos
+                value -= tree[next_pos]
+            step >>= 1
+        return min(pos, self.n - 1)
+
+    def pick(self, rng):
+        return self.find(rng.random() * self.total)
+
+
+def _recency(age):
+    for limit, factor in RECENCY:
+        if age <= limit:
+            return factor
+    return 1.0
+
+
+class AdaptiveMix:
+    """One student's Mixed Practice picks, weighted by errors and recency."""
+
+    def __init__(self):
+        self.errors = {}
+        self.last_pick = {}
+        self.picks = 0
+        self._recent = collections.deque(maxlen=RECENCY[-1][0] + 1)
+        self._version = None
+        self._updates = 0
+
+    def _sync(self):
+        # Topic packs load lazily, so the topic list can change under us
+        version = topics_version()
+        if version != self._version:
+            self._types, self._base = mixed_types()
+            self._index = {problem_type: i for i, problem_type in enumerate(self._types)}
+            self._rebuild()
+            self._version = version
+
+    def _rebuild(self):
+        self._tree = FenwickTree(self.weight(problem_type) for problem_type in self._types)
+        self._updates = 0
+
+    def weight(self, problem_type):
+        """problem_type's current pick weight."""
+        i = self._index.get(problem_type)
+        if i is None:
+            return 0.0
+        last = self.last_pick.get(problem_type)
+        recency = 1.0 if last is None else _recency(self.picks - last)
+        return self._base[i] * (FLOOR + self.errors.get(problem_type, PRIOR_ERROR)) * recency
+
+    def _update(self, problem_type):
+        i = self._index.get(problem_type)
+        if i is None:
+            return
+        self._updates += 1
+        if self._updates >= REBUILD_EVERY:
+            self._rebuild()
+        else:
+            self._tree.set(i, self.weight(problem_type))
+
+    def pick(self, rng):
+        """Pick a problem_type for Mixed Practice."""
+        self._sync()
+        problem_type = self._types[self._tree.pick(rng)]
+        self.last_pick[problem_type] = self.picks
+        self.picks += 1
+        self._recent.append(problem_type)
+        self._update(problem_type)
+        # Topics picked limit picks before this one just moved to the next recency step
+        recent = self._recent
+        for limit, _ in RECENCY:
+            if len(recent) > limit:
+                self._update(recent[-(limit + 1)])
+        return problem_type
+
+    def record(self, problem_type, correct):
+        """Fold one answer into problem_type's error rate."""
+        error = self.errors.get(problem_type, PRIOR_ERROR)
+        self.errors[problem_type] = error + ERROR_SMOOTHING * ((0.0 if correct else 1.0) - error)
+        if self._version is not None:
+            self._update(problem_type)
+
+    def to_dict(self):
+        """JSON-ready state, saved with the student's progress."""
+        # Copies: a write-behind store serializes this later, while the mix keeps changing
+        return {'errors': dict(self.errors), 'last_pick': dict(self.last_pick), 'picks': self.picks,
+                'recent': list(self._recent)}
+
+    @classmethod
+    def from_dict(cls, state):
+        mix = cls()
+        if state:
+            mix.errors = dict(state['errors'])
+            mix.last_pick = dict(state['last_pick'])
+            mix.picks = state['picks']
+            mix._recent.extend(state['recent'])
+        return mix
@@ -0,0 +1,332 @@
+"""
+Attempt history as Parquet, and per-student, per-topic counters over it.
+
+The event log (math_core.events) writes JSON lines as students work. A
+compaction run first finishes the .jsonl.part files that crashed processes
+left behind (events.finalize_leftovers), then takes the event files that are
+finished and not compacted yet and:
+
+    - writes them as Parquet, partitioned by day:
+          <MATH_ANALYTICS_DIR>/attempts/date=2026-10-17/<event file>.parquet
+    - adds them to running counters per (student, problem_type) in
+          <MATH_ANALYTICS_DIR>/counters.parquet
+
+The counters are attempts, correct answers, hints and show-steps used on
+submitted problems, skips, and the time from a problem being shown to its
+first answer. Only the new events are read, so a run costs the same however
+long the history is, and reports read the small counters file instead of
+the history. How far into each writer's files the counters go (the highest
+file number n compacted per "<start time>-<host>-<pid>" writer), and which problems
+are on screen waiting for an answer, is kept in the counters file's
+metadata, so the two can't disagree after a crash. Writers with no files
+left in the event directory are dropped from it, so it stays the size of
+the directory, not of the history. A rerun after a crash rewrites the same
+Parquet files instead of adding copies.
+
+    python -m math_core compact
+    python -m math_core report --student 3f2a...
+
+Needs pyarrow (which Streamlit installs).
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+from math_core.events import EVENT_DIR, finalize_leftovers, parse_name
+
+ANALYTICS_DIR = os.environ.get(
+    'MATH_ANALYTICS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'analytics')
+)
+
+COUNTERS = ('attempts', 'correct', 'hints', 'steps', 'skips', 'timed', 'seconds')
+ATTEMPT_COLUMNS = ('t', 'event', 'student', 'problem_type', 'seed', 'answer', 'correct',
+                   'mistake', 'hints', 'steps', 'level', 'choice')
+
+
+def _attempt_schema(pa):
+    return pa.schema([
+        ('t', pa.timestamp('ms', tz='UTC')),
+        ('event', pa.string()),
+        ('student', pa.string()),
+        ('problem_type', pa.string()),
+        ('seed', pa.uint64()),
+        ('answer', pa.string()),
+        ('correct', pa.bool_()),
+        ('mistake', pa.string()),
+        ('hints', pa.int16()),
+        ('steps', pa.bool_()),
+        ('level', pa.int16()),
+        ('choice', pa.string()),
+    ])
+
+
+def _counter_schema(pa):
+    return pa.schema(
+        [('student', pa.string()), ('problem_type', pa.string())]
+        + [(name, pa.float64() if name == 'seconds' else pa.int64()) for name in COUNTERS]
+    )
+
+
+# ============================================================================
+# COUNTERS
+# ============================================================================
+
+def read_counters(out_dir=ANALYTICS_DIR):
+    """({(student, problem_type): [counters...]}, {writer: last file compacted}, shown problems)."""
+    import pyarrow.parquet as pq
+
+    path = os.path.join(out_dir, 'counters.parquet')
+    if not os.path.exists(path):
+        return {}, {}, {}
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    columns = table.to_pydict()
+    counters = {
+        key: list(values)
+        for key, values in zip(zip(columns['student'], columns['problem_type']),
+                               zip(*(columns[name] for name in COUNTERS)))
+    }
+    compacted = json.loads(metadata.get(b'compacted', b'{}'))
+    if isinstance(compacted, list):
+        # Older counters listed every compacted file name
+        names, compacted = compacted, {}
+        for name in names:
+            writer, n, _, _, _ = parse_name(name)
+            compacted[writer] = max(compacted.get(writer, 0), n)
+    shown = json.loads(metadata.get(b'shown', b'{}'))
+    return counters, compacted, shown
+
+
+def _write_counters(out_dir, counters, compacted, shown):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    keys = sorted(counters)
+    columns = {'student': [student for student, _ in keys], 'problem_type': [t for _, t in keys]}
+    for i, name in enumerate(COUNTERS):
+        columns[name] = [counters[key][i] for key in keys]
+    schema = _counter_schema(pa).with_metadata({
+        'compacted': json.dumps(compacted, sort_keys=True),
+        'shown': json.dumps(shown),
+    })
+    path = os.path.join(out_dir, 'counters.parquet')
+    pq.write_table(pa.Table.from_pydict(columns, schema=schema), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def count_events(events, counters, shown):
+    """Add events (dicts, in time order) to counters; shown tracks problems awaiting an answer."""
+    for event in events:
+        student = event['student']
+        kind = event['event']
+        if kind == 'show':
+            shown[student] = [event['seed'], event['t']]
+            continue
+        if kind not in ('submit', 'skip'):
+            continue
+        row = counters.get((student, event['problem_type']))
+        if row is None:
+            row = counters[(student, event['problem_type'])] = [0] * (len(COUNTERS) - 1) + [0.0]
+        on_screen = shown.pop(student, None)
+        if kind == 'skip':
+            row[4] += 1
+            continue
+        row[0] += 1
+        row[1] += bool(event.get('correct'))
+        row[2] += event.get('hints') or 0
+        row[3] += bool(event.get('steps'))
+        # Time to answer counts from the problem showing up to its first answer
+        if on_screen is not None and on_screen[0] == event['seed']:
+            row[5] += 1
+            row[6] += event['t'] - on_screen[1]
+
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def _read_events(path):
+    events = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # The last line of a file whose writer crashed or failed mid-write
+                continue
+    return events
+
+
+def _write_attempts(out_dir, name, events):
+    """Write one event file's events as Parquet, one file per day."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _attempt_schema(pa)
+    days = {}
+    for event in events:
+        day = time.strftime('%Y-%m-%d', time.gmtime(event['t']))
+        days.setdefault(day, []).append(event)
+    for day, day_events in days.items():
+        columns = {column: [event.get(column) for event in day_events] for column in ATTEMPT_COLUMNS}
+        columns['t'] = [round(t * 1000) for t in columns['t']]
+        directory = os.path.join(out_dir, 'attempts', f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name + '.parquet')
+        pq.write_table(pa.Table.from_pydict(columns, schema=schema), path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+
+def compact(event_dir=EVENT_DIR, out_dir=ANALYTICS_DIR):
+    """Compact finished event files not compacted yet; returns (files, events) compacted."""
+    os.makedirs(out_dir, exist_ok=True)
+    # Events in files a crashed process never finished count like any others
+    finalize_leftovers(event_dir)
+    counters, compacted, shown = read_counters(out_dir)
+    present = set()
+    paths = []
+    for path in glob.glob(os.path.join(event_dir, 'events-*.jsonl*')):
+        try:
+            writer, n, _, _, _ = parse_name(path)
+        except ValueError:
+            continue
+        present.add(writer)
+        if path.endswith('.jsonl') and n > compacted.get(writer, 0):
+            paths.append((writer, n, path))
+    stale = compacted.keys() - present
+    if not paths and not stale:
+        return 0, 0
+    for writer in stale:
+        del compacted[writer]
+
+    events = []
+    for writer, n, path in sorted(paths):
+        file_events = _read_events(path)
+        _write_attempts(out_dir, os.path.basename(path)[:-len('.jsonl')], file_events)
+        events.extend(file_events)
+        compacted[writer] = n
+    # Files come from several processes, so put their events back in time order
+    events.sort(key=lambda event: event['t'])
+    count_events(events, counters, shown)
+    _write_counters(out_dir, counters, compacted, shown)
+    return len(paths), len(events)
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+def _summary(rows):
+    """Accuracy, hint use and answer time from summed counters."""
+    attempts, correct, hints, steps, skips, timed, seconds = rows
+    return {
+        'attempts': attempts,
+        'correct': correct,
+        'accuracy': correct / attempts if attempts else None,
+        'hints_per_attempt': hints / attempts if attempts else None,
+        'steps_rate': steps / attempts if attempts else None,
+        'skips': skips,
+        'seconds_to_answer': seconds / timed if timed else None,
+    }
+
+
+class Analytics:
+    """Reports from the compacted counters, reloaded when a compaction replaces them."""
+
+    def __init__(self, out_dir=ANALYTICS_DIR):
+        self.path = os.path.join(out_dir, 'counters.parquet')
+        self.out_dir = out_dir
+        self._mtime = None
+        self._by_student = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                counters, _, _ = read_counters(self.out_dir) if mtime else ({}, None, None)
+                by_student = {}
+                for (student, problem_type), row in counters.items():
+                    by_student.setdefault(student, {})[problem_type] = row
+                self._by_student = by_student
+                self._mtime = mtime
+            return self._by_student
+
+    def student(self, student_id):
+        """{problem_type: summary} for one student."""
+        return {problem_type: _summary(row) for problem_type, row in self._load().get(student_id, {}).items()}
+
+    def topics(self, students=None):
+        """{problem_type: summary} over students (a class roster), or over everyone."""
+        by_student = self._load()
+        totals = {}
+        for student in by_student if students is None else students:
+            for problem_type, row in by_student.get(student, {}).items():
+                total = totals.setdefault(problem_type, [0] * len(COUNTERS))
+                for i, value in enumerate(row):
+                    total[i] += value
+        return {problem_type: _summary(row) for problem_type, row in totals.items()}
+
+
+def attempts_dataset(out_dir=ANALYTICS_DIR):
+    """Every compacted event as a pyarrow dataset, partitioned by date, for ad-hoc queries."""
+    import pyarrow.dataset as ds
+
+    return ds.dataset(os.path.join(out_dir, 'attempts'), format='parquet', partitioning='hive')
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def compact_command(args):
+    start = time.perf_counter()
+    files, events = compact(args.events, args.out)
+    print(f"compacted {events:,} events from {files} files in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+    return 0
+
+
+def _number(value, width, spec):
+    return format(value, f">{width}{spec}") if value is not None else '-'.rjust(width)
+
+
+def _format_report(summaries):
+    lines = [f"{'problem_type':22} {'attempts':>8} {'accuracy':>8} {'hints':>6} {'steps':>6} {'skips':>6} {'secs':>6}"]
+    for problem_type, s in sorted(summaries.items()):
+        lines.append(f"{problem_type:22} {s['attempts']:>8} {_number(s['accuracy'], 8, '.0%')} "
+                     f"{_number(s['hints_per_attempt'], 6, '.2f')} {_number(s['steps_rate'], 6, '.0%')} "
+                     f"{s['skips']:>6} {_number(s['seconds_to_answer'], 6, '.1f')}")
+    return "\n".join(lines)
+
+
+def report_command(args):
+    analytics = Analytics(args.out)
+    if args.student and len(args.student) == 1:
+        summaries = analytics.student(args.student[0])
+    else:
+        summaries = analytics.topics(args.student)
+    print(_format_report(summaries))
+    return 0
+
+
+def add_parser(commands):
+    compact_parser = commands.add_parser('compact', help="compact event logs into Parquet and update the counters")
+    compact_parser.add_argument('--events', default=EVENT_DIR, help="event log directory")
+    compact_parser.add_argument('--out', default=ANALYTICS_DIR, help="analytics directory")
+    compact_parser.set_defaults(func=compact_command)
+
+    report = commands.add_parser('report', help="accuracy, hints and answer time per topic")
+    report.add_argument('--student', nargs='+', help="one student, or a class's students (default: everyone)")
+    report.add_argument('--out', default=ANALYTICS_DIR, help="analytics directory")
+    report.set_defaults(func=report_command)
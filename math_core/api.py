@@ -0,0 +1,231 @@
+"""
+JSON API over the problem engine, for clients that don't need the Streamlit app.
+
+A plain ASGI application (no web framework needed), so any ASGI server can
+run it:
+
+    uvicorn math_core.api:app --workers 4
+    python -m math_core serve --port 8000
+
+Endpoints:
+
+    GET  /problems?type=proportions&count=5
+         New problems as {"problems": [{"id", "problem_type", "label",
+         "expr", "hint_count"}]}. type can be left out (or "mixed") for a
+         Mixed Practice pick per problem; count is 1 to MAX_PROBLEMS.
+
+    POST /grade
+         One answer, {"problem_id": "proportions:123", "answer": "12"}, or
+         many, {"answers": [...]} (problem_type + seed work instead of
+         problem_id, as in worksheet grading). Returns {"correct",
+         "correct_answer", "error"} for each answer, as {"results": [...]}
+         for a batch.
+
+Responses always carry a Content-Length, so servers keep the connection
+alive between requests. Small requests (up to INLINE_PROBLEMS problems or
+INLINE_ANSWERS answers) are handled right on the event loop, which is faster
+than handing a few microseconds of work to another process; bigger ones go
+to a bounded process pool so one large batch doesn't hold up every other
+request.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs
+
+from math_core.generators import generate_new_problem
+from math_core.grading import grade_rows, problem_id
+from math_core.registry import get_topic, pick_mixed_type
+from math_core.rng import session_rng
+
+MAX_PROBLEMS = 100
+MAX_ANSWERS = 10_000
+MAX_BODY_BYTES = 4 * 1024 * 1024
+# Requests with more problems or answers than this go to the process pool,
+# so no request holds the event loop for much more than 0.1-0.2 ms
+INLINE_PROBLEMS = 5
+INLINE_ANSWERS = 50
+WORKERS = int(os.environ.get('MATH_API_WORKERS', 0)) or os.cpu_count() or 1
+
+_rng = session_rng()
+_pool = None
+_pool_slots = None
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ============================================================================
+# HANDLERS
+# ============================================================================
+
+def make_problems(problem_types):
+    """A JSON-ready dict for a new problem of each problem_type."""
+    problems = []
+    for problem_type in problem_types:
+        problem = generate_new_problem(problem_type)
+        problems.append({
+            'id': problem_id(problem),
+            'problem_type': problem.problem_type,
+            'label': problem.label,
+            'expr': problem.expr,
+            'hint_count': problem.text.hint_count,
+        })
+    return problems
+
+
+def grade_answers(rows):
+    """{"correct", "correct_answer", "error"} for each answer row, graded like a worksheet."""
+    return [
+        {'correct': row['correct'], 'correct_answer': row['correct_answer'], 'error': row['error']}
+        for row in grade_rows(rows, workers=1)
+    ]
+
+
+async def _offload(func, arg, inline):
+    """func(arg) on the event loop if inline is true, otherwise in the process pool."""
+    global _pool, _pool_slots
+    if inline:
+        return func(arg)
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        _pool_slots = asyncio.Semaphore(WORKERS * 2)
+    # Bounded: past a couple of queued jobs per worker, requests wait here
+    async with _pool_slots:
+        return await asyncio.get_running_loop().run_in_executor(_pool, func, arg)
+
+
+async def get_problems(query):
+    problem_type = query.get('type', ['mixed'])[0]
+    try:
+        count = int(query.get('count', ['1'])[0])
+    except ValueError:
+        raise HTTPError(400, "count must be a whole number")
+    if not 1 <= count <= MAX_PROBLEMS:
+        raise HTTPError(400, f"count must be between 1 and {MAX_PROBLEMS}")
+    if problem_type == 'mixed':
+        problem_types = [pick_mixed_type(_rng) for _ in range(count)]
+    elif get_topic(problem_type) is not None:
+        problem_types = [problem_type] * count
+    else:
+        raise HTTPError(404, f"unknown problem type: {problem_type}")
+    return {'problems': await _offload(make_problems, problem_types, count <= INLINE_PROBLEMS)}
+
+
+async def post_grade(body):
+    try:
+        request = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+    if not isinstance(request, dict):
+        raise HTTPError(400, "body must be a JSON object")
+    batch = 'answers' in request
+    rows = request['answers'] if batch else [request]
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPError(400, "answers must be a list of objects")
+    if len(rows) > MAX_ANSWERS:
+        raise HTTPError(400, f"at most {MAX_ANSWERS} answers per request")
+    results = await _offload(grade_answers, rows, len(rows) <= INLINE_ANSWERS)
+    return {'results': results} if batch else results[0]
+
+
+ROUTES = {
+    '/problems': ('GET', get_problems),
+    '/grade': ('POST', post_grade),
+}
+
+
+# ============================================================================
+# ASGI
+# ============================================================================
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _respond(send, status, document, headers=()):
+    body = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    global _pool
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _pool is not None:
+                _pool.shutdown(cancel_futures=True)
+                _pool = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        raise ValueError(f"unsupported ASGI scope type: {scope['type']}")
+
+    route = ROUTES.get(scope['path'])
+    try:
+        if route is None:
+            raise HTTPError(404, "not found")
+        method, handler = route
+        if scope['method'] != method:
+            await _respond(send, 405, {'error': f"use {method}"}, [(b'allow', method.encode('ascii'))])
+            return
+        if method == 'GET':
+            document = await handler(parse_qs(scope['query_string'].decode('latin-1')))
+        else:
+            document = await handler(await _read_body(receive))
+    except HTTPError as exc:
+        await _respond(send, exc.status, {'error': exc.message})
+        return
+    await _respond(send, 200, document)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def serve_command(args):
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("serve needs an ASGI server: pip install uvicorn")
+    uvicorn.run('math_core.api:app', host=args.host, port=args.port, workers=args.workers,
+                log_level='warning', access_log=False)
+    return 0
+
+
+def add_parser(commands):
+    serve = commands.add_parser('serve', help="serve the JSON API (needs uvicorn)")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--workers', type=int, default=1, help="server processes")
+    serve.set_defaults(func=serve_command)
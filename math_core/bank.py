@@ -0,0 +1,263 @@
+"""
+Precomputed problem banks.
+
+A bank is one file per problem_type holding millions of ready-made problems,
+so "New Problem" can hand out a stored problem instead of running a gen_*
+function. Files are memory-mapped and read in place: opening a bank costs a
+few syscalls no matter how big it is, and every worker process on the
+machine shares the same pages.
+
+File layout (all integers little-endian):
+
+    header    magic, version, problem count, string count, section offsets
+    offsets   uint64[string count + 1]  start of each string in the blob
+    blob      UTF-8 bytes of every distinct string, stored once
+    rows      one record per problem: expr, answer and label string ids,
+              start of its text ids, number of steps, number of hints and
+              the problem's 64-bit seed (low word, high word)
+    text ids  uint32 string ids: the steps of a problem, then its hints
+
+Step and hint text repeats a lot between problems, so the string table is
+deduplicated while building. Every row is generated from its own seed, so a
+banked problem can be rebuilt anywhere with generate_new_problem(type, seed).
+
+Build banks from the command line:
+
+    python -m math_core build-bank --count 1000000
+"""
+
+import functools
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from math_core.problem import Problem
+from math_core.rng import make_rng, new_seed
+
+BANK_DIR = os.environ.get(
+    'MATH_BANK_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'banks')
+)
+
+MAGIC = b'MPBANK\x00\x01'
+# 4: seeds rebuild through rng.ProblemRandom, so older banks' seeds give other problems
+# 5: gen_find_percentage has its own label, which picks its answer rule, and
+#    gen_fraction_simplify_mixed writes its answers as format_answer_string does
+VERSION = 5
+HEADER = struct.Struct('<8sIIQQQQQQ')
+ROW = struct.Struct('<8I')
+ROW_WORDS = 8
+SPAN = struct.Struct('<QQ')
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class ProblemBank:
+    """A memory-mapped bank of problems for one problem_type."""
+
+    def __init__(self, path, problem_type=None):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.count, self.string_count, self._offsets_pos,
+         self._blob_pos, self._rows_pos, self._ids_pos) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} problem bank")
+        self.path = path
+        self.problem_type = problem_type or os.path.splitext(os.path.basename(path))[0]
+        self._view = memoryview(self._mm)
+        self._rows = self._view[self._rows_pos:self._ids_pos].cast('I')
+        self._text_ids = self._view[self._ids_pos:].cast('I')
+        # Step and hint boilerplate is shared by most problems, so keep the
+        # decoded strings around instead of decoding them on every draw
+        self.string = functools.lru_cache(maxsize=65536)(self._read_string)
+
+
+    def __len__(self):
+        return self.count
+
+    def _read_string(self, string_id):
+        start, end = SPAN.unpack_from(self._mm, self._offsets_pos + 8 * string_id)
+        return self._mm[self._blob_pos + start:self._blob_pos + end].decode('utf-8')
+
+    def problem(self, index):
+        """Return problem number index as a Problem."""
+        row = index * ROW_WORDS
+        (expr_id, answer_id, label_id, text_start, n_steps, n_hints,
+         seed_low, seed_high) = self._rows[row:row + ROW_WORDS]
+        string = self.string
+        seed = seed_high << 32 | seed_low
+        text = BankText(self, text_start, n_steps, n_hints, seed)
+        return Problem(self.problem_type, string(expr_id), string(answer_id), text,
+                       string(label_id), seed)
+
+    def draw(self, rng=None):
+        """Return a problem picked with rng (the session's random stream), or None if the bank is empty.
+
+        The pick is one draw from rng, like a new seed for a live problem,
+        so a seeded session gets the same problems every time; NoRepeat
+        keeps a session from seeing one twice.
+        """
+        if not self.count:
+            return None
+        return self.problem(new_seed(rng) % self.count)
+
+    def close(self):
+        self._rows.release()
+        self._text_ids.release()
+        self._view.release()
+        self._mm.close()
+
+
+class BankText:
+    """Steps and hints of a banked problem, read from the bank when asked for."""
+
+    __slots__ = ('_bank', '_start', '_n_steps', '_n_hints', '_seed')
+
+    def __init__(self, problem_bank, start, n_steps, n_hints, seed):
+        self._bank = problem_bank
+        self._start = start
+        self._n_steps = n_steps
+        self._n_hints = n_hints
+        self._seed = seed
+
+    @property
+    def hint_count(self):
+        return self._n_hints
+
+    def hint(self, index):
+        if not 0 <= index < self._n_hints:
+            raise IndexError("hint index out of range")
+        return self._bank.string(self._bank._text_ids[self._start + self._n_steps + index])
+
+    def steps(self):
+        string = self._bank.string
+        return [string(i) for i in self._bank._text_ids[self._start:self._start + self._n_steps]]
+
+    def hints(self):
+        string = self._bank.string
+        hints_start = self._start + self._n_steps
+        return [string(i) for i in self._bank._text_ids[hints_start:hints_start + self._n_hints]]
+
+    def mistake(self, key):
+        # Banks store the rendered text only, so rebuild the problem from its
+        # seed for its mistake map; that only happens on a wrong answer
+        from math_core.generators import generate_live_problem
+
+        _, _, text, _ = generate_live_problem(self._bank.problem_type, make_rng(self._seed))
+        return text.mistake(key)
+
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def bank_path(problem_type, bank_dir=None):
+    return os.path.join(bank_dir or BANK_DIR, f"{problem_type}.bank")
+
+
+def get_bank(problem_type):
+    """Open (once per process) the bank for problem_type, or None if there isn't one."""
+    try:
+        return _banks[problem_type]
+    except KeyError:
+        pass
+    with _banks_lock:
+        if problem_type not in _banks:
+            path = bank_path(problem_type)
+            _banks[problem_type] = ProblemBank(path, problem_type) if os.path.exists(path) else None
+        return _banks[problem_type]
+
+
+def draw_problem(problem_type, rng=None):
+    """Draw a stored problem with rng, or None if there is no bank for problem_type."""
+    problem_bank = get_bank(problem_type)
+    if problem_bank is None:
+        return None
+    return problem_bank.draw(rng)
+
+
+# ============================================================================
+# BUILDING
+# ============================================================================
+
+# Problems made per math_core.batch call while building
+BATCH_SIZE = 10_000
+
+
+def iter_problems(problem_type, count, rng=None):
+    """Yield count freshly generated problems, each from a new seed drawn from rng.
+
+    Types math_core.batch covers are made a batch at a time when NumPy is
+    installed; the problems are the same either way.
+    """
+    from math_core.generators import generate_new_problem
+
+    try:
+        from math_core.batch import BATCH_TYPES, batch_problems
+    except ImportError:
+        # NumPy isn't installed
+        BATCH_TYPES = ()
+    if problem_type not in BATCH_TYPES:
+        for _ in range(count):
+            yield generate_new_problem(problem_type, seed=new_seed(rng))
+        return
+    for start in range(0, count, BATCH_SIZE):
+        seeds = [new_seed(rng) for _ in range(min(BATCH_SIZE, count - start))]
+        yield from batch_problems(problem_type, seeds)
+
+
+def build_bank(problem_type, count, path, rng=None):
+    """Generate count problems for problem_type and write them to a bank file."""
+    strings = {}
+    blob = bytearray()
+    offsets = array('Q', [0])
+    rows = bytearray()
+    text_ids = array('I')
+
+    def intern(text):
+        string_id = strings.get(text)
+        if string_id is None:
+            string_id = strings[text] = len(offsets) - 1
+            blob.extend(text.encode('utf-8'))
+            offsets.append(len(blob))
+        return string_id
+
+    for problem in iter_problems(problem_type, count, rng):
+        steps = problem.text.steps()
+        hints = problem.text.hints()
+        seed = problem.seed
+        rows += ROW.pack(intern(problem.expr), intern(problem.answer), intern(problem.label), len(text_ids),
+                         len(steps), len(hints), seed & 0xFFFFFFFF, seed >> 32)
+        text_ids.extend(intern(step) for step in steps)
+        text_ids.extend(intern(hint) for hint in hints)
+
+    if offsets.itemsize != 8 or text_ids.itemsize != 4 or sys.byteorder != 'little':
+        raise RuntimeError("this platform's array sizes don't match the bank format")
+
+    # Sections start on 8-byte boundaries
+    def aligned(pos):
+        return (pos + 7) & ~7
+
+    offsets_pos = HEADER.size
+    blob_pos = offsets_pos + 8 * len(offsets)
+    rows_pos = aligned(blob_pos + len(blob))
+    ids_pos = aligned(rows_pos + len(rows))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, len(strings),
+                            offsets_pos, blob_pos, rows_pos, ids_pos))
+        f.write(offsets.tobytes())
+        f.write(blob)
+        f.write(b'\x00' * (rows_pos - f.tell()))
+        f.write(rows)
+        f.write(b'\x00' * (ids_pos - f.tell()))
+        f.write(text_ids.tobytes())
+    os.replace(tmp_path, path)
+    return len(strings)
@@ -0,0 +1,287 @@
+"""
+NumPy batch versions of the equation and simplification generators.
+
+batch_problems(problem_type, seeds) makes the same Problems as
+
+    [generate_new_problem(problem_type, seed=seed) for seed in seeds]
+
+but draws every row's parameters at once. A problem's stream is counter
+based (see math_core.rng), so draw i of all the seeds is one vectorized
+splitmix64 over the seed array; each batch_* function takes its draws in
+the same order as the gen_* function it copies, works out every answer with
+vectorized integer arithmetic (fractions as numerator/denominator arrays
+reduced with np.gcd) and only builds the problem text at the end, from the
+same templates. Rows whose generator has no batch version are made by the
+scalar generator.
+
+build-bank uses this when NumPy is installed, so a bank of a million
+equations doesn't spend its time drawing one parameter at a time.
+"""
+
+import functools
+import gc
+
+import numpy as np
+
+from math_core.generators import (
+    DISTRIBUTE_COMBINE_HINTS, DISTRIBUTE_COMBINE_STEPS, DISTRIBUTE_EQ_HINTS, DISTRIBUTE_EQ_STEPS,
+    FRACTION_EQ_HINTS, FRACTION_EQ_STEPS, FRACTION_SIMPLIFY_HINTS, FRACTION_SIMPLIFY_STEPS,
+    GENERATOR_SETS, LINEAR_EQ_HINTS, LINEAR_EQ_STEPS, format_answer_string, generate_new_problem
+)
+from math_core.problem import Problem
+from math_core.registry import get_topic
+from math_core.rng import seed_draws
+from math_core.text import LazyText, sign
+
+
+# ============================================================================
+# VECTORIZED HELPERS
+# ============================================================================
+
+def _gc_paused(func):
+    """Run func with the cyclic GC off.
+
+    A batch allocates millions of lists that can't form cycles; letting the
+    collector rescan them on every generation threshold doubles the run time.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not gc.isenabled():
+            return func(*args, **kwargs)
+        gc.disable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            gc.enable()
+    return wrapper
+
+
+class _Draws:
+    """The next draws of many ProblemRandom streams at once, one row per seed."""
+
+    def __init__(self, seeds, counter=0):
+        self.seeds = seeds
+        self.counter = counter
+
+    def _next(self):
+        self.counter += 1
+        return seed_draws(self.seeds, self.counter)
+
+    def randint(self, low, high):
+        """ProblemRandom.randint(low, high) for every row."""
+        return low + (self._next() % np.uint64(high - low + 1)).astype(np.int64)
+
+    def choice(self, values):
+        """ProblemRandom.choice(values) for every row."""
+        return np.array(values)[(self._next() % np.uint64(len(values))).astype(np.intp)]
+
+
+def _reduce(numerator, denominator):
+    """Reduce numerator/denominator arrays to lowest terms with a positive denominator."""
+    g = np.gcd(numerator, denominator)
+    g[g == 0] = 1
+    numerator = numerator // g
+    denominator = denominator // g
+    flip = denominator < 0
+    numerator = np.where(flip, -numerator, numerator)
+    denominator = np.where(flip, -denominator, denominator)
+    return numerator, denominator
+
+
+def _fraction_strings(numerator, denominator):
+    """str(Fraction) for every reduced numerator/denominator pair."""
+    return [str(n) if d == 1 else f"{n}/{d}" for n, d in zip(numerator.tolist(), denominator.tolist())]
+
+
+# ============================================================================
+# SIMPLIFYING EXPRESSIONS
+# ============================================================================
+
+def batch_distribute_combine(draws):
+    """Batch gen_distribute_combine: a(bx + c) + dx + e"""
+    a = draws.randint(-5, 5)
+    a = np.where(a == 0, 2, a)
+    b = draws.randint(2, 8)
+    c = draws.randint(-10, 10)
+    d = draws.randint(-8, 8)
+    e = draws.randint(-10, 10)
+
+    ab = a * b
+    ac = a * c
+    x_coef = ab + d
+    constant = ac + e
+
+    problems = []
+    for a, b, c, d, e, ab, ac, x_coef, constant in zip(
+        a.tolist(), b.tolist(), c.tolist(), d.tolist(), e.tolist(),
+        ab.tolist(), ac.tolist(), x_coef.tolist(), constant.tolist()
+    ):
+        expr = f"{a}({b}x + {c}) + {d}x + {e}"
+        expr = expr.replace("+ -", "- ").replace("- -", "+ ")
+        answer = format_answer_string(x_coef, constant)
+        params = {
+            'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'ab': ab, 'ac': ac,
+            'ac_sign': sign(ac), 'ac_abs': abs(ac), 'd_sign': sign(d), 'd_abs': abs(d),
+            'e_sign': sign(e), 'e_abs': abs(e), 'x_coef': x_coef, 'constant': constant, 'answer': answer
+        }
+        problems.append((expr, answer, LazyText(params, DISTRIBUTE_COMBINE_STEPS, DISTRIBUTE_COMBINE_HINTS)))
+    return problems
+
+
+def batch_fraction_simplify(draws):
+    """Batch gen_fraction_simplify: (a/b)x + (c/d)x"""
+    denominators = [2, 3, 4, 5, 6]
+    b = draws.choice(denominators)
+    d = draws.choice(denominators)
+    a = draws.randint(1, 5)
+    c = draws.randint(1, 5)
+
+    ad = a * d
+    cb = c * b
+    numerator = ad + cb
+    denominator = b * d
+    result = _fraction_strings(*_reduce(numerator, denominator))
+
+    problems = []
+    for a, b, c, d, ad, cb, numerator, denominator, result in zip(
+        a.tolist(), b.tolist(), c.tolist(), d.tolist(), ad.tolist(), cb.tolist(),
+        numerator.tolist(), denominator.tolist(), result
+    ):
+        expr = f"{a}/{b}x + {c}/{d}x"
+        if result == "1":
+            answer = "x"
+        elif result == "-1":
+            answer = "-x"
+        else:
+            answer = f"{result}x"
+        params = {
+            'a': a, 'b': b, 'c': c, 'd': d, 'ad': ad, 'cb': cb, 'numerator': numerator,
+            'denominator': denominator, 'result': result, 'answer': answer
+        }
+        problems.append((expr, answer.replace(" ", ""), LazyText(params, FRACTION_SIMPLIFY_STEPS, FRACTION_SIMPLIFY_HINTS)))
+    return problems
+
+
+# ============================================================================
+# EQUATIONS
+# ============================================================================
+
+def batch_linear_eq(draws):
+    """Batch gen_linear_eq: ax + b = c"""
+    a = draws.randint(-10, 10)
+    a = np.where(a == 0, 3, a)
+    b = draws.randint(-15, 15)
+    c = draws.randint(-20, 20)
+
+    c_minus_b = c - b
+    x_val = _fraction_strings(*_reduce(c_minus_b, a))
+
+    problems = []
+    for a, b, c, c_minus_b, x_val in zip(a.tolist(), b.tolist(), c.tolist(), c_minus_b.tolist(), x_val):
+        equation = f"{a}x + {b} = {c}".replace("+ -", "- ")
+        params = {'a': a, 'b': b, 'equation': equation, 'c_minus_b': c_minus_b, 'x_val': x_val}
+        problems.append((equation, x_val, LazyText(params, LINEAR_EQ_STEPS, LINEAR_EQ_HINTS)))
+    return problems
+
+
+def batch_fraction_eq(draws):
+    """Batch gen_fraction_eq: x/a + b = c"""
+    a = draws.choice([2, 3, 4, 5])
+    b = draws.randint(-8, 8)
+    k = draws.randint(-5, 5)
+    k = np.where(k == 0, 2, k)
+
+    c = b + k
+    x_val = k * a
+
+    problems = []
+    for a, b, c, k, x_val in zip(a.tolist(), b.tolist(), c.tolist(), k.tolist(), x_val.tolist()):
+        equation = f"x/{a} + {b} = {c}".replace("+ -", "- ")
+        params = {'a': a, 'b': b, 'k': k, 'x_val': x_val}
+        problems.append((equation, str(x_val), LazyText(params, FRACTION_EQ_STEPS, FRACTION_EQ_HINTS)))
+    return problems
+
+
+def batch_distribute_eq(draws):
+    """Batch gen_distribute_eq: a(bx + c) + dx + e = f"""
+    a = draws.randint(-4, 4)
+    a = np.where(a == 0, 2, a)
+    b = draws.randint(2, 5)
+    c = draws.randint(-8, 8)
+    d = draws.randint(-6, 6)
+    e = draws.randint(-10, 10)
+    f = draws.randint(-15, 15)
+
+    # Same redraw as gen_distribute_eq: rows whose x terms cancel draw d
+    # again from their own next draw until they don't
+    cancel = np.flatnonzero(a * b + d == 0)
+    counter = draws.counter
+    while cancel.size:
+        counter += 1
+        d[cancel] = -6 + (seed_draws(draws.seeds[cancel], counter) % np.uint64(13)).astype(np.int64)
+        cancel = cancel[a[cancel] * b[cancel] + d[cancel] == 0]
+
+    distributed_x = a * b
+    distributed_const = a * c
+    combined_x = distributed_x + d
+    combined_const = distributed_const + e
+    remaining = f - combined_const
+    x_val = _fraction_strings(*_reduce(remaining, combined_x))
+
+    problems = []
+    for a, b, c, d, e, f, distributed_x, distributed_const, combined_x, combined_const, remaining, x_val in zip(
+        a.tolist(), b.tolist(), c.tolist(), d.tolist(), e.tolist(), f.tolist(),
+        distributed_x.tolist(), distributed_const.tolist(), combined_x.tolist(),
+        combined_const.tolist(), remaining.tolist(), x_val
+    ):
+        equation = f"{a}({b}x + {c}) + {d}x + {e} = {f}"
+        params = {
+            'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'f': f,
+            'distributed_x': distributed_x, 'distributed_const': distributed_const,
+            'combined_x': combined_x, 'combined_const': combined_const,
+            'remaining': remaining, 'x_val': x_val
+        }
+        problems.append((equation, x_val, LazyText(params, DISTRIBUTE_EQ_STEPS, DISTRIBUTE_EQ_HINTS)))
+    return problems
+
+
+# ============================================================================
+# BATCHES BY PROBLEM TYPE
+# ============================================================================
+
+# gen_* function name -> batch version
+BATCH_GENERATORS = {
+    'gen_distribute_combine': batch_distribute_combine,
+    'gen_fraction_simplify': batch_fraction_simplify,
+    'gen_linear_eq': batch_linear_eq,
+    'gen_fraction_eq': batch_fraction_eq,
+    'gen_distribute_eq': batch_distribute_eq,
+}
+
+# problem_types whose topic picks one of GENERATOR_SETS[problem_type] with its first draw
+BATCH_TYPES = ('simplify', 'equations')
+
+
+@_gc_paused
+def batch_problems(problem_type, seeds):
+    """The Problems generate_new_problem(problem_type, seed=seed) makes for seeds, in order."""
+    seeds = list(seeds)
+    label = get_topic(problem_type).label
+    generators = GENERATOR_SETS[problem_type]
+    seed_array = np.array(seeds, dtype=np.uint64)
+    # Draw 1 is the topic's pick of a generator
+    picked = (seed_draws(seed_array, 1) % np.uint64(len(generators))).astype(np.intp)
+
+    problems = [None] * len(seeds)
+    for i, generator in enumerate(generators):
+        rows = np.flatnonzero(picked == i)
+        if not rows.size:
+            continue
+        batch = BATCH_GENERATORS.get(generator.__name__)
+        if batch is None:
+            for row in rows.tolist():
+                problems[row] = generate_new_problem(problem_type, seed=seeds[row])
+            continue
+        for row, (expr, answer, text) in zip(rows.tolist(), batch(_Draws(seed_array[rows], 1))):
+            problems[row] = Problem(problem_type, expr, answer, text, label, seeds[row])
+    return problems
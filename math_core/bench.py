@@ -0,0 +1,281 @@
+"""
+Throughput benchmarks for the generators and the answer checker.
+
+Covers every gen_* function, both ways of getting a problem for every
+registered problem_type (a rebuild from its seed through the live
+generators, and a draw from a problem bank built for the run in a
+temporary directory, so it doesn't matter whether build-bank was run), and
+check_answer on right, reordered and wrong answers, and whole requests
+through the JSON API (math_core.api). For each case it reports
+calls per second, p50/p99 latency per call and the memory a call allocates
+(peak bytes traced by tracemalloc over one call).
+
+Results can be saved as a JSON baseline and later runs compared against it:
+
+    python -m math_core bench --save bench.json
+    python -m math_core bench --baseline bench.json --threshold 0.25
+
+A case regresses when its calls per second drop by more than the threshold
+(a fraction of the baseline); the command then exits with status 1.
+Baselines are only comparable on the same machine. The API cases go through
+generate_new_problem like the app does, so they draw from problem banks if
+any are built; the saved document lists which were.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from math_core import api, bank, generators
+from math_core.generators import generate_new_problem
+from math_core.grading import problem_id
+from math_core.registry import topic_types
+from math_core.rng import new_seed, session_rng
+
+DEFAULT_CALLS = 2000
+DEFAULT_THRESHOLD = 0.25
+ALLOC_SAMPLES = 20
+
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+def generator_functions():
+    """Every gen_* function in math_core.generators, by name."""
+    return {
+        name: func for name, func in inspect.getmembers(generators, inspect.isfunction)
+        if name.startswith('gen_') and func.__module__ == generators.__name__
+    }
+
+
+def _reordered(answer):
+    """The same answer with its terms in reverse order ("2x+3" -> "+3+2x")."""
+    terms = re.findall(r'[+-]?[^+-]+', answer)
+    return ''.join(term if term[0] in '+-' else '+' + term for term in reversed(terms))
+
+
+def _wrong(answer):
+    return answer + "+1"
+
+
+def _checker(pairs):
+    """One Problem.check per call, cycling through (problem, user_input) pairs."""
+    pairs = itertools.cycle(pairs)
+
+    def op():
+        problem, user_input = next(pairs)
+        return problem.check(user_input)
+    return op
+
+
+def _api_request(method, path, query=b'', body=b''):
+    """One request through api.app per call, on an event loop kept for the whole run."""
+    loop = asyncio.new_event_loop()
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query}
+    request = {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def receive():
+        return request
+
+    async def send(message):
+        if message['type'] == 'http.response.start' and message['status'] != 200:
+            raise RuntimeError(f"{method} {path} returned {message['status']}")
+
+    def op():
+        loop.run_until_complete(api.app(scope, receive, send))
+    return op
+
+
+def _bank_draw(problem_type, count, rng, bank_dir, banks):
+    opened = []
+
+    def op():
+        if not opened:
+            path = bank.bank_path(problem_type, bank_dir)
+            bank.build_bank(problem_type, count, path, rng)
+            opened.append(bank.ProblemBank(path, problem_type))
+            if banks is not None:
+                banks.append(opened[0])
+        return opened[0].draw(rng)
+    return op
+
+
+def build_cases(calls, seed=0, bank_dir=None, banks=None):
+    """name -> zero-argument callable that does one operation.
+
+    A bank case builds a calls-problem bank for its problem_type in
+    bank_dir on its first call (a warm-up call in measure) and appends it
+    to banks (if given), for the caller to close. Without a bank_dir they are left out.
+    """
+    rng = session_rng(seed)
+    cases = {}
+
+    for name, func in generator_functions().items():
+        cases[f"gen/{name}"] = lambda func=func: func(rng)
+
+    for problem_type in topic_types():
+        seeds = [new_seed(rng) for _ in range(calls)]
+        cases[f"type/{problem_type}/seed"] = (
+            lambda problem_type=problem_type, seeds=itertools.cycle(seeds):
+            generate_new_problem(problem_type, seed=next(seeds))
+        )
+        if bank_dir is not None:
+            cases[f"type/{problem_type}/bank"] = _bank_draw(problem_type, calls, rng, bank_dir, banks)
+
+    # Problems from every problem type, cycled through by each check case.
+    # Problem.check is check_answer with the correct answer already parsed.
+    problems = [
+        generate_new_problem(problem_type, seed=new_seed(rng))
+        for _ in range(max(1, calls // len(topic_types())) + 1)
+        for problem_type in topic_types()
+    ]
+    for kind, make_input in (('right', str), ('reordered', _reordered), ('wrong', _wrong)):
+        pairs = [(problem, make_input(problem.answer)) for problem in problems]
+        cases[f"check/{kind}"] = _checker(pairs)
+
+    # Whole requests through the JSON API's ASGI app, without a server
+    graded = [{'problem_id': problem_id(problem), 'answer': problem.answer} for problem in problems[:100]]
+    cases["api/problems"] = _api_request('GET', '/problems', query=b'type=proportions&count=1')
+    cases["api/problems/mixed10"] = _api_request('GET', '/problems', query=b'count=10')
+    cases["api/grade"] = _api_request('POST', '/grade', body=json.dumps(graded[0]).encode())
+    cases["api/grade/batch100"] = _api_request('POST', '/grade', body=json.dumps({'answers': graded}).encode())
+
+    return cases
+
+
+# ============================================================================
+# MEASURING
+# ============================================================================
+
+def measure(op, calls, warmup=50):
+    """Time calls runs of op; return ops/sec, p50/p99 in microseconds and bytes allocated per call."""
+    for _ in range(warmup):
+        op()
+
+    clock = time.perf_counter_ns
+    times = []
+    start = clock()
+    for _ in range(calls):
+        t = clock()
+        op()
+        times.append(clock() - t)
+    total = clock() - start
+    times.sort()
+
+    # Allocations are measured separately: tracing slows every call down
+    allocs = []
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOC_SAMPLES):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            op()
+            allocs.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'calls': calls,
+        'ops_per_sec': calls / (total / 1e9),
+        'p50_us': times[len(times) // 2] / 1e3,
+        'p99_us': times[min(len(times) - 1, int(len(times) * 0.99))] / 1e3,
+        'alloc_bytes': int(statistics.median(allocs)),
+    }
+
+
+def run(calls=DEFAULT_CALLS, pattern=None, seed=0):
+    """Run every case whose name contains pattern; return the results document."""
+    results = {}
+    banks = []
+    with tempfile.TemporaryDirectory(prefix='math-bench-') as bank_dir:
+        try:
+            for name, op in build_cases(calls, seed, bank_dir, banks).items():
+                if pattern and pattern not in name:
+                    continue
+                results[name] = measure(op, calls)
+        finally:
+            for problem_bank in banks:
+                problem_bank.close()
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'calls': calls,
+        # The API cases draw from problem banks when they are built
+        'banks': [problem_type for problem_type in topic_types() if os.path.exists(bank.bank_path(problem_type))],
+        'results': results,
+    }
+
+
+def regressions(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """(name, baseline ops/sec, current ops/sec) for every case that got too slow."""
+    slower = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            slower.append((name, base['ops_per_sec'], result['ops_per_sec']))
+    return slower
+
+
+def format_table(document, baseline=None):
+    lines = [f"{'case':48} {'ops/s':>10} {'p50 µs':>9} {'p99 µs':>9} {'alloc B':>9}" + ("  vs base" if baseline else "")]
+    for name, result in document['results'].items():
+        line = (f"{name:48} {result['ops_per_sec']:>10,.0f} {result['p50_us']:>9.1f} "
+                f"{result['p99_us']:>9.1f} {result['alloc_bytes']:>9,}")
+        base = baseline and baseline['results'].get(name)
+        if base:
+            line += f"  {result['ops_per_sec'] / base['ops_per_sec'] - 1:+7.1%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def bench_command(args):
+    document = run(args.calls, args.filter, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_table(document, baseline))
+    if baseline is not None and baseline.get('banks', []) != document['banks']:
+        print("warning: the baseline was run with different problem banks built; api/* cases may not compare",
+              file=sys.stderr)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"saved {len(document['results'])} results to {args.save}")
+
+    if baseline is not None:
+        slower = regressions(document, baseline, args.threshold)
+        for name, before, after in slower:
+            print(f"REGRESSION {name}: {before:,.0f} -> {after:,.0f} ops/s", file=sys.stderr)
+        if slower:
+            return 1
+    return 0
+
+
+def add_parser(commands):
+    bench = commands.add_parser('bench', help="benchmark the generators and the answer checker")
+    bench.add_argument('--calls', type=int, default=DEFAULT_CALLS, help="timed calls per case")
+    bench.add_argument('--filter', help="only run cases whose name contains this")
+    bench.add_argument('--seed', type=int, default=0, help="seed for the benchmark inputs")
+    bench.add_argument('--save', help="write the results to this JSON file")
+    bench.add_argument('--baseline', help="compare against results saved with --save")
+    bench.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                       help="allowed drop in ops/s before a case counts as a regression (0.25 = 25%%)")
+    bench.set_defaults(func=bench_command)
@@ -0,0 +1,403 @@
+"""
+Answer checking for the 7th grade practice app.
+"""
+
+from fractions import Fraction
+import math
+import re
+
+# ============================================================================
+# CANONICAL POLYNOMIALS
+# ============================================================================
+
+def canonical_answer(answer):
+    """The form answers are compared in: all spaces removed."""
+    return answer.replace(" ", "")
+
+
+# One token per match: number, variable, ^, *, /, or sign
+_TOKEN = re.compile(r"(\d*\.?\d+|\d+\.)|([a-zA-Z])|(\^)|(\*)|(/)|([+-])")
+_NUMBER, _VARIABLE, _POWER, _TIMES, _DIVIDE, _SIGN = range(1, 7)
+
+
+def _number(text):
+    """A decimal literal as an exact (numerator, denominator) pair."""
+    whole, _, decimals = text.partition('.')
+    return int(whole + decimals or '0'), 10 ** len(decimals)
+
+
+def parse_polynomial(text):
+    """Parse an answer like "2x + 3", "x*2 - 1/2", "0.5x" or "5x^2+8x+3y+5".
+
+    Returns the polynomial in canonical form: a sorted tuple of
+    (monomial, coefficient) pairs with every coefficient a nonzero Fraction,
+    where a monomial is a sorted tuple of (variable, power) pairs and () is
+    the constant term. Two answers are equal exactly when their canonical
+    forms are. Returns None for anything that isn't a polynomial.
+
+    A number written right before a variable multiplies it and "/" divides
+    by the single number after it, so "5/4x" is (5/4)x, like the answers the
+    generators print. A number right after a variable ("x2") and two signs
+    in a row ("--x", "2x+-3") are rejected rather than guessed at. One pass
+    over the tokens, with integer arithmetic until the end.
+    """
+    text = text.replace(" ", "")
+    tokens = []
+    pos = 0
+    for match in _TOKEN.finditer(text):
+        if match.start() != pos:
+            return None
+        pos = match.end()
+        tokens.append((match.lastindex, match.group()))
+    if pos != len(text) or not tokens:
+        return None
+    tokens.append((_SIGN, '+'))  # sentinel: closes the last term
+
+    terms = {}
+    numerator, denominator = 1, 1
+    powers = {}
+    factors = 0
+    previous = None
+    i = 0
+    while i < len(tokens):
+        kind, value = tokens[i]
+        if kind == _SIGN:
+            if previous == _SIGN:
+                return None
+            if factors:
+                monomial = tuple(sorted(powers.items()))
+                num, den = terms.get(monomial, (0, 1))
+                terms[monomial] = (num * denominator + numerator * den, den * denominator)
+                numerator, denominator = 1, 1
+                powers = {}
+                factors = 0
+            if value == '-':
+                numerator = -numerator
+        elif kind == _NUMBER:
+            if previous == _NUMBER or previous == _VARIABLE:
+                return None
+            num, den = _number(value)
+            numerator *= num
+            denominator *= den
+            factors += 1
+        elif kind == _VARIABLE:
+            power = 1
+            if tokens[i + 1][0] == _POWER:
+                exponent = tokens[i + 2]
+                if exponent[0] != _NUMBER or not exponent[1].isdigit():
+                    return None
+                power = int(exponent[1])
+                i += 2
+            variable = value.lower()
+            powers[variable] = powers.get(variable, 0) + power
+            factors += 1
+        elif kind == _DIVIDE:
+            divisor = tokens[i + 1]
+            if not factors or divisor[0] != _NUMBER:
+                return None
+            num, den = _number(divisor[1])
+            if num == 0:
+                return None
+            numerator *= den
+            denominator *= num
+            i += 1
+        elif kind == _TIMES:
+            if not factors or tokens[i + 1][0] not in (_NUMBER, _VARIABLE):
+                return None
+        else:
+            # "^" that doesn't follow a variable
+            return None
+        previous = kind
+        i += 1
+
+    if tokens[-2][0] == _SIGN:
+        # Ends in a sign: "2x+"
+        return None
+    return tuple(sorted(
+        (tuple((variable, power) for variable, power in monomial if power), Fraction(num, den))
+        for monomial, (num, den) in terms.items() if num
+    ))
+
+# ============================================================================
+# NUMERIC LITERALS
+# ============================================================================
+
+EXACT_SIGN = 'exact'        # the sign has to match
+MAGNITUDE_SIGN = 'magnitude'  # -7.2 is as good as 7.2 ("a decrease of 7.2%")
+POSITIVE_SIGN = 'positive'   # negative answers are always wrong (lengths, areas)
+ANY_UNIT = 'any'
+
+
+class AnswerRule:
+    """What a topic lets students write around a numeric answer.
+
+    units are the unit tags accepted after (or, for "$", before) the number:
+    "%", "$" or words like "square units", compared lowercase with single
+    spaces. ANY_UNIT accepts "$" or any words ("12 miles per hour"). variable is the
+    name a student may put in front ("x = 5/4"), and sign one of EXACT_SIGN,
+    MAGNITUDE_SIGN or POSITIVE_SIGN. A bare number is always accepted.
+    """
+
+    __slots__ = ('units', 'variable', 'sign')
+
+    def __init__(self, units=(), variable=None, sign=EXACT_SIGN):
+        self.units = units if units == ANY_UNIT else frozenset(units)
+        self.variable = variable
+        self.sign = sign
+
+    def allows(self, unit):
+        if unit is None:
+            return True
+        if self.units == ANY_UNIT:
+            return unit != '%'
+        return unit in self.units
+
+    def __repr__(self):
+        return f"AnswerRule(units={self.units!r}, variable={self.variable!r}, sign={self.sign!r})"
+
+
+_DIGITS = frozenset("0123456789")
+_UNIT_END = frozenset("+-*/=()")
+# One unsigned numeral: "1,200", "3", "3.", ".75", "0.5"
+_NUMERAL = re.compile(r"(\d{1,3}(?:,\d{3})+|\d*)(?:\.(\d*))?")
+
+
+def _scan_number(text, i):
+    """Read the numeral at text[i].
+
+    Returns (numerator, denominator, end, has_point) or None if there are no digits.
+    """
+    match = _NUMERAL.match(text, i)
+    whole, decimals = match.groups()
+    if decimals is None:
+        if not whole:
+            return None
+        return int(whole.replace(',', '')), 1, match.end(), False
+    if not whole and not decimals:
+        return None
+    return int(whole.replace(',', '') + decimals or '0'), 10 ** len(decimals), match.end(), True
+
+
+def _scan_quantity(text, rule=None):
+    """(numerator, denominator, unit) for one numeric answer, or None.
+
+    Reads, in a single pass with integer arithmetic: an optional
+    "<variable> =" (if rule allows a variable), a sign and "$" in either
+    order, then an integer, decimal (".75", "3.", "1,200"), fraction ("5/4")
+    or mixed number ("1 1/2"), then "%" or unit words after a space. The
+    denominator is positive but the fraction isn't reduced.
+    """
+    n = len(text)
+    i = 0
+    while i < n and text[i] == ' ':
+        i += 1
+    if i == n:
+        return None
+
+    variable = rule.variable if rule is not None else None
+    if variable and text.startswith(variable, i):
+        j = i + len(variable)
+        while j < n and text[j] == ' ':
+            j += 1
+        if j < n and text[j] == '=':
+            i = j + 1
+            while i < n and text[i] == ' ':
+                i += 1
+
+    sign = None
+    unit = None
+    while i < n:
+        c = text[i]
+        if (c == '-' or c == '+') and sign is None:
+            sign = c
+        elif c == '$' and unit is None:
+            unit = '$'
+        elif c != ' ':
+            break
+        i += 1
+
+    number = _scan_number(text, i)
+    if number is None:
+        return None
+    numerator, denominator, i, point = number
+
+    j = i
+    while j < n and text[j] == ' ':
+        j += 1
+    if j < n and text[j] == '/':
+        # Fraction: "5/4"
+        j += 1
+        while j < n and text[j] == ' ':
+            j += 1
+        divisor = _scan_number(text, j)
+        if divisor is None or divisor[0] == 0:
+            return None
+        numerator *= divisor[1]
+        denominator *= divisor[0]
+        i = divisor[2]
+    elif j > i and j < n and text[j] in _DIGITS and not point:
+        # Mixed number: "1 1/2"
+        top = _scan_number(text, j)
+        if top[3] or top[2] >= n or text[top[2]] != '/':
+            return None
+        bottom = _scan_number(text, top[2] + 1)
+        if bottom is None or bottom[3] or bottom[0] == 0:
+            return None
+        numerator = numerator * bottom[0] + top[0]
+        denominator = bottom[0]
+        i = bottom[2]
+
+    if i < n:
+        rest = text[i:].strip()
+        if not rest:
+            pass
+        elif unit is not None:
+            return None
+        elif rest == '%':
+            unit = '%'
+        elif text[i] != ' ' or not rest[0].isalpha() or any(c in _UNIT_END for c in rest):
+            # Letters right after the number are a variable ("5x"), not a unit
+            return None
+        else:
+            unit = ' '.join(rest.lower().split())
+
+    if sign == '-':
+        numerator = -numerator
+    return numerator, denominator, unit
+
+
+def parse_quantity(text, rule=None):
+    """Read an answer like "25%", "1 1/2", ".75", "$3.50", "120 square units" or "x = 5/4".
+
+    Returns (value, unit) with value an exact Fraction and unit "%", "$",
+    the unit words or None, or None if text isn't a single number. A rule
+    (see AnswerRule) is only needed to allow a "<variable> =" prefix.
+    """
+    quantity = _scan_quantity(text, rule)
+    if quantity is None:
+        return None
+    numerator, denominator, unit = quantity
+    return Fraction(numerator, denominator), unit
+
+
+def _constant(form):
+    """The value of a canonical polynomial that is just a number, else None."""
+    if not form:
+        return None if form is None else Fraction(0)
+    if len(form) == 1 and not form[0][0]:
+        return form[0][1]
+    return None
+
+
+def _quantity_matches(quantity, value, rule):
+    numerator, denominator, unit = quantity
+    if unit is not None and (rule is None or not rule.allows(unit)):
+        return False
+    if rule is not None and rule.sign != EXACT_SIGN:
+        if numerator < 0:
+            if rule.sign == POSITIVE_SIGN:
+                return False
+            numerator = -numerator
+        value = abs(value)
+    return numerator * value.denominator == denominator * value.numerator
+
+# ============================================================================
+# ANSWER KEYS
+# ============================================================================
+
+def number_key(numerator, denominator=1):
+    """The key for the number numerator/denominator: the reduced (numerator, denominator) pair.
+
+    Plain ints, so generators can build keys without any Fraction arithmetic.
+    """
+    if denominator != 1:
+        divisor = math.gcd(numerator, denominator)
+        if denominator < 0:
+            divisor = -divisor
+        numerator //= divisor
+        denominator //= divisor
+    return numerator, denominator
+
+
+def linear_key(x_coef, constant):
+    """The key for x_coef*x + constant (int coefficients)."""
+    if not x_coef:
+        return number_key(constant)
+    if not constant:
+        return (((('x', 1),), x_coef),)
+    return (((), constant), ((('x', 1),), x_coef))
+
+
+def answer_key(user_input, rule=None):
+    """A student's answer as a key to look up in a map of known answers.
+
+    Numbers (read like check_answer reads them, with units and "x =" dropped)
+    key as number_key, other answers as their canonical polynomial (int
+    coefficients compare and hash equal to the Fractions in it). None if the
+    input is neither, or can't be read (like check_answer, this never raises
+    on what a student types: a 5000-digit number is past int()'s limit).
+    """
+    try:
+        quantity = _scan_quantity(user_input, rule)
+        if quantity is not None:
+            return number_key(quantity[0], quantity[1])
+        form = parse_polynomial(canonical_answer(user_input))
+    except ValueError:
+        return None
+    value = _constant(form)
+    if value is not None:
+        return number_key(value.numerator, value.denominator)
+    return form
+
+# ============================================================================
+# ANSWER CHECKING
+# ============================================================================
+
+_UNPARSED = object()
+
+
+def check_answer(user_input, correct_answer, correct_form=_UNPARSED, rule=None):
+    """Check if answer is correct. Handles fractions, decimals and reordered or rewritten terms.
+
+    correct_form is parse_polynomial(correct_answer) when the caller already
+    has it (a Problem parses its answer once, when it's made), so only the
+    student's input gets parsed here. When the answer is a number, the input
+    is read with parse_quantity and rule (the topic's AnswerRule) says which
+    units, signs and "x =" prefixes are fine.
+    """
+    try:
+        # 1. Clean up inputs (remove all spaces)
+        correct_answer_clean = canonical_answer(correct_answer)
+        if user_input.strip() == correct_answer_clean:
+            return True
+
+        # 2. Numeric answers: the input has to be a number too ("2*3" isn't "6")
+        if correct_form is _UNPARSED:
+            correct_form = parse_polynomial(correct_answer_clean)
+        value = _constant(correct_form)
+        if value is not None:
+            quantity = _scan_quantity(user_input, rule)
+            return quantity is not None and _quantity_matches(quantity, value, rule)
+
+        # 3. Direct string comparison (e.g., for equations or simple numerical answers)
+        user_input_clean = canonical_answer(user_input)
+        if user_input_clean == correct_answer_clean:
+            return True
+
+        # 4. Compare as polynomials: catches 0.5x = 1/2x, 3+2x = 2x+3, x*2 = 2x
+        if correct_form is not None:
+            return parse_polynomial(user_input_clean) == correct_form
+
+        # 5. Answers that aren't polynomials: handle term reordering
+        def split_and_sort(expression):
+            # Add leading + if missing to ensure consistency
+            if expression and expression[0] not in '+-':
+                expression = '+' + expression
+            # Find all terms with their signs
+            terms = re.findall(r'[+-][^+-]+', expression)
+            return sorted(terms)
+
+        return split_and_sort(user_input_clean) == split_and_sort(correct_answer_clean)
+
+    except Exception:
+        return False
@@ -0,0 +1,302 @@
+"""
+Append-only log of what students do.
+
+Every problem shown, submit, hint, show-steps, skip and topic switch becomes
+one event:
+
+    {"t": 1760716800.123, "event": "submit", "student": "3f2a...",
+     "problem_type": "proportions", "seed": 1234, "answer": "12",
+     "correct": false, "mistake": "cross_multiply", "hints": 1, "steps": false}
+
+log_event() only appends a tuple to a deque (appends are atomic, so session
+threads never take a lock) and returns; a background thread turns the
+buffered events into JSON lines and writes them out in one batch every
+flush_interval seconds, then fsyncs, so a crash loses at most that interval.
+
+Each process writes its own files in MATH_EVENT_DIR (default ./events),
+named events-<start time>-<host>-<pid>-<n>.jsonl: the time the process
+opened its first file, its host and pid, and a sequence number, so
+"<start time>-<host>-<pid>" names one writer (also when containers that
+all run as pid 1 share the directory) and its files come in order of n.
+The file being written ends in .jsonl.part and gets its final name when it
+reaches max_bytes or max_age, or when the process exits, so readers should
+take the .jsonl files only.
+
+The writer holds an flock on its .jsonl.part for as long as it has it open.
+A process that crashes leaves its .jsonl.part behind with the lock gone;
+the next EventLog to open a file in the directory, or the next compaction
+run, gives those their final names (see finalize_leftovers), so no events
+are stranded. The lock works from any host or container that shares the
+directory, which a pid check can't.
+"""
+
+import atexit
+import calendar
+import collections
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: fall back to checking the writer's pid, on this host only
+    fcntl = None
+
+EVENT_DIR = os.environ.get(
+    'MATH_EVENT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'events')
+)
+FLUSH_INTERVAL = 1.0
+MAX_FILE_BYTES = 64 * 1024 * 1024
+MAX_FILE_AGE = 3600
+# Events held in memory while writes fail; past this the oldest are dropped
+MAX_BUFFERED = 100_000
+
+EVENTS = ('show', 'submit', 'hint', 'steps', 'skip', 'topic')
+
+logger = logging.getLogger(__name__)
+
+# A .part file this new may not be locked by its writer yet
+FRESH_SECONDS = 5
+
+# Files with this process's pid but an older stamp were left by an earlier
+# process that had the same pid, as happens across container restarts
+_LOADED = int(time.time())
+
+
+def _host_name():
+    node = os.uname().nodename if hasattr(os, 'uname') else os.environ.get('COMPUTERNAME', '')
+    return ''.join(c for c in node.split('.')[0] if c.isalnum() or c == '-') or 'host'
+
+
+HOST = _host_name()
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # It exists but belongs to someone else
+        return True
+    return True
+
+
+def _lock(fd):
+    """Take the writer's lock on fd without waiting; False if someone holds it."""
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _writer_gone(path, host, pid, started, max_age):
+    if fcntl is not None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return _lock(fd)
+        finally:
+            os.close(fd)
+    # Without locks, only a writer on this host can be checked, by its pid
+    if time.time() - os.path.getmtime(path) > 2 * max_age:
+        return True
+    if host and host != HOST:
+        return False
+    if pid == os.getpid():
+        return started < _LOADED
+    return not _pid_running(pid)
+
+
+def parse_name(path):
+    """(writer, n, start time, host, pid) from an event file's name; ValueError if it isn't one.
+
+    Files from before names carried the host give '' for it.
+    """
+    name = os.path.basename(path)
+    if name.endswith('.part'):
+        name = name[:-len('.part')]
+    if not name.endswith('.jsonl'):
+        raise ValueError(f"not an event file: {name}")
+    parts = name[:-len('.jsonl')].split('-')
+    if len(parts) < 5 or parts[0] != 'events':
+        raise ValueError(f"not an event file: {name}")
+    day, clock, pid, n = parts[1], parts[2], parts[-2], parts[-1]
+    host = '-'.join(parts[3:-2])
+    started = calendar.timegm(time.strptime(day + clock, '%Y%m%d%H%M%S'))
+    writer = '-'.join(part for part in (day, clock, host, pid) if part)
+    return writer, int(n), started, host, int(pid)
+
+
+def finalize_leftovers(directory, max_age=MAX_FILE_AGE):
+    """Give .jsonl.part files whose writer is gone their final names; returns the new paths.
+
+    A writer is gone when nobody holds the lock on its file. Without flock
+    (Windows) it is gone when the file hasn't been written for twice
+    max_age, since a live writer rotates by then, or when it ran on this
+    host and its pid isn't running (or is this process's pid on a file
+    from before it started).
+    """
+    finalized = []
+    now = time.time()
+    for path in glob.glob(os.path.join(directory, 'events-*.jsonl.part')):
+        try:
+            _, _, started, host, pid = parse_name(path)
+        except ValueError:
+            continue
+        try:
+            if now - os.path.getmtime(path) < FRESH_SECONDS:
+                continue
+            if _writer_gone(path, host, pid, started, max_age):
+                os.replace(path, path[:-len('.part')])
+                finalized.append(path[:-len('.part')])
+        except FileNotFoundError:
+            # Its writer, or another process cleaning up, renamed it first
+            continue
+    return finalized
+
+
+class EventLog:
+    """Buffered, rotated JSON-lines event files for one process."""
+
+    def __init__(self, directory=EVENT_DIR, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_FILE_BYTES, max_age=MAX_FILE_AGE):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._buffer = collections.deque(maxlen=MAX_BUFFERED)
+        self._file = None
+        self._path = None
+        self._opened = 0.0
+        self._started = None
+        self._size = 0
+        self._files = 0
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def log(self, event, student_id, problem, **detail):
+        """Buffer one event about problem (which can be None)."""
+        if problem is None:
+            self._buffer.append((time.time(), event, student_id, None, None, detail))
+        else:
+            self._buffer.append((time.time(), event, student_id, problem.problem_type, problem.seed, detail))
+        if self._thread is None:
+            self._start()
+
+    def __len__(self):
+        """Events buffered and not written yet."""
+        return len(self._buffer)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='math-events', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # Events stay buffered and go out with the next flush that works
+                logger.exception("event log flush failed")
+
+    def flush(self):
+        """Write every buffered event and fsync, rotating the file first if it's due."""
+        with self._flush_lock:
+            if self._file is not None and (self._size >= self.max_bytes
+                                           or time.time() - self._opened >= self.max_age):
+                self._rotate()
+            if not self._buffer:
+                return
+            if self._file is None:
+                self._open()
+            # Take only what was there when we started; later events wait for the next flush
+            buffer = self._buffer
+            events = [buffer.popleft() for _ in range(len(buffer))]
+            lines = []
+            for t, event, student_id, problem_type, seed, detail in events:
+                record = {'t': round(t, 3), 'event': event, 'student': student_id,
+                          'problem_type': problem_type, 'seed': seed}
+                record.update(detail)
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                buffer.extendleft(reversed(events))
+                # Start a new file next time rather than keep writing to a broken one
+                self._rotate()
+                raise
+            self._size += len(data)
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._files:
+            for path in finalize_leftovers(self.directory, self.max_age):
+                logger.info("event log: finalized %s left by a stopped process", path)
+        self._opened = time.time()
+        if self._started is None:
+            self._started = time.strftime('%Y%m%d-%H%M%S', time.gmtime(self._opened))
+        self._files += 1
+        self._path = os.path.join(self.directory,
+                                  f"events-{self._started}-{HOST}-{os.getpid()}-{self._files}.jsonl.part")
+        self._file = open(self._path, 'ab')
+        # Held until the file is closed, so finalize_leftovers knows it's live
+        if fcntl is not None and not _lock(self._file.fileno()):
+            self._file.close()
+            self._file = None
+            raise OSError(f"{self._path} is locked by another writer")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        """Close the current file and give it its final name; the next write opens a new one.
+
+        Failures are logged, not raised: whatever happens to this file, the
+        log moves on to a new one instead of failing every flush after it.
+        """
+        file, path = self._file, self._path
+        self._file = None
+        self._path = None
+        try:
+            file.close()
+            os.replace(path, path[:-len('.part')])
+        except OSError as exc:
+            logger.warning("event log: could not finish %s: %s", path, exc)
+
+    def close(self):
+        """Write what's buffered and give the current file its final name."""
+        self.flush()
+        with self._flush_lock:
+            if self._file is not None:
+                self._rotate()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """The EventLog for this process, in MATH_EVENT_DIR."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = EventLog()
+                atexit.register(_log.close)
+    return _log
+
+
+def log_event(event, student_id, problem, **detail):
+    """Buffer one event in this process's EventLog."""
+    get_event_log().log(event, student_id, problem, **detail)
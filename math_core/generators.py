@@ -0,0 +1,1574 @@
+"""
+Problem generators for the 7th grade practice app.
+
+Every gen_* function returns the problem text, the answer string and a
+LazyText holding the numbers for the solution steps and hints. Rate,
+percentage and geometry generators also return the label shown above the
+problem. Steps and hints are module-level templates; they are only filled in
+when the student opens them (see math_core.text). Where the common wrong
+answers follow from the numbers, the LazyText also carries a map from those
+answers to a mistake code and a hint aimed at that mistake.
+
+Generators draw from the rng they are given (a random.Random), never from the
+shared random module state, so the same seed always gives the same problem.
+"""
+
+import math
+from fractions import Fraction
+
+from math_core import bank
+from math_core.checking import ANY_UNIT, MAGNITUDE_SIGN, POSITIVE_SIGN, AnswerRule, linear_key, number_key
+from math_core.problem import Problem
+from math_core.registry import Topic, get_topic, pick, register
+from math_core.rng import as_random, make_rng, new_seed
+from math_core.text import LazyText, mistake_map, sign
+
+# ============================================================================
+# PROBLEM GENERATION FUNCTIONS
+# ============================================================================
+
+# Helper function to generate an algebraic expression answer string
+def format_answer_string(x_coef, constant):
+    answer = ""
+
+    if x_coef == 1:
+        answer = "x"
+    elif x_coef == -1:
+        answer = "-x"
+    elif x_coef != 0:
+        answer = f"{x_coef}x"
+
+    if constant > 0 and answer:
+        answer += f" + {constant}"
+    elif constant < 0 and answer:
+        answer += f" - {abs(constant)}"
+    elif constant != 0 and not answer:
+        answer = str(constant)
+    elif not answer and constant == 0:
+        answer = "0"
+
+    return answer.replace(" ", "")
+
+# --- SIMPLIFYING EXPRESSION GENERATORS (Truncated for brevity, but included in full code) ---
+DISTRIBUTE_COMBINE_STEPS = (
+    "🎯 **First, let's distribute!** Think of {a} as giving something to everyone inside the parentheses.",
+    "   • {a} × {b}x = {ab}x",
+    "   • {a} × {c} = {ac}",
+    "📝 Now we have: **{ab}x {ac_sign} {ac_abs} {d_sign} {d_abs}x {e_sign} {e_abs}**",
+    "🔍 **Combine the x terms**: {ab}x + {d}x = **{x_coef}x**",
+    "🔍 **Combine the numbers**: {ac} + {e} = **{constant}**",
+    "✨ **Final Answer: {answer}**"
+)
+
+DISTRIBUTE_COMBINE_HINTS = (
+    "💡 **Think of it like sharing pizza!** 🍕 The {a} outside needs to multiply with EVERYTHING inside the ( ).",
+    "💡 **Now play matchmaker!** 💑 Find all your 'x' terms and add them up. Then find all your plain numbers and add those up separately.",
+    "💡 **Almost there, superstar!** ⭐ Combine your x terms ({ab}x and {d}x) and your number buddies ({ac} and {e})!"
+)
+
+def distribute_combine_params(a, b, c, d, e):
+    """Answer and step/hint numbers for a(bx + c) + dx + e"""
+    x_coef = a * b + d
+    constant = a * c + e
+    answer = format_answer_string(x_coef, constant)
+    return answer, {
+        'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'ab': a * b, 'ac': a * c,
+        'ac_sign': sign(a * c), 'ac_abs': abs(a * c), 'd_sign': sign(d), 'd_abs': abs(d),
+        'e_sign': sign(e), 'e_abs': abs(e), 'x_coef': x_coef, 'constant': constant, 'answer': answer
+    }
+
+def gen_distribute_combine(rng):
+    """Generate: a(bx + c) + dx + e"""
+    a = rng.randint(-5, 5)
+    if a == 0: a = 2
+    b = rng.randint(2, 8)
+    c = rng.randint(-10, 10)
+    d = rng.randint(-8, 8)
+    e = rng.randint(-10, 10)
+
+    expr = f"{a}({b}x + {c}) + {d}x + {e}"
+    expr = expr.replace("+ -", "- ").replace("- -", "+ ")
+
+    answer, params = distribute_combine_params(a, b, c, d, e)
+
+    return expr, answer, LazyText(params, DISTRIBUTE_COMBINE_STEPS, DISTRIBUTE_COMBINE_HINTS)
+
+DISTRIBUTE_NEGATIVE_STEPS = (
+    "🎯 **Watch out for the negative sign!** The minus applies to everything.",
+    "**Step 1: Distribute -{a}:** -{a} × {b}x = {x_coef}x, and -{a} × (-{c}) = +{constant}",
+    "**Step 2: Final answer:** **{answer}**",
+    "✨ **Remember:** A minus outside flips ALL the signs inside!"
+)
+
+DISTRIBUTE_NEGATIVE_HINTS = (
+    "💡 **Distribute the minus!** The -{a} multiplies both terms: {b}x and -{c}.",
+    "💡 **Change the signs!** -{a} × (-{c}) = +{constant} because two negatives make a positive!",
+    "💡 **Final result:** {x_coef}x {constant_sign} {constant_abs}"
+)
+
+DISTRIBUTE_NEGATIVE_MISTAKES = {
+    'sign_not_flipped': "💡 **Two negatives make a positive!** -{a} × (-{c}) = **+{constant}**, not -{constant}.",
+    'first_term_only': "💡 **Distribute to every term!** The -{a} multiplies the -{c} too: -{a} × (-{c}) = +{constant}.",
+    'dropped_negative': "💡 **Keep the minus on the {a}!** You're multiplying by -{a}, so -{a} × {b}x = {x_coef}x.",
+}
+
+def gen_distribute_negative(rng):
+    """Generate: -a(bx - c)"""
+    a = rng.randint(2, 7)
+    b = rng.randint(2, 8)
+    c = rng.randint(1, 10)
+
+    x_coef = -a * b
+    constant = a * c
+
+    expr = f"-{a}({b}x - {c})"
+    answer = format_answer_string(x_coef, constant)
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'x_coef': x_coef, 'constant': constant,
+        'constant_sign': sign(constant), 'constant_abs': abs(constant), 'answer': answer
+    }
+
+    mistakes = mistake_map(
+        linear_key(x_coef, constant), DISTRIBUTE_NEGATIVE_MISTAKES,
+        (linear_key(x_coef, -constant), 'sign_not_flipped'),
+        (linear_key(x_coef, -c), 'first_term_only'),
+        (linear_key(x_coef, c), 'first_term_only'),
+        (linear_key(-x_coef, -constant), 'dropped_negative'),
+    )
+
+    return expr, answer, LazyText(params, DISTRIBUTE_NEGATIVE_STEPS, DISTRIBUTE_NEGATIVE_HINTS, mistakes)
+
+MULTI_DISTRIBUTE_STEPS = (
+    "🎯 **Two groups to distribute!** Handle each set of parentheses separately.",
+    "**Step 1: Distribute {a}:** {a}({b}x + {c}) = {ab}x + {ac}",
+    "**Step 2: Distribute -{d}:** -{d}({e}x + {f}) = -{de}x - {df}",
+    "**Step 3: Combine like terms:** x terms: {ab}x - {de}x = {x_coef}x",
+    "**Step 4: Combine constants:** {ac} - {df} = {constant}",
+    "✨ **Final Answer: {answer}**"
+)
+
+MULTI_DISTRIBUTE_HINTS = (
+    "💡 **Distribute both groups!** First multiply {a} with everything in the first parentheses, then -{d} with everything in the second.",
+    "💡 **Watch the minus sign!** When distributing -{d}, it becomes -{de}x - {df}.",
+    "💡 **Combine like terms:** Add up all your x terms, then add up all the numbers."
+)
+
+def gen_multi_distribute(rng):
+    """Generate: a(bx + c) - d(ex + f)"""
+    a = rng.randint(2, 5)
+    b = rng.randint(2, 6)
+    c = rng.randint(1, 8)
+    d = rng.randint(2, 5)
+    e = rng.randint(2, 6)
+    f = rng.randint(1, 8)
+
+    x_coef = a * b - d * e
+    constant = a * c - d * f
+
+    expr = f"{a}({b}x + {c}) - {d}({e}x + {f})"
+    answer = format_answer_string(x_coef, constant)
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'f': f, 'ab': a * b, 'ac': a * c,
+        'de': d * e, 'df': d * f, 'x_coef': x_coef, 'constant': constant, 'answer': answer
+    }
+
+    return expr, answer, LazyText(params, MULTI_DISTRIBUTE_STEPS, MULTI_DISTRIBUTE_HINTS)
+
+FRACTION_SIMPLIFY_STEPS = (
+    "🎯 **Different denominators!** Need common denominator to add fractions.",
+    "**Step 1: Find common denominator:** {b} × {d} = {denominator}",
+    "**Step 2: Convert first fraction:** {a}/{b}x = ({a} × {d})/{denominator}x = {ad}/{denominator}x",
+    "**Step 3: Convert second fraction:** {c}/{d}x = ({c} × {b})/{denominator}x = {cb}/{denominator}x",
+    "**Step 4: Add numerators:** {ad}/{denominator}x + {cb}/{denominator}x = {numerator}/{denominator}x",
+    "**Step 5: Simplify:** {numerator}/{denominator} = {result}",
+    "✨ **Final Answer: {answer}**"
+)
+
+FRACTION_SIMPLIFY_HINTS = (
+    "💡 **Get common denominators first!** Multiply {b} × {d} = {denominator}",
+    "💡 **Convert both fractions:** {a}/{b} becomes {ad}/{denominator} and {c}/{d} becomes {cb}/{denominator}",
+    "💡 **Add the numerators:** {ad} + {cb} = {numerator}"
+)
+
+def fraction_simplify_answer(result):
+    """Answer string for a combined x coefficient"""
+    if result == 1:
+        return "x"
+    elif result == -1:
+        return "-x"
+    else:
+        return f"{result}x"
+
+def gen_fraction_simplify(rng):
+    """Generate fraction simplification: (a/b)x + (c/d)x"""
+    denominators = [2, 3, 4, 5, 6]
+    b = rng.choice(denominators)
+    d = rng.choice(denominators)
+    a = rng.randint(1, 5)
+    c = rng.randint(1, 5)
+
+    numerator = a * d + c * b
+    denominator = b * d
+    result = Fraction(numerator, denominator)
+
+    expr = f"{a}/{b}x + {c}/{d}x"
+    answer = fraction_simplify_answer(result)
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'd': d, 'ad': a * d, 'cb': c * b, 'numerator': numerator,
+        'denominator': denominator, 'result': result, 'answer': answer
+    }
+
+    return expr, answer.replace(" ", ""), LazyText(params, FRACTION_SIMPLIFY_STEPS, FRACTION_SIMPLIFY_HINTS)
+
+FRACTION_SIMPLIFY_MIXED_STEPS = (
+    "🎯 **Fraction distribution!** The {a}/{b} needs to multiply both terms inside the parentheses.",
+    "**Step 1: Distribute {a}/{b}:** ({a}/{b}) × {c}x = {ac}/{b}x, and ({a}/{b}) × {d} = {ad}/{b}",
+    "📝 Now we have: **{ac}/{b}x {ad_sign} {ad_abs}/{b} + {e}x**",
+    "**Step 2: Get common denominator for x terms:** {e}x = {eb}/{b}x",
+    "**Step 3: Combine x terms:** {ac}/{b}x + {eb}/{b}x = {x_numerator}/{b}x",
+    "✨ **Final Answer: {answer}**"
+)
+
+FRACTION_SIMPLIFY_MIXED_HINTS = (
+    "💡 **Distribute the fraction!** {a}/{b} needs to be multiplied with EVERYTHING: {c}x and {d}",
+    "💡 **Get common denominators!** Turn {e}x into a fraction with denominator {b}: {e}x = {eb}/{b}x",
+    "💡 **Combine the x terms!** Add {ac}/{b}x + {eb}/{b}x = {x_numerator}/{b}x = {x_coef}x"
+)
+
+def gen_fraction_simplify_mixed(rng):
+    """Generate: (a/b)(cx + d) + ex"""
+    b = rng.choice([2, 3, 4, 5])
+    a = rng.randint(1, 4)
+    c = rng.randint(2, 6)
+    d = rng.randint(-8, 8)
+    e = rng.randint(-6, 6)
+
+    x_coef = Fraction(a * c + e * b, b)
+    constant = Fraction(a * d, b)
+
+    expr = f"{a}/{b}({c}x + {d}) + {e}x"
+
+    answer = format_answer_string(x_coef, constant)
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'ac': a * c, 'ad': a * d,
+        'ad_sign': sign(a * d), 'ad_abs': abs(a * d), 'eb': e * b,
+        'x_numerator': a * c + e * b, 'x_coef': x_coef, 'answer': answer
+    }
+
+    return expr, answer.replace(" ", ""), LazyText(params, FRACTION_SIMPLIFY_MIXED_STEPS, FRACTION_SIMPLIFY_MIXED_HINTS)
+
+MULTI_VARIABLE_STEPS = (
+    "🎯 **Sort the terms into teams!** x² terms, x terms, y terms and plain numbers only combine with their own team.",
+    "**Step 1: Combine the x² terms:** {a}x^2 + {e}x^2 = {x2_coef}x^2",
+    "**Step 2: Combine the x terms:** {b}x + {f}x = {x_coef}x",
+    "**Step 3: Combine the y terms:** {c}y + {g}y = {y_coef}y",
+    "**Step 4: Combine the numbers:** {d} + {h} = {constant}",
+    "✨ **Final Answer: {answer}**"
+)
+
+MULTI_VARIABLE_HINTS = (
+    "💡 **Like terms have the same letters AND the same powers!** x² and x are on different teams.",
+    "💡 **Add the numbers in front on each team:** {a} + {e} for x², {b} + {f} for x, {c} + {g} for y.",
+    "💡 **Don't forget the plain numbers!** {d} + {h} = {constant}"
+)
+
+def _term(coef, variable):
+    """A positive term as written in a problem: "x^2" for 1x^2, "3y", "5"."""
+    return variable if coef == 1 and variable else f"{coef}{variable}"
+
+def gen_multi_variable_combine(rng):
+    """Generate: ax^2 + bx + cy + d + ex^2 + fx + gy + h (Combine like terms)"""
+    a = rng.randint(1, 8)
+    b = rng.randint(1, 9)
+    c = rng.randint(1, 9)
+    d = rng.randint(1, 9)
+    e = rng.randint(1, 5)
+    f = rng.randint(1, 9)
+    g = rng.randint(1, 5)
+    h = rng.randint(1, 9)
+
+    x2_coef = a + e
+    x_coef = b + f
+    y_coef = c + g
+    constant = d + h
+
+    expr = " + ".join(_term(coef, variable) for coef, variable in (
+        (a, "x^2"), (b, "x"), (c, "y"), (d, ""), (e, "x^2"), (f, "x"), (g, "y"), (h, "")
+    ))
+    # Every coefficient is at least 2 once combined
+    answer = f"{x2_coef}x^2+{x_coef}x+{y_coef}y+{constant}"
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'f': f, 'g': g, 'h': h,
+        'x2_coef': x2_coef, 'x_coef': x_coef, 'y_coef': y_coef, 'constant': constant, 'answer': answer
+    }
+
+    return expr, answer, LazyText(params, MULTI_VARIABLE_STEPS, MULTI_VARIABLE_HINTS)
+
+
+# --- EQUATION GENERATORS (Truncated for brevity, but included in full code) ---
+LINEAR_EQ_STEPS = (
+    "🎯 **Isolate x!** Get x by itself on one side.",
+    "**Step 1: Subtract {b} from both sides:** {equation} becomes {a}x = {c_minus_b}",
+    "**Step 2: Divide both sides by {a}:** x = {c_minus_b}/{a}",
+    "**Step 3: Simplify:** x = **{x_val}**",
+    "✨ **Remember:** Whatever you do to one side, do the same to the other! ⚖️"
+)
+
+LINEAR_EQ_HINTS = (
+    "💡 **The Golden Rule:** What you do to one side, you MUST do to the other! First, get rid of {b} by subtracting it.",
+    "💡 **Next step:** Now divide by {a} to isolate x. The equation is {a}x = {c_minus_b}",
+    "💡 **Final step:** x = {c_minus_b} ÷ {a} = {x_val}"
+)
+
+def gen_linear_eq(rng):
+    """Generate: ax + b = c"""
+    a = rng.randint(-10, 10)
+    if a == 0: a = 3
+    b = rng.randint(-15, 15)
+    c = rng.randint(-20, 20)
+
+    x_val = Fraction(c - b, a)
+    equation = f"{a}x + {b} = {c}".replace("+ -", "- ")
+    answer = str(x_val)
+
+    params = {'a': a, 'b': b, 'equation': equation, 'c_minus_b': c - b, 'x_val': answer}
+
+    return equation, answer, LazyText(params, LINEAR_EQ_STEPS, LINEAR_EQ_HINTS)
+
+FRACTION_EQ_STEPS = (
+    "🎯 **Get rid of the fraction!** Isolate x by working backwards.",
+    "**Step 1: Subtract {b} from both sides:** x/{a} = {k}",
+    "**Step 2: Multiply both sides by {a}:** x = {k} × {a}",
+    "**Step 3: Calculate:** x = **{x_val}**",
+    "✨ **Remember:** To undo division by {a}, multiply by {a}!"
+)
+
+FRACTION_EQ_HINTS = (
+    "💡 **First step:** Subtract {b} from both sides to get x/{a} by itself.",
+    "💡 **Now multiply:** To get x alone, multiply both sides by {a}. This gives x = {k} × {a}",
+    "💡 **Final answer:** x = {x_val}"
+)
+
+def gen_fraction_eq(rng):
+    """Generate: x/a + b = c (Equation with a fractional term)"""
+    a = rng.choice([2, 3, 4, 5])
+    b = rng.randint(-8, 8)
+    k = rng.randint(-5, 5)
+    if k == 0: k = 2
+    c = b + k
+    x_val = k * a
+    equation = f"x/{a} + {b} = {c}".replace("+ -", "- ")
+    answer = str(x_val)
+
+    params = {'a': a, 'b': b, 'k': k, 'x_val': x_val}
+
+    return equation, answer, LazyText(params, FRACTION_EQ_STEPS, FRACTION_EQ_HINTS)
+
+DISTRIBUTE_EQ_STEPS = (
+    "🎯 **Simplify first, then solve!** Distribute and combine like terms.",
+    "**Step 1: Distribute {a}:** {a}({b}x + {c}) = {distributed_x}x + {distributed_const}",
+    "**Step 2: Combine like terms:** {distributed_x}x + {d}x = {combined_x}x, and {distributed_const} + {e} = {combined_const}",
+    "**Step 3: Simplified equation:** {combined_x}x + {combined_const} = {f}",
+    "**Step 4: Subtract {combined_const} from both sides:** {combined_x}x = {remaining}",
+    "**Step 5: Divide by {combined_x}:** x = {remaining}/{combined_x} = **{x_val}**",
+    "✨ **You did it!** Step by step gets you there! 🎉"
+)
+
+DISTRIBUTE_EQ_HINTS = (
+    "💡 **Start by distributing!** Multiply {a} with everything inside the parentheses: {a} × {b}x and {a} × {c}",
+    "💡 **Combine like terms!** Add up all the x terms and all the plain numbers separately.",
+    "💡 **Now solve!** After simplifying, use the Golden Rule: subtract, then divide to find x = {x_val}"
+)
+
+def gen_distribute_eq(rng):
+    """Generate: a(bx + c) + dx + e = f"""
+    a = rng.randint(-4, 4)
+    if a == 0: a = 2
+    b = rng.randint(2, 5)
+    c = rng.randint(-8, 8)
+    d = rng.randint(-6, 6)
+    e = rng.randint(-10, 10)
+    f = rng.randint(-15, 15)
+
+    # The x terms mustn't cancel, or there is nothing to solve
+    while a * b + d == 0:
+        d = rng.randint(-6, 6)
+    x_coef = a * b + d
+    const = a * c + e
+
+    x_val = Fraction(f - const, x_coef)
+    equation = f"{a}({b}x + {c}) + {d}x + {e} = {f}"
+    answer = str(x_val)
+
+    # Calculate intermediate values for steps
+    distributed_x = a * b
+    distributed_const = a * c
+    combined_x = distributed_x + d
+    combined_const = distributed_const + e
+
+    params = {
+        'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'f': f,
+        'distributed_x': distributed_x, 'distributed_const': distributed_const,
+        'combined_x': combined_x, 'combined_const': combined_const,
+        'remaining': f - combined_const, 'x_val': answer
+    }
+
+    return equation, answer, LazyText(params, DISTRIBUTE_EQ_STEPS, DISTRIBUTE_EQ_HINTS)
+
+
+# ============================================================================
+# UNIT RATE AND RATIO GENERATORS
+# ============================================================================
+
+UNIT_RATE_BASIC_STEPS = (
+    "🎯 **Unit Rate Goal:** Find out how much for **1 unit** (e.g., 1 hour, 1 pound, 1 minute).",
+    "**Step 1: Set up the division:** Rate = $\\frac{{\\text{{Total Quantity}}}}{{\\text{{Total Units}}}} = \\frac{{{numerator} \\text{{ {unit1}}}}}{{{denominator} \\text{{ {unit2}}}}}$",
+    "**Step 2: Divide:** {numerator} $\\div$ {denominator} = **{rate}**",
+    "✨ **Final Answer:** {rate} {answer_label}"
+)
+
+UNIT_RATE_BASIC_HINTS = (
+    "💡 **Think simple division!** Just divide the first number ({numerator}) by the second number ({denominator}).",
+    "💡 **You're finding the amount for just ONE unit!** Divide the total by the count.",
+    "💡 **Remember the question:** You need to find the rate in {unit1} **per 1** {unit2_single}."
+)
+
+def gen_unit_rate_basic(rng):
+    """Generate a basic word problem asking for a unit rate."""
+
+    scenarios = [
+        ("miles", "hours", "a road trip"),
+        ("dollars", "pounds of bananas", "grocery shopping"),
+        ("words", "minutes", "typing a report"),
+        ("pages", "days", "reading a book"),
+        ("meters", "seconds", "running a race"),
+        ("gallons", "miles", "driving your car"),
+        ("cups", "servings", "making lemonade")
+    ]
+
+    unit1, unit2, context = rng.choice(scenarios)
+
+    # Ensure the rate is a clean, whole number for basic problems
+    rate = rng.randint(5, 50)
+    denominator = rng.randint(2, 10)
+    numerator = rate * denominator
+
+    answer_label = f"{unit1} per {unit2.rstrip('s')}"
+
+    problem = f"During {context}, you traveled **{numerator} {unit1}** in **{denominator} {unit2}**. What is the **unit rate**?"
+
+    answer = str(rate)
+
+    params = {
+        'unit1': unit1, 'unit2': unit2, 'unit2_single': unit2.rstrip('s'), 'rate': rate,
+        'numerator': numerator, 'denominator': denominator, 'answer_label': answer_label
+    }
+
+    return problem, answer, LazyText(params, UNIT_RATE_BASIC_STEPS, UNIT_RATE_BASIC_HINTS), "Find the Unit Rate:"
+
+
+UNIT_RATE_REVERSE_STEPS = (
+    "🎯 **Reverse Unit Rate:** You have the rate and need to find the total.",
+    "**Step 1: Identify what you know:** Rate = {unit_rate} {rate_label}, Time = {units} {unit2}",
+    "**Step 2: Multiply:** Total = Rate × Units = {unit_rate} × {units}",
+    "**Step 3: Calculate:** {unit_rate} × {units} = **{total}**",
+    "✨ **Final Answer:** {total} {unit1}"
+)
+
+UNIT_RATE_REVERSE_HINTS = (
+    "💡 **Think multiplication!** You have the rate ({unit_rate}) and you need to multiply it by {units}.",
+    "💡 **Rate × Time = Total!** If you know the speed, multiply by the time to get UNIT RATE × UNITS = TOTAL.",
+    "💡 **Use the formula:** {unit_rate} × {units} = ?"
+)
+
+def gen_unit_rate_reverse(rng):
+    """Generate a problem where you find the total given unit rate and number of units."""
+
+    scenarios = [
+        ("miles per hour", "miles", "hours", "driving"),
+        ("pages per day", "pages", "days", "reading"),
+        ("words per minute", "words", "minutes", "typing"),
+        ("pounds per week", "pounds", "weeks", "weight loss"),
+        ("dollars per hour", "dollars", "hours", "working")
+    ]
+
+    rate_label, unit1, unit2, context = rng.choice(scenarios)
+    unit_rate = rng.randint(10, 60)
+    units = rng.randint(3, 10)
+
+    total = unit_rate * units
+
+    problem = f"If you're moving at a rate of **{unit_rate} {rate_label}** and you continue for **{units} {unit2}**, how many **{unit1}** will you travel?"
+
+    answer = str(total)
+
+    params = {
+        'rate_label': rate_label, 'unit1': unit1, 'unit2': unit2,
+        'unit_rate': unit_rate, 'units': units, 'total': total
+    }
+
+    return problem, answer, LazyText(params, UNIT_RATE_REVERSE_STEPS, UNIT_RATE_REVERSE_HINTS), "Find the Total:"
+
+
+EQUIVALENT_RATIOS_STEPS = (
+    "🎯 **Equivalent Ratios:** A:{b} must equal {c}:?",
+    "**Step 1: Set up the proportion:** $\\frac{{{a}}}{{{b}}} = \\frac{{{c}}}{{?}}$",
+    "**Step 2: Identify the scale factor:** {c} $\\div$ {a} = {multiplier}",
+    "**Step 3: Apply the scale factor:** {b} × {multiplier} = **{d}**",
+    "✨ **Final Answer:** {d} {unit2}"
+)
+
+EQUIVALENT_RATIOS_HINTS = (
+    "💡 **Find the multiplier!** If {a} became {c}, you multiplied by {c}/{a}. Do the same to {b}!",
+    "💡 **Proportion thinking:** The ratio {a}:{b} must stay the same. If {a} becomes {c} (×{multiplier}), then {b} becomes {b}×{multiplier}.",
+    "💡 **Cross multiplication:** {a} × ? = {b} × {c}, so ? = ({b} × {c}) ÷ {a}"
+)
+
+def gen_equivalent_ratios(rng):
+    """Generate equivalent ratio problems."""
+
+    scenarios = [
+        ("students", "computers", "the computer lab"),
+        ("cookies", "brownies", "baking"),
+        ("blue", "red", "mixing paint"),
+        ("dogs", "cats", "the pet store")
+    ]
+
+    unit1, unit2, context = rng.choice(scenarios)
+
+    # Start with a simple ratio
+    a = rng.randint(2, 5)
+    b = rng.randint(2, 6)
+
+    # Generate equivalent ratio
+    multiplier = rng.randint(2, 5)
+    c = a * multiplier
+    d = b * multiplier
+
+    problem = f"In {context}, the ratio of **{unit1} to {unit2}** is **{a}:{b}**. If there are **{c} {unit1}**, how many **{unit2}** are there?"
+
+    answer = str(d)
+
+    params = {'unit2': unit2, 'a': a, 'b': b, 'c': c, 'd': d, 'multiplier': multiplier}
+
+    return problem, answer, LazyText(params, EQUIVALENT_RATIOS_STEPS, EQUIVALENT_RATIOS_HINTS), "Find the Missing Value:"
+
+
+COMPARING_RATES_STEPS = (
+    "🎯 **Comparing Rates:** Find the difference between the two rates.",
+    "**Step 1: Identify both rates:** Task A: {rate1}, Task B: {rate2}",
+    "**Step 2: Find the difference:** {rate1} - {rate2} = **{diff}**",
+    "✨ **Final Answer:** Task A completes {diff} more {rate_label}"
+)
+
+COMPARING_RATES_HINTS = (
+    "💡 **Subtract the rates!** {rate1} - {rate2} = ?",
+    "💡 **Find the difference:** Subtract the smaller number ({rate2}) from the larger number ({rate1}).",
+    "💡 **Task A has {diff} more {rate_label} than Task B.**"
+)
+
+def gen_comparing_rates(rng):
+    """Generate problems comparing two different rates."""
+
+    items = [
+        ("beats per minute", "playlist"),
+        ("items per hour", "assembly line"),
+        ("miles per gallon", "car"),
+        ("problems per hour", "homework")
+    ]
+
+    rate_label, context = rng.choice(items)
+
+    rate1 = rng.randint(35, 80)
+    rate2 = rng.randint(15, rate1 - 10)
+
+    # Ensure rate1 is always larger so answer is predictable
+    diff = rate1 - rate2
+
+    problem = f"You complete **{rate1} {rate_label}** on Task A and **{rate2} {rate_label}** on Task B. How many more {rate_label} does Task A complete?"
+
+    answer = str(diff)
+
+    params = {'rate_label': rate_label, 'rate1': rate1, 'rate2': rate2, 'diff': diff}
+
+    return problem, answer, LazyText(params, COMPARING_RATES_STEPS, COMPARING_RATES_HINTS), "Compare the Rates:"
+
+
+RATIO_FRACTIONS_STEPS = (
+    "🎯 **Scaling with fractions:** Multiply the original amount by the scale factor.",
+    "**Step 1: Identify the scale factor:** {mult_num}/{mult_den} of the recipe",
+    "**Step 2: Multiply the {unit1}:** {a} × {mult_num}/{mult_den} = {scaled}/{mult_den}",
+    "**Step 3: Simplify if needed:** {scaled}/{mult_den} = **{new_a}**",
+    "✨ **Final Answer:** {new_a} {unit1}"
+)
+
+RATIO_FRACTIONS_HINTS = (
+    "💡 **Think of it as finding a fraction of the amount!** What is {mult_num}/{mult_den} of {a}?",
+    "💡 **Multiply!** {a} × {mult_num}/{mult_den} = ({a} × {mult_num}) ÷ {mult_den}",
+    "💡 **Calculate:** ({a} × {mult_num}) ÷ {mult_den} = {scaled} ÷ {mult_den} = {new_a}"
+)
+
+def gen_ratio_fractions(rng):
+    """Generate ratio scaling problems using fractions."""
+
+    scenarios = [
+        ("cups of flour", "cups of sugar", "baking cookies"),
+        ("red paint", "blue paint", "mixing purple paint"),
+        ("boys", "girls", "the classroom"),
+        ("teachers", "students", "the school")
+    ]
+
+    unit1, unit2, context = rng.choice(scenarios)
+
+    # Start with a simple ratio
+    a = rng.randint(2, 6)
+    b = rng.randint(2, 6)
+
+    # Use a fraction as multiplier (like 1/2, 1/3, 2/3, 3/2)
+    numerators = [1, 1, 2, 3, 1]
+    denominators = [2, 3, 3, 2, 4]
+    idx = rng.randint(0, len(numerators) - 1)
+    mult_num = numerators[idx]
+    mult_den = denominators[idx]
+
+    # Calculate the new ratio
+    new_a = Fraction(a * mult_num, mult_den)
+
+    problem = f"A recipe uses **{a} {unit1}** for every **{b} {unit2}**. If you want to make **{mult_num}/{mult_den}** of the recipe, how many {unit1} do you need?"
+
+    answer = str(new_a)
+
+    params = {
+        'unit1': unit1, 'a': a, 'mult_num': mult_num, 'mult_den': mult_den,
+        'scaled': a * mult_num, 'new_a': answer
+    }
+
+    return problem, answer, LazyText(params, RATIO_FRACTIONS_STEPS, RATIO_FRACTIONS_HINTS), "Scale the Ratio:"
+
+
+SOLVING_PROPORTIONS_STEPS = (
+    "🎯 **Set up the proportion:** Two equal ratios!",
+    "**Step 1: Write the proportion:** {a}/{b} = {c}/x",
+    "**Step 2: Cross-multiply:** {a} × x = {b} × {c}",
+    "**Step 3: Calculate the right side:** {b} × {c} = {bc}",
+    "**Step 4: Solve for x:** x = {bc}/{a} = **{x}**",
+    "✨ **Final Answer:** {x} {unit2}"
+)
+
+SOLVING_PROPORTIONS_HINTS = (
+    "💡 **Set up your proportion!** {a} {unit1} / {b} {unit2} = {c} {unit1} / ? {unit2}",
+    "💡 **Use cross-multiplication!** Multiply diagonally: {a} × ? = {b} × {c}",
+    "💡 **Solve it!** ? = ({b} × {c}) ÷ {a} = {bc} ÷ {a} = {x}"
+)
+
+SOLVING_PROPORTIONS_MISTAKES = {
+    'wrong_pair': "💡 **Keep the units lined up!** {a} {unit1} goes with {b} {unit2}, so cross-multiply {a} × ? = {b} × {c}.",
+    'forgot_divide': "💡 **One more step!** {a} × ? = {bc}, so divide both sides by {a}.",
+}
+
+def gen_solving_proportions(rng):
+    """Generate proportion-solving problems using cross-multiplication."""
+
+    scenarios = [
+        ("miles", "hours", "driving"),
+        ("pages", "minutes", "reading"),
+        ("dollars", "items", "shopping"),
+        ("meters", "seconds", "running")
+    ]
+
+    unit1, unit2, context = rng.choice(scenarios)
+
+    # Create a proportion: a/b = c/x
+    a = rng.randint(3, 12)
+    b = rng.randint(2, 10)
+    c = rng.randint(4, 15)
+
+    # Calculate x using cross-multiplication
+    x = Fraction(b * c, a)
+
+    problem = f"If **{a} {unit1}** takes **{b} {unit2}**, how many {unit2} will **{c} {unit1}** take? (Solve using a proportion)"
+
+    answer = str(x)
+
+    params = {'unit1': unit1, 'unit2': unit2, 'a': a, 'b': b, 'c': c, 'bc': b * c, 'x': answer}
+
+    mistakes = mistake_map(
+        number_key(b * c, a), SOLVING_PROPORTIONS_MISTAKES,
+        (number_key(a * c, b), 'wrong_pair'),
+        (number_key(b * c), 'forgot_divide'),
+    )
+
+    return problem, answer, LazyText(params, SOLVING_PROPORTIONS_STEPS, SOLVING_PROPORTIONS_HINTS, mistakes), "Solve the Proportion:"
+
+
+CONSTANT_PROPORTIONALITY_STEPS = (
+    "🎯 **Find k in y = kx:** The constant tells you the rate!",
+    "**Step 1: Use the formula:** y = kx, so k = y/x",
+    "**Step 2: Substitute the values:** k = {y_val}/{x_val}",
+    "**Step 3: Divide:** k = **{k}**",
+    "**Step 4: Interpret:** This means {k} {y_unit} per {x_unit}!",
+    "✨ **Final Answer:** k = {k}"
+)
+
+CONSTANT_PROPORTIONALITY_HINTS = (
+    "💡 **Use the formula!** If y = kx, then k = y ÷ x",
+    "💡 **Plug in the numbers:** k = {y_val} ÷ {x_val}",
+    "💡 **The constant is the unit rate!** k = {k} {y_unit} per {x_unit}"
+)
+
+def gen_constant_proportionality(rng):
+    """Generate problems about constant of proportionality (k in y = kx)."""
+
+    scenarios = [
+        ("cost (y)", "number of items (x)", "dollars", "items", "buying apples"),
+        ("distance (y)", "time (x)", "miles", "hours", "driving at constant speed"),
+        ("earnings (y)", "hours worked (x)", "dollars", "hours", "working a job"),
+        ("pages read (y)", "days (x)", "pages", "days", "reading a book")
+    ]
+
+    y_label, x_label, y_unit, x_unit, context = rng.choice(scenarios)
+
+    # Create a simple proportional relationship y = kx
+    k = rng.randint(3, 15)
+    x_val = rng.randint(2, 10)
+    y_val = k * x_val
+
+    problem = f"When {context}, **{y_label}** is proportional to **{x_label}**. If **y = {y_val}** when **x = {x_val}**, what is the **constant of proportionality (k)**?"
+
+    answer = str(k)
+
+    params = {'y_unit': y_unit, 'x_unit': x_unit, 'k': k, 'x_val': x_val, 'y_val': y_val}
+
+    return problem, answer, LazyText(params, CONSTANT_PROPORTIONALITY_STEPS, CONSTANT_PROPORTIONALITY_HINTS), "Find k:"
+
+
+PROPORTIONAL_GRAPH_STEPS = (
+    "🎯 **Proportional Graph:** In a proportional relationship, y/x is always the same (that's k!)",
+    "**Step 1: Pick any point and use k = y/x.** Let's use ({x1}, {y1})",
+    "**Step 2: Calculate k:** k = {y1}/{x1} = **{k}**",
+    "**Step 3: Verify with another point!** ({x2}, {y2}): k = {y2}/{x2} = {k} ✓",
+    "✨ **Final Answer:** k = {k}"
+)
+
+PROPORTIONAL_GRAPH_HINTS = (
+    "💡 **In a proportional relationship, y = kx!** So k = y ÷ x",
+    "💡 **Pick ANY point and divide y by x!** Try ({x1}, {y1}): k = {y1} ÷ {x1}",
+    "💡 **The answer is k = {k}!** This means y is always {k} times x."
+)
+
+def gen_proportional_graph(rng):
+    """Generate problems about proportional relationships shown in coordinate points."""
+
+    # Create a proportional relationship y = kx
+    k = rng.randint(2, 8)
+
+    # Generate some coordinate points
+    x_values = [1, 2, 3, 4]
+    points = [(x, k * x) for x in x_values]
+
+    # Format points for display
+    points_str = ", ".join([f"({x}, {y})" for x, y in points])
+
+    problem = f"A graph shows these points on a line: **{points_str}**. This represents a proportional relationship y = kx. What is the **constant of proportionality (k)**?"
+
+    answer = str(k)
+
+    params = {'k': k, 'x1': points[0][0], 'y1': points[0][1], 'x2': points[1][0], 'y2': points[1][1]}
+
+    return problem, answer, LazyText(params, PROPORTIONAL_GRAPH_STEPS, PROPORTIONAL_GRAPH_HINTS), "Find k from Graph:"
+
+
+def gen_unit_rate(rng):
+    """Pick a random unit rate problem type."""
+    generators = [
+        gen_unit_rate_basic,
+        gen_unit_rate_reverse,
+        gen_equivalent_ratios,
+        gen_comparing_rates,
+        gen_ratio_fractions,
+        gen_solving_proportions,
+        gen_constant_proportionality,
+        gen_proportional_graph
+    ]
+    return rng.choice(generators)(rng)
+
+
+# ============================================================================
+# GEOMETRY PROBLEM GENERATORS
+# ============================================================================
+
+RECTANGLE_AREA_STEPS = (
+    "🎯 **Finding rectangle area:** Multiply length × width.",
+    "**Step 1: Identify the formula:** Area = Length × Width",
+    "**Step 2: Substitute the values:** Area = {length} × {width}",
+    "**Step 3: Calculate:** Area = **{area} square units**",
+    "✨ **Final Answer:** {area} square units"
+)
+
+RECTANGLE_AREA_HINTS = (
+    "💡 **Use the area formula!** Area of a rectangle = Length × Width",
+    "💡 **Multiply the dimensions!** {length} × {width}",
+    "💡 **Don't forget the units!** The answer should be in square units."
+)
+
+RECTANGLE_AREA_MISTAKES = {
+    'perimeter': "💡 **That's the perimeter!** Area is the space inside: {length} × {width}.",
+    'added': "💡 **Multiply, don't add!** Area = Length × Width = {length} × {width}.",
+}
+
+def gen_rectangle_area(rng):
+    """Generate a problem to find the area of a rectangle."""
+    length = rng.randint(5, 20)
+    width = rng.randint(3, 15)
+
+    area = length * width
+
+    problem = f"Find the area of a rectangle with length **{length} units** and width **{width} units**."
+    answer = str(area)
+
+    params = {'length': length, 'width': width, 'area': area}
+
+    mistakes = mistake_map(
+        number_key(area), RECTANGLE_AREA_MISTAKES,
+        (number_key(2 * (length + width)), 'perimeter'),
+        (number_key(length + width), 'added'),
+    )
+
+    return problem, answer, LazyText(params, RECTANGLE_AREA_STEPS, RECTANGLE_AREA_HINTS, mistakes), "Find the Area:"
+
+
+TRIANGLE_AREA_STEPS = (
+    "🎯 **Finding triangle area:** Use the formula Area = (base × height) ÷ 2.",
+    "**Step 1: Identify the formula:** Area = (Base × Height) ÷ 2",
+    "**Step 2: Substitute the values:** Area = ({base} × {height}) ÷ 2",
+    "**Step 3: Multiply first:** {base} × {height} = {product}",
+    "**Step 4: Divide by 2:** {product} ÷ 2 = **{area}**",
+    "✨ **Final Answer:** {area} square units"
+)
+
+TRIANGLE_AREA_HINTS = (
+    "💡 **Use the triangle area formula!** Area = (Base × Height) ÷ 2",
+    "💡 **Multiply first, then divide!** ({base} × {height}) ÷ 2",
+    "💡 **Don't forget to divide by 2!** That's what makes it a triangle formula."
+)
+
+TRIANGLE_AREA_MISTAKES = {
+    'forgot_half': "💡 **Don't forget to divide by 2!** A triangle is half of a {base} × {height} rectangle: {product} ÷ 2.",
+}
+
+def gen_triangle_area(rng):
+    """Generate a problem to find the area of a triangle."""
+    base = rng.randint(4, 20)
+    height = rng.randint(3, 15)
+
+    # Make sure the area is a whole number for simplicity
+    if base * height % 2:
+        base += 1
+    area = base * height // 2
+
+    problem = f"Find the area of a triangle with base **{base} units** and height **{height} units**."
+    answer = str(area)
+
+    params = {'base': base, 'height': height, 'product': base * height, 'area': area}
+
+    mistakes = mistake_map(number_key(area), TRIANGLE_AREA_MISTAKES, (number_key(base * height), 'forgot_half'))
+
+    return problem, answer, LazyText(params, TRIANGLE_AREA_STEPS, TRIANGLE_AREA_HINTS, mistakes), "Find the Area:"
+
+
+RECTANGLE_PERIMETER_STEPS = (
+    "🎯 **Finding rectangle perimeter:** Add all sides (or use the formula).",
+    "**Step 1: Identify the formula:** Perimeter = 2 × (Length + Width)",
+    "**Step 2: Substitute the values:** Perimeter = 2 × ({length} + {width})",
+    "**Step 3: Calculate inside parentheses:** {length} + {width} = {half}",
+    "**Step 4: Multiply by 2:** 2 × {half} = **{perimeter}**",
+    "✨ **Final Answer:** {perimeter} units"
+)
+
+RECTANGLE_PERIMETER_HINTS = (
+    "💡 **Use the perimeter formula!** Perimeter = 2 × (Length + Width)",
+    "💡 **Or add all four sides!** {length} + {width} + {length} + {width}",
+    "💡 **Remember:** Perimeter is the distance around the shape."
+)
+
+SQUARE_PERIMETER_STEPS = (
+    "🎯 **Finding square perimeter:** Multiply the side length by 4.",
+    "**Step 1: Identify the formula:** Perimeter = 4 × Side Length",
+    "**Step 2: Substitute the value:** Perimeter = 4 × {side}",
+    "**Step 3: Calculate:** 4 × {side} = **{perimeter}**",
+    "✨ **Final Answer:** {perimeter} units"
+)
+
+SQUARE_PERIMETER_HINTS = (
+    "💡 **Use the square perimeter formula!** Perimeter = 4 × Side Length",
+    "💡 **Or add all four sides!** {side} + {side} + {side} + {side}",
+    "💡 **Remember:** A square has 4 equal sides."
+)
+
+TRIANGLE_PERIMETER_STEPS = (
+    "🎯 **Finding triangle perimeter:** Add all three sides.",
+    "**Step 1: Identify the formula:** Perimeter = Side 1 + Side 2 + Side 3",
+    "**Step 2: Substitute the values:** Perimeter = {side1} + {side2} + {side3}",
+    "**Step 3: Calculate:** {side1} + {side2} + {side3} = **{perimeter}**",
+    "✨ **Final Answer:** {perimeter} units"
+)
+
+TRIANGLE_PERIMETER_HINTS = (
+    "💡 **Add all three sides!** Perimeter = {side1} + {side2} + {side3}",
+    "💡 **Remember:** Perimeter is the distance around the shape.",
+    "💡 **Just add them up!** No special formula needed for triangle perimeter."
+)
+
+def gen_perimeter(rng):
+    """Generate a problem to find the perimeter of a polygon."""
+    # Choose between rectangle, square, or triangle
+    shape_type = rng.choice(["rectangle", "square", "triangle"])
+
+    if shape_type == "rectangle":
+        length = rng.randint(5, 20)
+        width = rng.randint(3, 15)
+        perimeter = 2 * (length + width)
+
+        problem = f"Find the perimeter of a rectangle with length **{length} units** and width **{width} units**."
+
+        params = {'length': length, 'width': width, 'half': length + width, 'perimeter': perimeter}
+        text = LazyText(params, RECTANGLE_PERIMETER_STEPS, RECTANGLE_PERIMETER_HINTS)
+
+    elif shape_type == "square":
+        side = rng.randint(5, 20)
+        perimeter = 4 * side
+
+        problem = f"Find the perimeter of a square with side length **{side} units**."
+
+        params = {'side': side, 'perimeter': perimeter}
+        text = LazyText(params, SQUARE_PERIMETER_STEPS, SQUARE_PERIMETER_HINTS)
+
+    else:  # triangle
+        side1 = rng.randint(5, 15)
+        side2 = rng.randint(5, 15)
+        side3 = rng.randint(max(side1, side2) - min(side1, side2) + 1, side1 + side2 - 1)  # Triangle inequality
+        perimeter = side1 + side2 + side3
+
+        problem = f"Find the perimeter of a triangle with sides **{side1} units**, **{side2} units**, and **{side3} units**."
+
+        params = {'side1': side1, 'side2': side2, 'side3': side3, 'perimeter': perimeter}
+        text = LazyText(params, TRIANGLE_PERIMETER_STEPS, TRIANGLE_PERIMETER_HINTS)
+
+    answer = str(perimeter)
+    return problem, answer, text, "Find the Perimeter:"
+
+
+CIRCLE_AREA_STEPS = (
+    "🎯 **Finding circle area:** Use the formula Area = π × r².",
+    "**Step 1: Identify the formula:** Area = π × radius²",
+    "**Step 2: Substitute the values:** Area = 3.14 × {radius}²",
+    "**Step 3: Calculate the square:** {radius}² = {r_squared}",
+    "**Step 4: Multiply by π:** 3.14 × {r_squared} = **{area}**",
+    "✨ **Final Answer:** {area} square units"
+)
+
+CIRCLE_AREA_HINTS = (
+    "💡 **Use the circle area formula!** Area = π × radius²",
+    "💡 **Square the radius first!** {radius}² = {r_squared}",
+    "💡 **Then multiply by π (3.14)!** 3.14 × {r_squared}"
+)
+
+def gen_circle_area(rng):
+    """Generate a problem to find the area of a circle."""
+    # Use simple radius values to avoid complex calculations
+    radius = rng.randint(1, 10)
+
+    # Use 3.14 for pi to keep calculations simple
+    pi = 3.14
+    area = pi * radius * radius
+
+    # Round to 2 decimal places for simplicity
+    area = round(area, 2)
+
+    problem = f"Find the area of a circle with radius **{radius} units**. Use π = 3.14."
+    answer = str(area)
+
+    params = {'radius': radius, 'r_squared': radius * radius, 'area': area}
+
+    return problem, answer, LazyText(params, CIRCLE_AREA_STEPS, CIRCLE_AREA_HINTS), "Find the Area:"
+
+
+def gen_geometry(rng):
+    """Pick a random geometry problem type."""
+    generators = [
+        gen_rectangle_area,
+        gen_triangle_area,
+        gen_perimeter,
+        gen_circle_area
+    ]
+    return rng.choice(generators)(rng)
+
+
+# ============================================================================
+# PERCENTAGE PROBLEM GENERATORS
+# ============================================================================
+
+def hundredths(value):
+    """value/100 written like str(float) would, without the float error: 5715 -> "57.15", 5750 -> "57.5", 5700 -> "57"."""
+    whole, cents = divmod(abs(value), 100)
+    text = f"{whole}.{cents:02d}".rstrip('0') if cents else str(whole)
+    return '-' + text if value < 0 else text
+
+BASIC_PERCENTAGE_STEPS = (
+    "🎯 **Finding a percentage:** Convert the percentage to a decimal, then multiply.",
+    "**Step 1: Convert {percentage}% to a decimal:** {percentage}% = {decimal}",
+    "**Step 2: Multiply by the whole amount:** {decimal} × {whole} = **{result}**",
+    "✨ **Final Answer:** {answer}"
+)
+
+BASIC_PERCENTAGE_HINTS = (
+    "💡 **Convert to decimal first!** {percentage}% means {percentage} out of 100, or {decimal}.",
+    "💡 **Use the formula:** Percentage of a number = (percentage/100) × number",
+    "💡 **Calculate:** {decimal} × {whole} = ?"
+)
+
+def gen_basic_percentage(rng):
+    """Generate a basic percentage calculation problem."""
+    whole = rng.randint(20, 200)
+    percentage = rng.randint(5, 95)
+
+    # Ensure percentage is a nice number (multiple of 5)
+    percentage = (percentage // 5) * 5
+
+    result = whole * percentage / 100
+
+    problem = f"What is **{percentage}%** of **{whole}**?"
+    answer = str(int(result)) if result.is_integer() else str(result)
+
+    params = {'whole': whole, 'percentage': percentage, 'decimal': percentage / 100, 'result': result, 'answer': answer}
+
+    return problem, answer, LazyText(params, BASIC_PERCENTAGE_STEPS, BASIC_PERCENTAGE_HINTS), "Find the Percentage:"
+
+
+PERCENTAGE_INCREASE_STEPS = (
+    "🎯 **Percentage increase:** Find the increase, then add to original.",
+    "**Step 1: Calculate the increase:** {percentage}% of {original} = {decimal} × {original} = {increase}",
+    "**Step 2: Add the increase to the original:** {original} + {increase} = **{new_value}**",
+    "✨ **Final Answer:** {answer}"
+)
+
+PERCENTAGE_INCREASE_HINTS = (
+    "💡 **First find the amount of increase!** {percentage}% of {original}",
+    "💡 **Then add to the original value!** Original + Increase = New Value",
+    "💡 **Calculate:** {original} + ({decimal} × {original}) = ?"
+)
+
+PERCENTAGE_INCREASE_MISTAKES = {
+    'change_only': "💡 **That's just the increase!** Add it to the original: {original} + {increase}.",
+    'subtracted': "💡 **It's an increase, so add!** {original} + {increase}, not {original} - {increase}.",
+    'percent_as_number': "💡 **{percentage}% isn't the same as {percentage}!** Find {percentage}% of {original} first: {decimal} × {original} = {increase}.",
+}
+
+def gen_percentage_increase(rng):
+    """Generate a percentage increase problem."""
+    original = rng.randint(20, 200)
+    percentage = rng.randint(5, 100)
+
+    # Ensure percentage is a nice number (multiple of 5)
+    percentage = (percentage // 5) * 5
+
+    # In hundredths, so the answer and the keys are exact
+    increase_100 = original * percentage
+    new_value_100 = original * 100 + increase_100
+
+    problem = f"A value of **{original}** increases by **{percentage}%**. What is the new value?"
+    answer = hundredths(new_value_100)
+
+    params = {
+        'original': original, 'percentage': percentage, 'decimal': percentage / 100,
+        'increase': hundredths(increase_100), 'new_value': answer, 'answer': answer
+    }
+
+    mistakes = mistake_map(
+        number_key(new_value_100, 100), PERCENTAGE_INCREASE_MISTAKES,
+        (number_key(increase_100, 100), 'change_only'),
+        (number_key(original * 100 - increase_100, 100), 'subtracted'),
+        (number_key(original + percentage), 'percent_as_number'),
+    )
+
+    return problem, answer, LazyText(params, PERCENTAGE_INCREASE_STEPS, PERCENTAGE_INCREASE_HINTS, mistakes), "Find the New Value:"
+
+
+PERCENTAGE_DECREASE_STEPS = (
+    "🎯 **Percentage decrease:** Find the discount, then subtract from original.",
+    "**Step 1: Calculate the discount:** {percentage}% of ${original} = {decimal} × ${original} = ${decrease}",
+    "**Step 2: Subtract the discount from the original:** ${original} - ${decrease} = **${new_value}**",
+    "✨ **Final Answer:** ${answer}"
+)
+
+PERCENTAGE_DECREASE_HINTS = (
+    "💡 **First find the amount of discount!** {percentage}% of ${original}",
+    "💡 **Then subtract from the original price!** Original - Discount = Sale Price",
+    "💡 **Calculate:** ${original} - ({decimal} × ${original}) = ?"
+)
+
+PERCENTAGE_DECREASE_MISTAKES = {
+    'change_only': "💡 **That's the discount, not the sale price!** Take it off the original: {original} - {decrease}.",
+    'added': "💡 **A discount makes the price smaller!** Subtract: {original} - {decrease}.",
+    'percent_as_number': "💡 **{percentage}% off isn't ${percentage} off!** Find {percentage}% of {original} first: {decimal} × {original} = {decrease}.",
+}
+
+def gen_percentage_decrease(rng):
+    """Generate a percentage decrease problem."""
+    original = rng.randint(50, 500)
+    percentage = rng.randint(5, 75)
+
+    # Ensure percentage is a nice number (multiple of 5)
+    percentage = (percentage // 5) * 5
+
+    # In hundredths, so the answer and the keys are exact
+    decrease_100 = original * percentage
+    new_value_100 = original * 100 - decrease_100
+
+    problem = f"A price of **${original}** is discounted by **{percentage}%**. What is the sale price?"
+    answer = hundredths(new_value_100)
+
+    params = {
+        'original': original, 'percentage': percentage, 'decimal': percentage / 100,
+        'decrease': hundredths(decrease_100), 'new_value': answer, 'answer': answer
+    }
+
+    mistakes = mistake_map(
+        number_key(new_value_100, 100), PERCENTAGE_DECREASE_MISTAKES,
+        (number_key(decrease_100, 100), 'change_only'),
+        (number_key(original * 100 + decrease_100, 100), 'added'),
+        (number_key(original - percentage), 'percent_as_number'),
+    )
+
+    return problem, answer, LazyText(params, PERCENTAGE_DECREASE_STEPS, PERCENTAGE_DECREASE_HINTS, mistakes), "Find the Sale Price:"
+
+
+FIND_PERCENTAGE_STEPS = (
+    "🎯 **Finding the percentage:** Divide the part by the whole, then multiply by 100.",
+    "**Step 1: Set up the equation:** Percentage = (Part ÷ Whole) × 100%",
+    "**Step 2: Calculate:** ({part} ÷ {whole}) × 100% = {ratio:.4f} × 100% = **{percentage}%**",
+    "✨ **Final Answer:** {percentage}%"
+)
+
+FIND_PERCENTAGE_HINTS = (
+    "💡 **Use the formula:** Percentage = (Part ÷ Whole) × 100%",
+    "💡 **Divide first!** {part} ÷ {whole} = {ratio:.4f}",
+    "💡 **Then convert to percentage!** {ratio:.4f} × 100% = {percentage}%"
+)
+
+def gen_find_percentage(rng):
+    """Generate a problem to find what percentage one number is of another."""
+    percentage = rng.randint(1, 19) * 5
+    # The whole has to be a multiple of this for the part to be a whole number
+    step = 100 // math.gcd(percentage, 100)
+    whole = rng.randint(-(-20 // step), 100 // step) * step
+    part = whole * percentage // 100
+
+    problem = f"**{part}** is what percentage of **{whole}**?"
+    answer = str(percentage)
+
+    params = {'whole': whole, 'part': part, 'ratio': part / whole, 'percentage': percentage}
+
+    return problem, answer, LazyText(params, FIND_PERCENTAGE_STEPS, FIND_PERCENTAGE_HINTS), "Find What Percent:"
+
+
+PERCENT_TO_DECIMAL_STEPS = (
+    "🎯 **Percent to Decimal:** Divide by 100 (or move decimal point 2 places left).",
+    "**Step 1: Divide by 100:** {percentage}% = {percentage} ÷ 100",
+    "**Step 2: Calculate:** {percentage} ÷ 100 = **{decimal}**",
+    "✨ **Final Answer:** {decimal}"
+)
+
+PERCENT_TO_DECIMAL_HINTS = (
+    "💡 **Think: Percent means 'per 100'!** So {percentage}% = {percentage}/100",
+    "💡 **Shortcut:** Move the decimal point 2 places to the LEFT!",
+    "💡 **Answer:** {percentage}% = {decimal}"
+)
+
+DECIMAL_TO_PERCENT_STEPS = (
+    "🎯 **Decimal to Percent:** Multiply by 100 (or move decimal point 2 places right).",
+    "**Step 1: Multiply by 100:** {decimal} × 100",
+    "**Step 2: Calculate:** {decimal} × 100 = {percentage}",
+    "**Step 3: Add percent sign:** **{percentage}%**",
+    "✨ **Final Answer:** {percentage}%"
+)
+
+DECIMAL_TO_PERCENT_HINTS = (
+    "💡 **Move the decimal point 2 places to the RIGHT!** Then add %",
+    "💡 **Or multiply by 100:** {decimal} × 100 = {percentage}",
+    "💡 **Answer:** {decimal} = {percentage}%"
+)
+
+PERCENT_TO_FRACTION_STEPS = (
+    "🎯 **Percent to Fraction:** Write as a fraction over 100, then simplify.",
+    "**Step 1: Write as fraction:** {percentage}% = {percentage}/100",
+    "**Step 2: Simplify:** {percentage}/100 = **{fraction}**",
+    "✨ **Final Answer:** {fraction}"
+)
+
+PERCENT_TO_FRACTION_HINTS = (
+    "💡 **Percent means 'out of 100'!** So {percentage}% = {percentage}/100",
+    "💡 **Now simplify the fraction!** Find the GCD and reduce.",
+    "💡 **Answer:** {percentage}/100 = {fraction}"
+)
+
+FRACTION_TO_PERCENT_STEPS = (
+    "🎯 **Fraction to Percent:** Convert to decimal, then multiply by 100.",
+    "**Step 1: Divide:** {fraction_str} = {numerator} ÷ {denominator} = {decimal}",
+    "**Step 2: Multiply by 100:** {decimal} × 100 = {percentage}",
+    "**Step 3: Add percent sign:** **{percentage}%**",
+    "✨ **Final Answer:** {percentage}%"
+)
+
+FRACTION_TO_PERCENT_HINTS = (
+    "💡 **First convert to decimal!** {fraction_str} = {numerator} ÷ {denominator}",
+    "💡 **Then multiply by 100:** {decimal} × 100 = {percentage}",
+    "💡 **Answer:** {fraction_str} = {percentage}%"
+)
+
+def gen_percent_decimal_fraction(rng):
+    """Generate conversion problems between percent, decimal, and fraction."""
+
+    conversion_type = rng.choice(['percent_to_decimal', 'decimal_to_percent', 'percent_to_fraction', 'fraction_to_percent'])
+
+    if conversion_type == 'percent_to_decimal':
+        percentage = rng.choice([25, 50, 75, 20, 40, 60, 80, 10, 30, 70, 90])
+        decimal = percentage / 100
+
+        problem = f"Convert **{percentage}%** to a decimal."
+        answer = str(decimal)
+
+        params = {'percentage': percentage, 'decimal': decimal}
+        text = LazyText(params, PERCENT_TO_DECIMAL_STEPS, PERCENT_TO_DECIMAL_HINTS)
+        label = "Convert to a Decimal:"
+
+    elif conversion_type == 'decimal_to_percent':
+        decimals = [0.25, 0.5, 0.75, 0.2, 0.4, 0.6, 0.8, 0.1, 0.3, 0.7, 0.9]
+        decimal = rng.choice(decimals)
+        percentage = int(decimal * 100)
+
+        problem = f"Convert **{decimal}** to a percent."
+        answer = f"{percentage}"
+
+        params = {'percentage': percentage, 'decimal': decimal}
+        text = LazyText(params, DECIMAL_TO_PERCENT_STEPS, DECIMAL_TO_PERCENT_HINTS)
+        label = "Convert to a Percent:"
+
+    elif conversion_type == 'percent_to_fraction':
+        percentages = [25, 50, 75, 20, 40, 60, 80, 10, 30, 70, 90]
+        percentage = rng.choice(percentages)
+        fraction = Fraction(percentage, 100)
+
+        problem = f"Convert **{percentage}%** to a simplified fraction."
+        answer = str(fraction)
+
+        params = {'percentage': percentage, 'fraction': answer}
+        text = LazyText(params, PERCENT_TO_FRACTION_STEPS, PERCENT_TO_FRACTION_HINTS)
+        label = "Convert to a Fraction:"
+
+    else:  # fraction_to_percent
+        fractions = [
+            (Fraction(1, 4), "1/4"),
+            (Fraction(1, 2), "1/2"),
+            (Fraction(3, 4), "3/4"),
+            (Fraction(1, 5), "1/5"),
+            (Fraction(2, 5), "2/5"),
+            (Fraction(3, 5), "3/5"),
+            (Fraction(4, 5), "4/5")
+        ]
+        fraction, fraction_str = rng.choice(fractions)
+        percentage = int(fraction * 100)
+
+        problem = f"Convert **{fraction_str}** to a percent."
+        answer = str(percentage)
+
+        params = {
+            'fraction_str': fraction_str, 'numerator': fraction.numerator, 'denominator': fraction.denominator,
+            'decimal': float(fraction), 'percentage': percentage
+        }
+        text = LazyText(params, FRACTION_TO_PERCENT_STEPS, FRACTION_TO_PERCENT_HINTS)
+        label = "Convert to a Percent:"
+
+    return problem, answer, text, label
+
+
+PERCENT_AS_PROPORTION_STEPS = (
+    "🎯 **Percent as Proportion:** part/whole = percent/100",
+    "**Step 1: Set up proportion:** {part}/x = {percentage}/100",
+    "**Step 2: Cross-multiply:** {percentage} × x = {part} × 100",
+    "**Step 3: Calculate right side:** {part} × 100 = {part_times_100}",
+    "**Step 4: Solve for x:** x = {part_times_100}/{percentage} = **{whole}**",
+    "✨ **Final Answer:** {whole}"
+)
+
+PERCENT_AS_PROPORTION_HINTS = (
+    "💡 **Use the proportion formula!** part/whole = percent/100",
+    "💡 **We know the part ({part}) and percent ({percentage}), find the whole!**",
+    "💡 **Cross-multiply:** {percentage} × x = {part} × 100, so x = {part_times_100} ÷ {percentage} = {whole}"
+)
+
+def gen_percent_as_proportion(rng):
+    """Generate problems expressing percent problems as proportions."""
+
+    percentage = rng.choice([10, 20, 25, 30, 40, 50, 60, 75, 80])
+    # The whole has to be a multiple of this for the part to be a whole number
+    step = 100 // math.gcd(percentage, 100)
+    whole = rng.randint(-(-20 // step), 100 // step) * step
+    part = whole * percentage // 100
+
+    problem = f"**{part}** is **{percentage}%** of what number? (Set up and solve as a proportion: part/whole = percent/100)"
+
+    answer = str(whole)
+
+    params = {'whole': whole, 'percentage': percentage, 'part': part, 'part_times_100': part * 100}
+
+    return problem, answer, LazyText(params, PERCENT_AS_PROPORTION_STEPS, PERCENT_AS_PROPORTION_HINTS), "Solve the Proportion:"
+
+
+PERCENT_OF_CHANGE_STEPS = (
+    "🎯 **Percent of Change Formula:** (Change ÷ Original) × 100%",
+    "**Step 1: Find the amount of change:** |{new_value} - {original}| = {change}",
+    "**Step 2: Divide by original:** {change} ÷ {original} = {ratio:.4f}",
+    "**Step 3: Convert to percent:** {ratio:.4f} × 100% = **{percent_change}%**",
+    "✨ **Final Answer:** {percent_change}% {change_type}"
+)
+
+PERCENT_OF_CHANGE_HINTS = (
+    "💡 **First find the change!** New value - Original value = {new_value} - {original} = {change}",
+    "💡 **Use the formula:** (Change ÷ Original) × 100%",
+    "💡 **Calculate:** ({change} ÷ {original}) × 100% = {percent_change}%"
+)
+
+PERCENT_OF_CHANGE_MISTAKES = {
+    'divided_by_new': "💡 **Divide by the original!** Percent of change compares the change to where you started: {change} ÷ {original}, not {change} ÷ {new_value}.",
+    'change_only': "💡 **That's the change, not the percent!** Divide it by the original and multiply by 100%: ({change} ÷ {original}) × 100%.",
+    'not_times_100': "💡 **Turn it into a percent!** Multiply by 100: {ratio:.4f} × 100% = {percent_change}%.",
+}
+
+def gen_percent_of_change(rng):
+    """Generate percent of change problems (general formula)."""
+
+    change_type = rng.choice(['increase', 'decrease'])
+
+    if change_type == 'increase':
+        original = rng.randint(40, 200)
+        change = rng.randint(10, 50)
+        new_value = original + change
+
+        problem = f"A value increases from **{original}** to **{new_value}**. What is the **percent of change**?"
+
+    else:  # decrease
+        original = rng.randint(60, 200)
+        change = rng.randint(10, 50)
+        new_value = original - change
+
+        problem = f"A value decreases from **{original}** to **{new_value}**. What is the **percent of change**?"
+
+    percent_change = round((change / original) * 100, 1)
+    answer = str(percent_change) if percent_change % 1 != 0 else str(int(percent_change))
+
+    params = {
+        'change_type': change_type, 'original': original, 'change': change, 'new_value': new_value,
+        'ratio': change / original, 'percent_change': percent_change
+    }
+
+    # In tenths of a percent, like the answer
+    tenths = round(percent_change * 10)
+    mistakes = mistake_map(
+        number_key(tenths, 10), PERCENT_OF_CHANGE_MISTAKES,
+        (number_key(round(change / new_value * 1000), 10), 'divided_by_new'),
+        (number_key(change), 'change_only'),
+        (number_key(tenths, 1000), 'not_times_100'),
+    )
+
+    return problem, answer, LazyText(params, PERCENT_OF_CHANGE_STEPS, PERCENT_OF_CHANGE_HINTS, mistakes), "Find Percent of Change:"
+
+
+def gen_percentage(rng):
+    """Pick a random percentage problem type."""
+    generators = [
+        gen_basic_percentage,
+        gen_percentage_increase,
+        gen_percentage_decrease,
+        gen_find_percentage,
+        gen_percent_decimal_fraction,
+        gen_percent_as_proportion,
+        gen_percent_of_change
+    ]
+    return rng.choice(generators)(rng)
+
+
+# ============================================================================
+# GENERATOR SETS
+# ============================================================================
+
+GENERATOR_SETS = {
+    'simplify': [
+        gen_distribute_combine, 
+        gen_distribute_negative,
+        gen_multi_distribute,
+        gen_fraction_simplify,
+        gen_multi_variable_combine,
+        gen_fraction_simplify_mixed
+    ],
+    'equations': [
+        gen_linear_eq, 
+        gen_distribute_eq, 
+        gen_fraction_eq
+    ],
+    'rates': [
+        gen_unit_rate
+    ],
+    'percentages': [
+        gen_percentage
+    ],
+    'geometry': [
+        gen_geometry
+    ]
+}
+
+# ============================================================================
+# TOPICS
+# ============================================================================
+
+# How students may write each kind of numeric answer (see checking.AnswerRule)
+SOLVE_FOR_X = AnswerRule(variable='x')
+SOLVE_FOR_K = AnswerRule(variable='k')
+AMOUNT = AnswerRule(units=ANY_UNIT, variable='x', sign=POSITIVE_SIGN)
+PERCENT = AnswerRule(units=['%'])
+PERCENT_OF_CHANGE = AnswerRule(units=['%'], sign=MAGNITUDE_SIGN)
+MONEY = AnswerRule(units=['$', 'dollars'])
+LENGTH_OR_AREA = AnswerRule(units=['units', 'square units', 'sq units', 'units²', 'units^2'], sign=POSITIVE_SIGN)
+
+# Topics that mix kinds of answer pick the rule by problem label: only
+# answers that are a percent take "%", and only prices take "$"
+CONVERSION_RULES = {"Convert to a Percent:": PERCENT}
+PERCENT_CHANGE_RULES = {"Find the Sale Price:": MONEY}
+# "Find the Percentage:" (gen_basic_percentage) is a plain number, so it isn't listed
+PERCENTAGE_RULES = {
+    "Find What Percent:": PERCENT,
+    "Find the Sale Price:": MONEY,
+    "Convert to a Percent:": PERCENT,
+    "Find Percent of Change:": PERCENT_OF_CHANGE,
+}
+
+# Built-in topics in sidebar order. Topics without a menu_label are legacy
+# catch-all types kept so old links and saved sessions still work.
+TOPICS = [
+    Topic('simplify', pick(GENERATOR_SETS['simplify']), label="Simplify:",
+          menu_label="📐 Simplifying Expressions",
+          focus_rule="Match up the X's with the X's, and the numbers with the numbers! 🍎=🍎"),
+    Topic('equations', pick(GENERATOR_SETS['equations']), label="Solve for x:",
+          menu_label="🎯 Solving Equations",
+          focus_rule="Golden Rule: What you do to one side, you MUST do to the other! ⚖️",
+          answer_rule=SOLVE_FOR_X),
+    Topic('unit_rate_basic', gen_unit_rate_basic,
+          menu_label="➗ Unit Rates (Basic)",
+          focus_rule="Unit Rate: Always divide to find the cost or amount for ONE unit! 💲/1",
+          answer_rule=AMOUNT),
+    Topic('equivalent_ratios', gen_equivalent_ratios,
+          menu_label="🔢 Equivalent Ratios",
+          focus_rule="Equivalent Ratios: Find the multiplier! If 3 becomes 9 (×3), then 4 becomes 12 (×3)! 🔢",
+          answer_rule=AMOUNT),
+    Topic('proportions', gen_solving_proportions,
+          menu_label="📊 Proportions & Cross-Multiplication",
+          focus_rule="Cross-Multiply: a/b = c/d means a×d = b×c! Make an X! ✖️",
+          answer_rule=AMOUNT),
+    Topic('constant_k', gen_constant_proportionality,
+          menu_label="⚡ Constant of Proportionality",
+          focus_rule="Proportional Relationships: k = y/x is always the same! Find the pattern! 📊",
+          answer_rule=SOLVE_FOR_K),
+    Topic('prop_graphs', gen_proportional_graph,
+          menu_label="📈 Proportional Graphs",
+          focus_rule="Proportional Relationships: k = y/x is always the same! Find the pattern! 📊",
+          answer_rule=SOLVE_FOR_K),
+    Topic('ratio_fractions', gen_ratio_fractions,
+          menu_label="🍰 Ratio Scaling with Fractions",
+          focus_rule="Scaling Ratios: Multiply by the fraction! 1/2 of 6 = 6 × 1/2 = 3! 🍰",
+          answer_rule=AMOUNT),
+    Topic('basic_percent', gen_basic_percentage,
+          menu_label="💯 Basic Percentages",
+          focus_rule="Percentage: Part/Whole × 100% = Percentage! 🧩/🧩🧩🧩 × 100% = 25%"),
+    Topic('percent_change_basic', pick([gen_percentage_increase, gen_percentage_decrease]),
+          menu_label="📈 Percent Increase/Decrease",
+          focus_rule="Percent Change: Find the change amount, then divide by original! 📈📉",
+          answer_rule=PERCENT_CHANGE_RULES),
+    Topic('percent_conversions', gen_percent_decimal_fraction,
+          menu_label="🔄 Percent-Decimal-Fraction Conversions",
+          focus_rule="Converting: Percent ↔ Decimal ↔ Fraction. Move decimal 2 places! 🔄",
+          answer_rule=CONVERSION_RULES),
+    Topic('percent_proportion', gen_percent_as_proportion,
+          menu_label="⚖️ Percent as Proportion",
+          focus_rule="Percent Proportion: part/whole = percent/100. Cross-multiply to solve! ⚖️"),
+    Topic('percent_of_change', gen_percent_of_change,
+          menu_label="📉 Percent of Change",
+          focus_rule="Percent of Change: (Change ÷ Original) × 100% 📊",
+          answer_rule=PERCENT_OF_CHANGE),
+    Topic('geometry', pick(GENERATOR_SETS['geometry']),
+          menu_label="📏 Geometry (Area & Perimeter)",
+          focus_rule="Geometry: Know your formulas! Area of rectangle = Length × Width 📏",
+          answer_rule=LENGTH_OR_AREA),
+    Topic('rates', pick(GENERATOR_SETS['rates']),
+          focus_rule="Unit Rate: Always divide to find the cost or amount for ONE unit! 💲/1",
+          answer_rule=AMOUNT),
+    Topic('percentages', pick(GENERATOR_SETS['percentages']),
+          focus_rule="Percentage: Part/Whole × 100% = Percentage! 🧩/🧩🧩🧩 × 100% = 25%",
+          answer_rule=PERCENTAGE_RULES),
+]
+
+for topic in TOPICS:
+    register(topic)
+
+# Every built-in problem_type the app can ask for (Mixed Practice picks from these)
+PROBLEM_TYPES = [topic.problem_type for topic in TOPICS if topic.menu_label]
+
+# Unknown problem_types get equations
+DEFAULT_PROBLEM_TYPE = 'equations'
+
+def generate_new_problem(problem_type, seed=None, rng=None):
+    """Get a new Problem.
+
+    Passing a seed rebuilds that exact problem. Otherwise the problem is drawn
+    from the problem bank when one is built, or generated from a new seed;
+    either way the pick comes from rng (the session's random stream), so a
+    seeded session gets the same problems every time.
+    """
+    if seed is None:
+        problem = bank.draw_problem(problem_type, rng)
+        if problem is not None:
+            return problem
+        seed = new_seed(rng)
+    expr, answer, text, label = generate_live_problem(problem_type, make_rng(seed))
+    return Problem(problem_type, expr, answer, text, label, seed)
+
+# Seeds tried for a review problem that can show the mistake being reviewed
+REVIEW_DRAWS = 50
+
+def generate_review_problem(problem_type, pattern, rng=None):
+    """Get a new Problem for reviewing a missed (problem_type, pattern) skill.
+
+    pattern is the mistake code the student made, or None. A topic can mix
+    several kinds of problem, so seeds are drawn from rng until one gives a
+    problem whose mistake map has that code: a missed "-a(bx - c)" comes
+    back as another "-a(bx - c)", not any simplify problem. If none turns up
+    in REVIEW_DRAWS seeds, the last one is used.
+    """
+    if pattern is None:
+        return generate_new_problem(problem_type, rng=rng)
+    for _ in range(REVIEW_DRAWS):
+        seed = new_seed(rng)
+        expr, answer, text, label = generate_live_problem(problem_type, make_rng(seed))
+        mistakes = getattr(text, 'mistakes', None)
+        if mistakes and any(code == pattern for code, _ in mistakes.values()):
+            break
+    return Problem(problem_type, expr, answer, text, label, seed)
+
+def generate_live_problem(problem_type, rng=None):
+    """Generate a new problem based on type, as (expr, answer, text, label)."""
+    topic = get_topic(problem_type) or get_topic(DEFAULT_PROBLEM_TYPE)
+    return topic.make(as_random(rng))
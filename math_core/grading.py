@@ -0,0 +1,229 @@
+"""
+Bulk grading of worksheet answers.
+
+Every problem is identified by its problem_type and seed, written as a
+problem id like "equations:1234567890". A printed worksheet carries those
+ids, so the answers students wrote down can be graded in bulk instead of
+being typed into the app one at a time:
+
+    python -m math_core grade answers.csv -o graded.csv
+
+Input rows need an "answer" column and either "problem_id" or
+"problem_type" + "seed"; any other columns (student name, class...) are
+copied to the output. Each output row gets "correct", "correct_answer" and
+"error" (why a row couldn't be graded, if it couldn't).
+
+Rows are read, graded and written a chunk at a time across a process pool,
+with a fixed number of chunks in flight, so memory stays flat however long
+the input is and output keeps the input order.
+"""
+
+import collections
+import csv
+import functools
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from math_core.generators import generate_new_problem
+from math_core.registry import get_topic
+
+DEFAULT_CHUNK_SIZE = 2000
+RESULT_FIELDS = ['correct', 'correct_answer', 'error']
+
+
+# ============================================================================
+# PROBLEM IDS
+# ============================================================================
+
+def problem_id(problem):
+    """The id printed on worksheets: "<problem_type>:<seed>"."""
+    return f"{problem.problem_type}:{problem.seed}"
+
+
+def parse_problem_id(text):
+    """Split a problem id into (problem_type, seed)."""
+    problem_type, _, seed = text.strip().rpartition(':')
+    if not problem_type:
+        raise ValueError(f"not a problem id: {text!r}")
+    return problem_type, int(seed)
+
+
+def row_key(row):
+    """(problem_type, seed) for an input row."""
+    if row.get('problem_id'):
+        return parse_problem_id(row['problem_id'])
+    return row['problem_type'].strip(), int(row['seed'])
+
+
+# ============================================================================
+# GRADING
+# ============================================================================
+
+@functools.lru_cache(maxsize=4096)
+def _problem(problem_type, seed):
+    # A class grades the same few worksheets over and over
+    return generate_new_problem(problem_type, seed=seed)
+
+
+def grade_one(problem_type, seed, answer):
+    """Grade one answer; returns (correct, correct_answer)."""
+    problem = _problem(problem_type, seed)
+    return problem.check(answer), problem.answer
+
+
+def _grade_chunk(items):
+    """Grade (problem_type, seed, answer) items; runs in the worker processes."""
+    results = []
+    for item in items:
+        if isinstance(item, str):
+            results.append((None, None, item))
+            continue
+        try:
+            correct, correct_answer = grade_one(*item)
+        except Exception as exc:
+            results.append((None, None, f"{type(exc).__name__}: {exc}"))
+        else:
+            results.append((correct, correct_answer, None))
+    return results
+
+
+def _prepare(row):
+    """What a worker needs from a row, or an error message if the row is unusable."""
+    try:
+        problem_type, seed = row_key(row)
+    except (KeyError, ValueError, AttributeError, TypeError) as exc:
+        return f"bad problem id: {exc}"
+    # generate_new_problem would quietly make an equations problem instead
+    if get_topic(problem_type) is None:
+        return f"unknown problem type: {problem_type!r}"
+    # JSON answers can be numbers ("answer": 14); 0 is an answer, not a blank
+    answer = row.get('answer')
+    return problem_type, seed, "" if answer is None else str(answer)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def grade_rows(rows, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Grade an iterable of row dicts; yield each row with the result fields added, in order.
+
+    workers=1 grades in this process. Otherwise chunks go to a pool of
+    workers processes (os.cpu_count() by default), at most two per worker
+    at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def finish(chunk, results):
+        for row, (correct, correct_answer, error) in zip(chunk, results):
+            row['correct'] = correct
+            row['correct_answer'] = correct_answer
+            row['error'] = error
+            yield row
+
+    if workers == 1:
+        for chunk in _chunks(rows, chunk_size):
+            yield from finish(chunk, _grade_chunk([_prepare(row) for row in chunk]))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for chunk in _chunks(rows, chunk_size):
+            pending.append((chunk, pool.submit(_grade_chunk, [_prepare(row) for row in chunk])))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield from finish(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from finish(chunk, future.result())
+
+
+# ============================================================================
+# FILES
+# ============================================================================
+
+def _format(path, given):
+    if given:
+        return given
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(f, fmt):
+    """Open a CSV (with a header) or JSONL file as (column names or None, stream of row dicts)."""
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        return reader.fieldnames, reader
+    return None, (json.loads(line) for line in f if line.strip())
+
+
+def write_rows(rows, f, fmt, fieldnames=None):
+    """Stream graded rows to a CSV or JSONL file; return how many were written."""
+    count = 0
+    writer = None
+    for row in rows:
+        if fmt == 'jsonl':
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            if writer is None:
+                names = list(fieldnames or row)
+                names += [name for name in RESULT_FIELDS if name not in names]
+                writer = csv.DictWriter(f, names, extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow(row)
+        count += 1
+    return count
+
+
+def grade_command(args):
+    in_format = _format(args.input, args.input_format)
+    # Default to the output file's extension, or to the input's format on stdout
+    to_stdout = not args.output or args.output == '-'
+    out_format = args.output_format or (in_format if to_stdout else _format(args.output, None))
+    infile = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    outfile = sys.stdout if to_stdout else open(args.output, 'w', newline='', encoding='utf-8')
+
+    stats = collections.Counter()
+
+    def counted(rows):
+        for row in rows:
+            stats['rows'] += 1
+            if row['error']:
+                stats['errors'] += 1
+            elif row['correct']:
+                stats['correct'] += 1
+            yield row
+
+    start = time.perf_counter()
+    try:
+        fieldnames, rows = read_rows(infile, in_format)
+        write_rows(counted(grade_rows(rows, args.workers, args.chunk_size)), outfile, out_format, fieldnames)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"graded {stats['rows']:,} rows in {elapsed:.2f}s ({stats['rows'] / elapsed:,.0f} rows/s): "
+          f"{stats['correct']:,} correct, {stats['errors']:,} errors", file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+def add_parser(commands):
+    grade = commands.add_parser('grade', help="grade a CSV/JSONL file of worksheet answers")
+    grade.add_argument('input', help="CSV or JSONL file of answers ('-' for stdin)")
+    grade.add_argument('-o', '--output', help="where to write graded rows (default: stdout)")
+    grade.add_argument('--input-format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    grade.add_argument('--output-format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    grade.add_argument('--workers', type=int, help="grading processes (default: one per CPU; 1 = no pool)")
+    grade.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per task")
+    grade.set_defaults(func=grade_command)
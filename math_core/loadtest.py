@@ -0,0 +1,432 @@
+"""
+Load test: many students using the Streamlit app at once.
+
+Starts one `streamlit run` server for math_practice.py and connects N
+scripted students to it over Streamlit's websocket protocol, the way N
+browser tabs would, so they share one process, its caches and its prefetch
+pool just as sessions on a real server do. (Streamlit's AppTest can't do
+this: it swaps process-wide Streamlit globals on every run.) Needs
+streamlit installed; nothing else in math_core does. Every session does
+what a student does, round after round:
+
+    topic    pick a topic in the sidebar
+    hint     ask for a hint
+    wrong    submit a wrong answer
+    next     go on to the next problem
+    right    submit the right answer
+    skip     go on, then skip that problem
+    mixed    switch to Mixed Practice and take a new problem
+
+and the harness reports p50/p95/p99 wall time for each kind of interaction,
+from sending it to the server until the script run it caused has finished
+(fragment reruns included, as a browser sees them), CPU time the server
+spends per interaction and how much the server's resident memory grows per
+session (after an untimed warm-up session). CPU and memory are read from
+/proc, so they are only reported on Linux.
+
+    python -m math_core loadtest --sessions 20 --rounds 5 --save load.json
+    python -m math_core loadtest --sessions 20 --baseline load.json
+
+The server's event log and session store go to a temporary directory that
+is removed afterwards. The harness finds each problem's answer through the
+"show" events the app logs there, so answering waits for the log's next
+flush; that wait is a student's thinking time and isn't counted. Session
+choices come from --seed, so runs are comparable from one run to the next
+on the same machine (the problems themselves come from each session's own
+rng, as in the app). With --baseline, an interaction whose p95 grows by
+more than the threshold is a regression and the command exits with status 1.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from math_core.events import parse_name
+from math_core.generators import generate_new_problem
+from math_core.registry import MIXED_PRACTICE, menu_labels
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'math_practice.py')
+DEFAULT_SESSIONS = 10
+DEFAULT_ROUNDS = 3
+DEFAULT_THRESHOLD = 0.25
+RUN_TIMEOUT = 60
+START_TIMEOUT = 60
+
+INTERACTIONS = ('start', 'topic', 'hint', 'wrong', 'next', 'right', 'skip', 'mixed')
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """A `streamlit run` of the app in its own process, with its event log and store in directory."""
+
+    def __init__(self, app_path, directory):
+        self.port = _free_port()
+        self.event_dir = os.path.join(directory, 'events')
+        env = dict(os.environ, MATH_EVENT_DIR=self.event_dir,
+                   MATH_SESSION_STORE='sqlite:///' + os.path.join(directory, 'progress.db'))
+        self.log_path = os.path.join(directory, 'server.log')
+        with open(self.log_path, 'wb') as log:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'streamlit', 'run', app_path,
+                 '--server.headless=true', '--server.address=127.0.0.1', f'--server.port={self.port}',
+                 '--server.fileWatcherType=none', '--server.enableXsrfProtection=false',
+                 '--browser.gatherUsageStats=false'],
+                env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        with open(self.log_path, encoding='utf-8', errors='replace') as f:
+            log = f.read()[-2000:]
+        raise RuntimeError(f"streamlit server did not start:\n{log}")
+
+    def cpu_seconds(self):
+        """User plus system CPU time of the server process, or None without /proc."""
+        try:
+            with open(f'/proc/{self.process.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def rss_bytes(self):
+        """Resident memory of the server process, or None without /proc."""
+        try:
+            with open(f'/proc/{self.process.pid}/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            return None
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def __enter__(self):
+        try:
+            self.wait_ready()
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ============================================================================
+# SCRIPTED SESSIONS
+# ============================================================================
+
+class StudentSession:
+    """One scripted student on a websocket, with the time of every interaction.
+
+    Keeps the elements of the page by delta path, as the browser does, to
+    find the widgets to use and the problem on screen.
+    """
+
+    def __init__(self, server, seed):
+        self.server = server
+        self.student_id = f"loadtest-{seed}"
+        self.choices = random.Random(seed)
+        self.times = {name: [] for name in INTERACTIONS}
+        self.ws = None
+        self.page_hash = ''
+        # delta path -> (element, id of the fragment that drew it or '')
+        self.elements = {}
+        # widget id -> WidgetState for the values set so far (the radio)
+        self.values = {}
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self.ws = await websocket_connect(self.server.url, subprotocols=['streamlit'],
+                                          max_message_size=64 * 1024 * 1024)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def _run(self, name, widgets=(), fragment_id=''):
+        """Ask for a script run with these widget states and time it until the run finishes."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.query_string = f"student={self.student_id}"
+        state.page_script_hash = self.page_hash
+        state.fragment_id = fragment_id
+        for widget in list(self.values.values()) + list(widgets):
+            state.widget_states.widgets.add().CopyFrom(widget)
+        start = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._until_finished(name), RUN_TIMEOUT)
+        self.times[name].append(time.perf_counter() - start)
+
+    async def _until_finished(self, name):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        finished = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise RuntimeError(f"server closed the connection during {name}")
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            kind = msg.WhichOneof('type')
+            if kind == 'new_session':
+                self.page_hash = msg.new_session.page_script_hash
+                rerun = set(msg.new_session.fragment_ids_this_run)
+                # A full run redraws the page; a fragment run only its fragment
+                self.elements = {path: drawn for path, drawn in self.elements.items()
+                                 if rerun and drawn[1] not in rerun}
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(f"app raised during {name}: {element.exception.message}")
+                self.elements[tuple(msg.metadata.delta_path)] = (element, msg.delta.fragment_id)
+            elif kind == 'script_finished':
+                if msg.script_finished in finished:
+                    return
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError(f"app failed to compile during {name}")
+
+    def _widget(self, kind, label):
+        """(widget proto, fragment id) of the first kind widget on the page whose label has label in it."""
+        for element, fragment_id in self.elements.values():
+            if element.WhichOneof('type') == kind and label in getattr(element, kind).label:
+                return getattr(element, kind), fragment_id
+        raise RuntimeError(f"no {kind} {label!r} on the page")
+
+    async def _click(self, name, label, *inputs):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        button, fragment_id = self._widget('button', label)
+        await self._run(name, [WidgetState(id=button.id, trigger_value=True), *inputs], fragment_id)
+
+    async def _choose(self, name, option):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        radio, fragment_id = self._widget('radio', "What do you want to practice?")
+        self.values[radio.id] = WidgetState(id=radio.id, int_value=list(radio.options).index(option))
+        await self._run(name, fragment_id=fragment_id)
+
+    async def _answer(self, name, text):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        box, _ = self._widget('text_input', "Type your answer")
+        await self._click(name, "Submit", WidgetState(id=box.id, string_value=text))
+
+    def _shown_keys(self):
+        """(problem_type, seed) of every problem the app logged showing this student, newest first."""
+        paths = glob.glob(os.path.join(self.server.event_dir, 'events-*.jsonl*'))
+        keys = []
+        for path in sorted(paths, key=lambda path: parse_name(path)[1]):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if '"show"' in line and self.student_id in line:
+                        record = json.loads(line)
+                        keys.append((record['problem_type'], record['seed']))
+        return reversed(keys)
+
+    async def _problem(self):
+        """The problem on screen, rebuilt from its "show" event once the log has it."""
+        page = [element.markdown.body for element, _ in self.elements.values()
+                if element.WhichOneof('type') == 'markdown']
+        deadline = time.monotonic() + RUN_TIMEOUT
+        while time.monotonic() < deadline:
+            for problem_type, seed in self._shown_keys():
+                problem = generate_new_problem(problem_type, seed=seed)
+                if any(f"`{problem.expr}`" in body for body in page):
+                    return problem
+            await asyncio.sleep(0.1)
+        raise RuntimeError(f"{self.student_id}: the problem on screen never showed up in the event log")
+
+    async def play(self, rounds):
+        topics = [label for label in menu_labels() if label != MIXED_PRACTICE]
+        await self.connect()
+        await self._run('start')
+        for _ in range(rounds):
+            await self._choose('topic', self.choices.choice(topics))
+            await self._click('hint', "Hint")
+            await self._answer('wrong', (await self._problem()).answer + "+1")
+            await self._click('next', "Next Problem")
+            await self._answer('right', (await self._problem()).answer)
+            await self._click('next', "Next Problem")
+            await self._click('skip', "Skip")
+            await self._choose('mixed', MIXED_PRACTICE)
+            await self._click('mixed', "New Problem")
+        return self
+
+
+# ============================================================================
+# MEASURING
+# ============================================================================
+
+def _percentile(times, fraction):
+    return times[min(len(times) - 1, int(len(times) * fraction))]
+
+
+async def _play_all(server, sessions, rounds, seed):
+    """Play one untimed student, then sessions students at once.
+
+    Returns the students, the server CPU time they used and how much the
+    server's resident memory grew while they were connected.
+    """
+    # An untimed session first, so imports and the first compile aren't measured
+    warmup = StudentSession(server, seed - 1)
+    try:
+        await warmup.play(1)
+    finally:
+        warmup.close()
+    rss_before = server.rss_bytes()
+    cpu_before = server.cpu_seconds()
+    players = [StudentSession(server, seed + i) for i in range(sessions)]
+    try:
+        wall_before = time.perf_counter()
+        await asyncio.gather(*(player.play(rounds) for player in players))
+        wall = time.perf_counter() - wall_before
+        cpu_after = server.cpu_seconds()
+        rss_after = server.rss_bytes()
+    finally:
+        for player in players:
+            player.close()
+    cpu = None if cpu_before is None else cpu_after - cpu_before
+    rss = None if rss_before is None else rss_after - rss_before
+    return players, wall, cpu, rss
+
+
+def run(sessions=DEFAULT_SESSIONS, rounds=DEFAULT_ROUNDS, seed=0, app_path=APP_PATH):
+    """Play sessions students for rounds rounds each, all at once against one server; return the results document."""
+    with tempfile.TemporaryDirectory(prefix='math-loadtest-') as directory:
+        with Server(app_path, directory) as server:
+            players, wall, cpu, rss = asyncio.run(_play_all(server, sessions, rounds, seed))
+
+    results = {}
+    for name in INTERACTIONS + ('all',):
+        times = sorted(
+            t for player in players
+            for interaction, ts in player.times.items() if name in ('all', interaction)
+            for t in ts
+        )
+        if times:
+            results[name] = {
+                'runs': len(times),
+                'p50_ms': _percentile(times, 0.50) * 1e3,
+                'p95_ms': _percentile(times, 0.95) * 1e3,
+                'p99_ms': _percentile(times, 0.99) * 1e3,
+            }
+    interactions = results['all']['runs']
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sessions': sessions,
+        'rounds': rounds,
+        'seed': seed,
+        'wall_s': wall,
+        'interactions_per_sec': interactions / wall,
+        'cpu_ms_per_interaction': None if cpu is None else cpu / interactions * 1e3,
+        'rss_kb_per_session': None if rss is None else rss / sessions / 1024,
+        'results': results,
+    }
+
+
+def regressions(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """(interaction, baseline p95, current p95) for every interaction that got too slow."""
+    slower = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            slower.append((name, base['p95_ms'], result['p95_ms']))
+    return slower
+
+
+def format_table(document, baseline=None):
+    lines = [f"{'interaction':12} {'runs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+             + ("  p95 vs base" if baseline else "")]
+    for name, result in document['results'].items():
+        line = (f"{name:12} {result['runs']:>6} {result['p50_ms']:>9.1f} "
+                f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+        base = baseline and baseline['results'].get(name)
+        if base:
+            line += f"  {result['p95_ms'] / base['p95_ms'] - 1:+11.1%}"
+        lines.append(line)
+    summary = (f"{document['sessions']} sessions x {document['rounds']} rounds in {document['wall_s']:.1f}s: "
+               f"{document['interactions_per_sec']:.1f} interactions/s")
+    if document['cpu_ms_per_interaction'] is not None:
+        summary += (f", {document['cpu_ms_per_interaction']:.1f} ms server CPU per interaction, "
+                    f"{document['rss_kb_per_session']:,.0f} KB per session")
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def loadtest_command(args):
+    document = run(args.sessions, args.rounds, args.seed, args.app)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_table(document, baseline))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"saved load test results to {args.save}")
+
+    if baseline is not None:
+        slower = regressions(document, baseline, args.threshold)
+        for name, before, after in slower:
+            print(f"REGRESSION {name}: p95 {before:.1f} -> {after:.1f} ms", file=sys.stderr)
+        if slower:
+            return 1
+    return 0
+
+
+def add_parser(commands):
+    loadtest = commands.add_parser('loadtest', help="run many scripted students against one app server at once")
+    loadtest.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS, help="students at once")
+    loadtest.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="rounds of interactions per student")
+    loadtest.add_argument('--seed', type=int, default=0, help="seed for the students' choices and problems")
+    loadtest.add_argument('--app', default=APP_PATH, help="Streamlit script to load")
+    loadtest.add_argument('--save', help="write the results to this JSON file")
+    loadtest.add_argument('--baseline', help="compare against results saved with --save")
+    loadtest.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                          help="allowed growth in p95 before an interaction counts as a regression (0.25 = 25%%)")
+    loadtest.set_defaults(func=loadtest_command)
@@ -0,0 +1,131 @@
+"""
+No-repeat guarantee for a session's problems.
+
+Some topics have small parameter spaces (gen_proportional_graph only has
+seven values of k), so plain random draws hand the same problem out twice
+in a short session. NoRepeat remembers what a session has already seen and
+rejects repeats so the caller can draw again.
+
+The seen-set is two Bloom filters used as generations: new problems go into
+the current one, and when it holds `window` problems the older generation is
+dropped. A problem seen within the last `window` draws is always caught, and
+the whole thing is a couple hundred bytes per session whatever the window's
+contents are. A false positive only costs one extra draw.
+
+Rejections also tell us how crowded a topic is: when most fresh draws are
+repeats, the student has seen nearly everything the topic can produce.
+"""
+
+import hashlib
+import math
+
+DEFAULT_WINDOW = 100
+FALSE_POSITIVE_RATE = 0.01
+
+# A topic whose recent draws are mostly repeats is reported as nearly exhausted
+EXHAUSTED_REPEAT_RATE = 0.5
+# Weight of the newest draw in each topic's running repeat rate
+REPEAT_RATE_SMOOTHING = 0.1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit keys."""
+
+    __slots__ = ('bits', 'size', 'hashes', 'count')
+
+    def __init__(self, capacity, false_positive_rate=FALSE_POSITIVE_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two 32-bit halves of the key
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def copy(self):
+        other = BloomFilter.__new__(BloomFilter)
+        other.size = self.size
+        other.hashes = self.hashes
+        other.bits = bytearray(self.bits)
+        other.count = self.count
+        return other
+
+
+def problem_key(problem):
+    """64-bit key for "the same problem": its problem_type and problem text."""
+    data = f"{problem.problem_type}\x00{problem.expr}".encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class NoRepeat:
+    """What one session has seen recently, and how often each topic repeats."""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._current = BloomFilter(window)
+        self._previous = BloomFilter(window)
+        self.repeat_rates = {}
+
+    def seen(self, problem):
+        key = problem_key(problem)
+        return key in self._current or key in self._previous
+
+    def snapshot(self):
+        """A copy of what has been seen so far, to check problems against on another thread."""
+        other = NoRepeat.__new__(NoRepeat)
+        other.window = self.window
+        other._current = self._current.copy()
+        other._previous = self._previous.copy()
+        other.repeat_rates = {}
+        return other
+
+    def add(self, problem):
+        if self._current.count >= self.window:
+            self._previous = self._current
+            self._current = BloomFilter(self.window)
+        self._current.add(problem_key(problem))
+
+    def _count_draw(self, problem_type, repeat):
+        rate = self.repeat_rates.get(problem_type, 0.0)
+        self.repeat_rates[problem_type] = rate + REPEAT_RATE_SMOOTHING * (repeat - rate)
+
+    def accept(self, problem):
+        """Record problem as seen and return True, or return False if it's a repeat."""
+        repeat = self.seen(problem)
+        self._count_draw(problem.problem_type, repeat)
+        if repeat:
+            return False
+        self.add(problem)
+        return True
+
+    def rejected(self, problem_type, count):
+        """Count draws of problem_type that were thrown away as repeats somewhere else."""
+        for _ in range(count):
+            self._count_draw(problem_type, True)
+
+    def nearly_exhausted(self, problem_type):
+        """True once most fresh draws for problem_type are problems seen recently."""
+        return self.repeat_rates.get(problem_type, 0.0) >= EXHAUSTED_REPEAT_RATE
+
+    def report(self):
+        """problem_type -> recent repeat rate, for every topic drawn from so far."""
+        return dict(self.repeat_rates)
+
+    @property
+    def nbytes(self):
+        return len(self._current.bits) + len(self._previous.bits)
@@ -0,0 +1,247 @@
+"""
+Background prefetching of the next few problems for a session.
+
+"Next Problem" shouldn't have to wait for a generator. Each session keeps a
+ProblemQueue holding the next few problems for whatever it is practicing;
+while the student works on the current problem, a small thread pool shared
+by all sessions fills the queue back up.
+
+Mixed Practice picks the topic when a problem is handed out, not when it is
+queued, so the pick sees every answer up to that moment. The queue keeps one
+problem ready per topic picked lately and refills a topic after serving it;
+past MIXED_MAX_PENDING queued problems, the topics served longest ago are
+dropped.
+
+Repeats are redrawn in the pool too: a queued problem is already one the
+session hadn't seen when it was queued (checked against a snapshot of its
+NoRepeat), so next() never generates more than the one problem it has to
+when a queue is empty.
+
+Everything random is still drawn from the session's rng on the caller's
+thread (the Mixed Practice pick and a seed per queued problem, whose own
+rng seeds any redraws), so a seeded session gets the same problems whether
+or not they were prefetched, and the session rng is never touched from two
+threads at once.
+"""
+
+import collections
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from math_core.generators import generate_new_problem
+from math_core.registry import pick_mixed_type
+from math_core.rng import make_rng, new_seed
+
+DEFAULT_DEPTH = 3
+
+# Problems kept ready per topic in Mixed Practice
+MIXED_DEPTH = 1
+
+# Problems kept ready in Mixed Practice in all, so a long session doesn't
+# hold one for every topic it has ever picked
+MIXED_MAX_PENDING = 6
+
+# Refills wait this long before generating, so they run after the rerun that
+# asked for them has rendered instead of competing with it for the GIL. They
+# wait on one timer thread, not in the pool, so a waiting refill never holds
+# a worker that a cold next() needs
+REFILL_DELAY = 0.1
+
+# Repeats rejected in a row before a topic is treated as used up and the
+# repeat is handed out anyway
+MAX_REDRAWS = 20
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """The thread pool shared by every session's queue."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=min(4, os.cpu_count() or 1),
+                    thread_name_prefix='math-prefetch'
+                )
+    return _executor
+
+
+def _run_into(future, func, args):
+    try:
+        result = func(*args)
+    except BaseException as exc:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+
+class _Timer:
+    """One thread that hands calls to the pool once their delay is up.
+
+    submit() returns a Future at once; hurry() sends a call that is still
+    waiting to the pool right away, for a next() that needs it now.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._calls = {}
+        self._order = itertools.count()
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def submit(self, delay, func, *args):
+        future = Future()
+        with self._wake:
+            self._calls[future] = (func, args)
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='math-prefetch-timer', daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return future
+
+    def hurry(self, future):
+        with self._wake:
+            call = self._calls.pop(future, None)
+        if call is not None:
+            self._start(future, call)
+
+    def _start(self, future, call):
+        # False if it was cancelled while it waited
+        if future.set_running_or_notify_cancel():
+            executor().submit(_run_into, future, *call)
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._wake.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, future = heapq.heappop(self._heap)
+                call = self._calls.pop(future, None)
+            if call is not None:
+                self._start(future, call)
+
+
+_timer = _Timer()
+
+
+def _generate(problem_type, problem_rng, seen):
+    """A problem not in seen (a NoRepeat snapshot), and how many repeats were drawn first."""
+    problem = generate_new_problem(problem_type, rng=problem_rng)
+    if seen is None:
+        return problem, 0
+    rejected = 0
+    while rejected < MAX_REDRAWS and seen.seen(problem):
+        rejected += 1
+        problem = generate_new_problem(problem_type, rng=problem_rng)
+    return problem, rejected
+
+
+class ProblemQueue:
+    """The next few problems for one session.
+
+    next(problem_type) hands out a problem of that type, or a Mixed Practice
+    pick when problem_type is None. Asking for a different problem_type than
+    last time throws the queued problems away. With a NoRepeat, problems the
+    session saw recently are skipped, and with a sampler (adaptive.AdaptiveMix)
+    Mixed Practice picks follow the student's results.
+    """
+
+    def __init__(self, rng, depth=DEFAULT_DEPTH, no_repeat=None, sampler=None):
+        self.rng = rng
+        self.depth = depth
+        self.no_repeat = no_repeat
+        self.sampler = sampler
+        self.problem_type = None
+        # problem_type -> futures of its queued problems, oldest first; topics
+        # in the order they were last served
+        self._pending = collections.OrderedDict()
+        self._started = False
+
+    def _submit(self, problem_type, delay=0):
+        problem_rng = make_rng(new_seed(self.rng))
+        seen = None if self.no_repeat is None else self.no_repeat.snapshot()
+        if delay:
+            future = _timer.submit(delay, _generate, problem_type, problem_rng, seen)
+        else:
+            future = executor().submit(_generate, problem_type, problem_rng, seen)
+        self._pending.setdefault(problem_type, collections.deque()).append(future)
+
+    def reset(self, problem_type=None):
+        """Drop the queued problems and start queueing problem_type instead."""
+        for queue in self._pending.values():
+            for future in queue:
+                future.cancel()
+        self._pending = collections.OrderedDict()
+        self.problem_type = problem_type
+        self._started = True
+
+    def fill(self, delay=0):
+        """Queue problems until depth are waiting (for a single topic)."""
+        if self.problem_type is not None:
+            self._fill(self.problem_type, self.depth, delay)
+
+    def _fill(self, problem_type, depth, delay):
+        queue = self._pending.get(problem_type)
+        for _ in range(depth - (len(queue) if queue else 0)):
+            self._submit(problem_type, delay)
+
+    def next(self, problem_type=None):
+        """Take the next problem, waiting only if it isn't ready yet, and refill in the background."""
+        if not self._started or problem_type != self.problem_type:
+            self.reset(problem_type)
+        mixed = problem_type is None
+        if mixed:
+            problem_type = pick_mixed_type(self.rng, self.sampler)
+            depth = MIXED_DEPTH
+        else:
+            depth = self.depth
+        queue = self._pending.get(problem_type)
+        if not queue:
+            self._submit(problem_type)
+            queue = self._pending[problem_type]
+        problem = self._take(queue)
+        self._pending.move_to_end(problem_type)
+        self._fill(problem_type, depth, REFILL_DELAY)
+        if mixed:
+            self._trim(MIXED_MAX_PENDING)
+        return problem
+
+    def _trim(self, limit):
+        """Drop the queues of the topics served longest ago until at most limit problems wait."""
+        waiting = len(self)
+        while waiting > limit and len(self._pending) > 1:
+            _, queue = self._pending.popitem(last=False)
+            for future in queue:
+                future.cancel()
+            waiting -= len(queue)
+
+    def _take(self, queue):
+        future = queue.popleft()
+        _timer.hurry(future)
+        first, rejected = future.result()
+        if self.no_repeat is None:
+            return first
+        problem = first
+        # It was fresh when queued, but a problem served since can have been
+        # the same one; then try the rest of the queue, and if the topic is
+        # that used up, hand out the first one anyway
+        while True:
+            self.no_repeat.rejected(problem.problem_type, rejected)
+            if self.no_repeat.accept(problem):
+                return problem
+            if not queue:
+                self.no_repeat.add(first)
+                return first
+            future = queue.popleft()
+            _timer.hurry(future)
+            problem, rejected = future.result()
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._pending.values())
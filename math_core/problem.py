@@ -0,0 +1,115 @@
+"""
+The Problem record handed from the engine to the app.
+
+A session keeps one Problem instead of a loose tuple spread over several
+session_state keys. Problem types and labels are interned to small ints (one
+shared copy of each string per process), the answer is stored in canonical
+form so it is cleaned and parsed once instead of on every check, and the steps and hints
+stay lazy until someone reads them.
+"""
+
+import threading
+
+from math_core.checking import answer_key, canonical_answer, check_answer, parse_polynomial
+from math_core.registry import get_topic
+
+
+# ============================================================================
+# INTERNED NAMES
+# ============================================================================
+
+class _Names:
+    """Append-only string table: each distinct name gets a small int id."""
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+
+    def intern(self, name):
+        try:
+            return self._ids[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._ids:
+                self._ids[name] = len(self._names)
+                self._names.append(name)
+            return self._ids[name]
+
+    def name(self, name_id):
+        return self._names[name_id]
+
+
+_types = _Names()
+_labels = _Names()
+
+
+def type_id(problem_type):
+    """The interned id for a problem_type string."""
+    return _types.intern(problem_type)
+
+
+def label_id(label):
+    """The interned id for a problem label string."""
+    return _labels.intern(label)
+
+
+# ============================================================================
+# PROBLEM
+# ============================================================================
+
+class Problem:
+    """One generated problem.
+
+    expr is the problem text, answer the correct answer as shown to the
+    student, answer_form the answer parsed for grading (see
+    checking.parse_polynomial) and text the steps and hints (LazyText,
+    BankText, StaticText or textcache.SharedText). Together
+    with problem_type, seed identifies the problem: generate_new_problem(
+    problem_type, seed=seed) rebuilds it, also for problems math_core.batch made.
+    """
+
+    __slots__ = ('type_id', 'label_id', 'seed', 'expr', 'answer', 'answer_form', 'text')
+
+    def __init__(self, problem_type, expr, answer, text, label, seed=None):
+        self.type_id = type_id(problem_type)
+        self.label_id = label_id(label)
+        self.seed = seed
+        self.expr = expr
+        self.answer = canonical_answer(answer)
+        self.answer_form = parse_polynomial(self.answer)
+        self.text = text
+
+    @property
+    def problem_type(self):
+        return _types.name(self.type_id)
+
+    @property
+    def label(self):
+        return _labels.name(self.label_id)
+
+    @property
+    def key(self):
+        """(problem_type, seed): enough to rebuild this problem anywhere."""
+        return self.problem_type, self.seed
+
+    def check(self, user_input):
+        """Check a student's answer against this problem's answer, by its topic's answer rule."""
+        if user_input == self.answer:
+            return True
+        return check_answer(user_input, self.answer, self.answer_form, self.answer_rule)
+
+    @property
+    def answer_rule(self):
+        """The topic's AnswerRule (units, signs, "x =") for this answer, or None."""
+        topic = get_topic(self.problem_type)
+        return topic.rule_for(self.label) if topic is not None else None
+
+    def diagnose(self, user_input):
+        """(mistake code, targeted hint) if user_input is a known wrong answer, else None."""
+        key = answer_key(user_input, self.answer_rule)
+        return None if key is None else self.text.mistake(key)
+
+    def __repr__(self):
+        return f"Problem({self.problem_type!r}, seed={self.seed!r}, expr={self.expr!r}, answer={self.answer!r})"
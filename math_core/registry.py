@@ -0,0 +1,198 @@
+"""
+Topic registry: one table from problem_type to everything the app needs.
+
+Each Topic knows how to generate its problems, the label shown above them,
+the sidebar menu entry, the "Today's Focus" rule and its weight in Mixed
+Practice. The built-in topics are registered by math_core.generators.
+
+Extra topic packs can be installed as separate packages. They advertise
+themselves under the "math_core.topics" entry point group, named by
+problem_type and pointing at a Topic (or a function returning one):
+
+    [project.entry-points."math_core.topics"]
+    integers = "mathpack.integers:TOPIC"
+
+Only the entry point metadata is read up front. A pack's module is imported
+the first time its problem_type is asked for, so unused packs cost nothing.
+"""
+
+import functools
+import threading
+
+ENTRY_POINT_GROUP = 'math_core.topics'
+
+MIXED_PRACTICE = "🎲 Mixed Practice (All Topics)"
+DEFAULT_FOCUS_RULE = "Take your time and break it into steps! You've got this! 💪"
+
+
+class Topic:
+    """Everything about one problem_type.
+
+    generate(rng) returns (expr, answer, text) when the topic has a fixed
+    label, or (expr, answer, text, label) when label is None and every
+    problem brings its own. answer_rule (a checking.AnswerRule) says which
+    units, signs and "x =" prefixes a numeric answer may be written with;
+    None allows a bare number only. Topics whose problems want different
+    rules give a dict from problem label to AnswerRule instead, and labels
+    not in it get a bare number only. Built-in topics
+    without a menu_label are still generated on request but don't show up in
+    the sidebar or in Mixed Practice.
+    """
+
+    __slots__ = ('problem_type', 'generate', 'label', 'menu_label', 'focus_rule', 'weight', 'answer_rule')
+
+    def __init__(self, problem_type, generate, label=None, menu_label=None,
+                 focus_rule=DEFAULT_FOCUS_RULE, weight=1, answer_rule=None):
+        self.problem_type = problem_type
+        self.generate = generate
+        self.label = label
+        self.menu_label = menu_label
+        self.focus_rule = focus_rule
+        self.weight = weight
+        self.answer_rule = answer_rule
+
+    def make(self, rng):
+        """Generate one problem as (expr, answer, text, label)."""
+        if self.label is None:
+            return self.generate(rng)
+        expr, answer, text = self.generate(rng)
+        return expr, answer, text, self.label
+
+    def rule_for(self, label):
+        """The AnswerRule for a problem of this topic with this label, or None."""
+        rule = self.answer_rule
+        if isinstance(rule, dict):
+            return rule.get(label)
+        return rule
+
+    def __repr__(self):
+        return f"Topic({self.problem_type!r})"
+
+
+def pick(generators):
+    """A generate function that picks one of generators at random for each problem."""
+    generators = list(generators)
+
+    def generate(rng):
+        return rng.choice(generators)(rng)
+    return generate
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+_topics = {}
+_menu = {}
+_loaded_plugins = set()
+_lock = threading.Lock()
+# Bumped whenever a topic is added, so callers can tell their topic lists are stale
+_version = 0
+
+
+def register(topic):
+    """Add a topic, replacing any topic with the same problem_type."""
+    global _version
+    with _lock:
+        _version += 1
+        old = _topics.get(topic.problem_type)
+        if old is not None and old.menu_label:
+            _menu.pop(old.menu_label, None)
+        _topics[topic.problem_type] = topic
+        if topic.menu_label:
+            _menu[topic.menu_label] = topic.problem_type
+    return topic
+
+
+@functools.lru_cache(maxsize=1)
+def plugin_entry_points():
+    """Installed topic packs by problem_type (metadata only, nothing imported)."""
+    # importlib.metadata takes longer to import than the rest of math_core,
+    # so only pay for it once something asks about topic packs
+    from importlib import metadata
+
+    return {entry_point.name: entry_point for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def _load_plugin(problem_type):
+    global _version
+    entry_point = plugin_entry_points().get(problem_type)
+    if entry_point is None:
+        return None
+    topic = entry_point.load()
+    if callable(topic) and not isinstance(topic, Topic):
+        topic = topic()
+    if topic.problem_type != problem_type:
+        raise ValueError(f"entry point {problem_type!r} loaded topic {topic.problem_type!r}")
+    # Packs stay listed in the menu under their entry point name, so don't
+    # give them a second menu entry now that they're loaded
+    with _lock:
+        if problem_type not in _topics:
+            _topics[problem_type] = topic
+            _loaded_plugins.add(problem_type)
+            _version += 1
+        return _topics[problem_type]
+
+
+def get_topic(problem_type):
+    """The Topic for problem_type, loading its topic pack if needed; None if unknown."""
+    try:
+        return _topics[problem_type]
+    except KeyError:
+        return _load_plugin(problem_type)
+
+
+def topic_types():
+    """Every problem_type registered so far, built-in topics first."""
+    return list(_topics)
+
+
+def _plugin_types():
+    """Installed packs not shadowed by a built-in topic of the same name."""
+    return [name for name in plugin_entry_points() if name not in _topics or name in _loaded_plugins]
+
+
+def all_types():
+    """Every problem_type that can be asked for: registered topics, then installed packs."""
+    types = topic_types()
+    return types + [name for name in plugin_entry_points() if name not in types]
+
+
+def menu_labels():
+    """Sidebar choices: built-in topics, then topic packs by name, then Mixed Practice."""
+    return list(_menu) + _plugin_types() + [MIXED_PRACTICE]
+
+
+def type_for_menu_label(menu_label):
+    """The problem_type behind a sidebar choice (None for Mixed Practice)."""
+    if menu_label == MIXED_PRACTICE:
+        return None
+    return _menu.get(menu_label, menu_label)
+
+
+def focus_rule(problem_type):
+    """The "Today's Focus" reminder for problem_type."""
+    topic = get_topic(problem_type)
+    return topic.focus_rule if topic is not None else DEFAULT_FOCUS_RULE
+
+
+def mixed_types():
+    """problem_types Mixed Practice picks from, and their weights."""
+    types = list(_menu.values()) + _plugin_types()
+    weights = [_topics[problem_type].weight if problem_type in _topics else 1 for problem_type in types]
+    return types, weights
+
+
+def topics_version():
+    """A number that changes whenever a topic is registered or a topic pack loads."""
+    return _version
+
+
+def pick_mixed_type(rng, sampler=None):
+    """Pick a problem_type for Mixed Practice, with sampler (an adaptive.AdaptiveMix) if given."""
+    if sampler is not None:
+        return sampler.pick(rng)
+    types, weights = mixed_types()
+    if len(set(weights)) == 1:
+        return rng.choice(types)
+    return rng.choices(types, weights)[0]
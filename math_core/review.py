@@ -0,0 +1,198 @@
+"""
+Spaced review of missed skills.
+
+When a student misses a problem, the skill behind it, (problem_type, mistake
+code from Problem.diagnose or None), goes into the student's ReviewScheduler.
+"Next Problem" asks the scheduler first, and a review that is due comes back
+as a fresh problem of that type, one that can show the same mistake, before
+the normal queue gets a turn.
+
+Scheduling is SM-2 with the intervals scaled down to a practice session: a
+miss comes back after FIRST_INTERVAL seconds, a first good review after
+SECOND_INTERVAL, and after that each interval is the last one times the
+item's ease. The ease moves with answer quality, from 5 (right, no help)
+down to 1 (wrong), as in SM-2. Items whose interval passes RETIRE_INTERVAL
+are dropped as learned.
+
+Due items sit in heaps ordered by due time, one over all items and one per
+problem_type, so the next due review, in Mixed Practice or in one topic, is
+found in O(log n) without looking at the others. Rescheduling pushes a new
+entry and leaves the old one to be skipped when it surfaces. Mixed Practice
+only pops the overall heap and a single topic only its own, so the heaps are
+rebuilt once either the overall heap or the per-type heaps together are
+mostly old entries. Each student has their own scheduler, so nothing ever
+scans across students; it is saved with the rest of their progress
+(to_list / from_list).
+"""
+
+import heapq
+import time
+
+FIRST_INTERVAL = 120
+SECOND_INTERVAL = 600
+RETIRE_INTERVAL = 30 * 24 * 3600
+START_EASE = 2.5
+MIN_EASE = 1.3
+
+# Answer quality on a review, as in SM-2
+RIGHT = 5
+RIGHT_WITH_HINTS = 4
+RIGHT_WITH_STEPS = 3
+WRONG = 1
+
+
+def answer_quality(correct, hints, steps):
+    """SM-2 quality (1-5) of an answer given with hints and/or the steps shown."""
+    if not correct:
+        return WRONG
+    if steps:
+        return RIGHT_WITH_STEPS
+    return RIGHT_WITH_HINTS if hints else RIGHT
+
+
+class ReviewItem:
+    """SM-2 state of one (problem_type, pattern) skill."""
+
+    __slots__ = ('problem_type', 'pattern', 'repetitions', 'interval', 'ease', 'due', 'stamp')
+
+    def __init__(self, problem_type, pattern, repetitions=0, interval=0, ease=START_EASE, due=None):
+        self.problem_type = problem_type
+        self.pattern = pattern
+        self.repetitions = repetitions
+        self.interval = interval
+        self.ease = ease
+        # None while it's on screen as a review
+        self.due = due
+        self.stamp = 0
+
+    @property
+    def key(self):
+        return self.problem_type, self.pattern
+
+    def grade(self, quality):
+        """Update repetitions, interval and ease for an answer of this quality (SM-2)."""
+        self.ease = max(MIN_EASE, self.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        if quality < 3:
+            self.repetitions = 0
+            self.interval = FIRST_INTERVAL
+            return
+        self.repetitions += 1
+        if self.repetitions == 1:
+            self.interval = SECOND_INTERVAL
+        else:
+            self.interval = round(self.interval * self.ease)
+
+
+class ReviewScheduler:
+    """One student's review items, with the due ones found in O(log n)."""
+
+    def __init__(self):
+        self.items = {}
+        self._due = []
+        self._due_by_type = {}
+        # Entries in all the per-type heaps together
+        self._typed = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def _schedule(self, item, due):
+        item.due = due
+        item.stamp += 1
+        entry = (due, item.stamp, item.key)
+        heapq.heappush(self._due, entry)
+        heapq.heappush(self._due_by_type.setdefault(item.problem_type, []), entry)
+        self._typed += 1
+        # Old entries are skipped lazily; rebuild once they are most of a heap
+        if max(len(self._due), self._typed) > 4 * len(self.items) + 16:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._due = []
+        self._due_by_type = {}
+        for item in self.items.values():
+            if item.due is not None:
+                entry = (item.due, item.stamp, item.key)
+                self._due.append(entry)
+                self._due_by_type.setdefault(item.problem_type, []).append(entry)
+        heapq.heapify(self._due)
+        self._typed = len(self._due)
+        for heap in self._due_by_type.values():
+            heapq.heapify(heap)
+
+    def missed(self, problem_type, pattern=None, now=None):
+        """A problem of problem_type was answered wrong (with mistake code pattern)."""
+        now = time.time() if now is None else now
+        key = (problem_type, pattern)
+        item = self.items.get(key)
+        if item is None:
+            item = self.items[key] = ReviewItem(problem_type, pattern)
+        item.grade(WRONG)
+        self._schedule(item, now + item.interval)
+
+    def pop_due(self, problem_type=None, now=None):
+        """Take the most overdue review (of problem_type, if given) as its key, or None.
+
+        The item stays out of the queue until answered() or skipped() puts it back.
+        """
+        now = time.time() if now is None else now
+        typed = problem_type is not None
+        heap = self._due_by_type.get(problem_type) if typed else self._due
+        while heap:
+            due, stamp, key = heap[0]
+            item = self.items.get(key)
+            live = item is not None and item.stamp == stamp and item.due is not None
+            if live and due > now:
+                return None
+            heapq.heappop(heap)
+            if typed:
+                self._typed -= 1
+            if not live:
+                continue
+            item.due = None
+            item.stamp += 1
+            return key
+        return None
+
+    def answered(self, key, quality, now=None):
+        """A review of key was answered with this quality; schedule the next one."""
+        item = self.items.get(key)
+        if item is None:
+            return
+        now = time.time() if now is None else now
+        item.grade(quality)
+        if item.interval > RETIRE_INTERVAL:
+            del self.items[key]
+        else:
+            self._schedule(item, now + item.interval)
+
+    def skipped(self, key, now=None):
+        """A review of key was skipped; bring it back after FIRST_INTERVAL."""
+        item = self.items.get(key)
+        if item is not None:
+            self._schedule(item, (time.time() if now is None else now) + FIRST_INTERVAL)
+
+    def to_list(self):
+        """JSON-ready list of every item; reviews on screen are saved as due now.
+
+        Save the key of the review on screen with it, and pass it back to
+        from_list as on_screen to put that review back on screen.
+        """
+        now = time.time()
+        return [
+            [item.problem_type, item.pattern, item.repetitions, item.interval, item.ease,
+             now if item.due is None else item.due]
+            for item in self.items.values()
+        ]
+
+    @classmethod
+    def from_list(cls, rows, on_screen=None):
+        scheduler = cls()
+        for problem_type, pattern, repetitions, interval, ease, due in rows:
+            item = ReviewItem(problem_type, pattern, repetitions, interval, ease, due)
+            scheduler.items[item.key] = item
+        item = scheduler.items.get(on_screen)
+        if item is not None:
+            item.due = None
+        scheduler._rebuild()
+        return scheduler
@@ -0,0 +1,132 @@
+"""
+Random number streams for problem generation.
+
+Generators never touch the module-level random functions: each one is handed
+a random.Random to draw from. Every problem gets its own 64-bit seed, so a
+problem is fully identified by its problem_type and seed and can be rebuilt
+on demand, cached, or generated in another process.
+
+A problem's stream is counter-based: draw i is splitmix64 of seed + i times
+a constant. That makes it cheap to start (no Mersenne Twister state to fill
+per problem) and lets math_core.batch compute draw i of thousands of seeds
+at once with NumPy (seed_draws) and get exactly what the scalar generators
+get from ProblemRandom.
+"""
+
+import random
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(z):
+    """splitmix64's finalizer: a well-mixed 64-bit value from z."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+class ProblemRandom(random.Random):
+    """The random stream for one problem seed.
+
+    randint and choice take one draw each (a value modulo the number of
+    outcomes), which is what math_core.batch reproduces; the other
+    random.Random methods work too, built on the same draws.
+    """
+
+    def seed(self, a=None, version=2):
+        self._key = (a if isinstance(a, int) else new_seed()) & MASK64
+        self._counter = 0
+        self.gauss_next = None
+
+    def next64(self):
+        self._counter += 1
+        return mix64((self._key + self._counter * GOLDEN_GAMMA) & MASK64)
+
+    def getrandbits(self, k):
+        if k <= 64:
+            return self.next64() >> (64 - k)
+        value = 0
+        for shift in range(0, k, 64):
+            value |= self.next64() << shift
+        return value & ((1 << k) - 1)
+
+    def random(self):
+        return (self.next64() >> 11) * (1.0 / (1 << 53))
+
+    def randint(self, a, b):
+        return a + self.next64() % (b - a + 1)
+
+    def choice(self, seq):
+        return seq[self.next64() % len(seq)]
+
+    def getstate(self):
+        return self._key, self._counter, self.gauss_next
+
+    def setstate(self, state):
+        self._key, self._counter, self.gauss_next = state
+
+
+def seed_draws(seeds, counter):
+    """Draw number counter (1 is the first) of every seed's ProblemRandom, as a NumPy uint64 array."""
+    import numpy as np
+
+    z = seeds + np.uint64(counter * GOLDEN_GAMMA & MASK64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def new_seed(rng=None):
+    """Draw a fresh 64-bit problem seed from rng (or from the OS if rng is None)."""
+    rng = _system_random if rng is None else as_random(rng)
+    return rng.getrandbits(64)
+
+
+def make_rng(seed):
+    """The random stream for one problem."""
+    return ProblemRandom(seed)
+
+
+def session_rng(seed=None):
+    """A random stream for one student session; its draws become problem seeds."""
+    return random.Random(seed)
+
+
+class NumpyRandom:
+    """Lets a NumPy Generator stand in for random.Random in the generators."""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def randint(self, a, b):
+        return int(self.generator.integers(a, b + 1))
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            start, stop = 0, start
+        return int(self.generator.integers(start, stop))
+
+    def choice(self, seq):
+        return seq[int(self.generator.integers(len(seq)))]
+
+    def random(self):
+        return float(self.generator.random())
+
+    def getrandbits(self, k):
+        value = 0
+        for shift in range(0, k, 32):
+            value |= int(self.generator.integers(1 << 32, dtype='uint64')) << shift
+        return value & ((1 << k) - 1)
+
+
+def as_random(rng):
+    """Accept a random.Random-like object or a NumPy Generator."""
+    if rng is None:
+        return random.Random()
+    if hasattr(rng, 'randint'):
+        return rng
+    return NumpyRandom(rng)
+
+
+_system_random = random.SystemRandom()
@@ -0,0 +1,310 @@
+"""
+Self-consistency checks for every problem_type, run across all cores.
+
+For each seed it rebuilds generate_new_problem(problem_type, seed=seed) and
+checks that:
+
+    answer parses     the answer is something the checker can read
+    accepts answer    the problem accepts its own answer
+    accepts forms     it also accepts common equivalent forms: the terms in
+                      another order, 0.5 for 1/2 and 1/2 for 0.5, 3.0 for 3
+    steps show answer the solution steps end up at the answer
+    steps arithmetic  every "a × b = c" style claim in the steps is true,
+                      reading N% as N/100, so "(7 ÷ 20) × 100% = 35%" counts
+
+Every registered problem_type is checked unless --types says otherwise,
+including the legacy catch-all types and installed topic packs. Seeds are
+walked in order from --start, so the first seed reported for a
+failure is the smallest one that reproduces it:
+
+    python -m math_core selfcheck --count 1000000
+    python -m math_core selfcheck --types geometry --count 50000 --workers 4
+
+Exits with status 1 if anything failed.
+"""
+
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+from math_core.checking import canonical_answer
+from math_core.generators import generate_new_problem
+from math_core.registry import all_types
+
+DEFAULT_COUNT = 100_000
+CHUNK_SIZE = 5000
+
+
+# ============================================================================
+# ARITHMETIC IN THE STEPS
+# ============================================================================
+
+# Runs of plain arithmetic with at least one "=" in them
+_ARITHMETIC_RUN = re.compile(r"[\d.\s×÷*/+\-()%]*=[\d.\s×÷*/+\-()%=]*")
+_ARITH_TOKEN = re.compile(r"\s*(\d+\.\d+%?|\d+%?|[×÷*/+\-()])")
+# Characters that glue a number to something that isn't arithmetic ("3x", "5²")
+_GLUE = re.compile(r"[\w²³^$|]")
+
+
+def _evaluate(text):
+    """Value of an arithmetic expression as a Fraction, or None if it isn't one."""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _ARITH_TOKEN.match(text, pos)
+        if match is None:
+            return None
+        tokens.append(match.group(1))
+        pos = match.end()
+    if not tokens:
+        return None
+    tokens.append(None)
+    index = 0
+
+    def peek():
+        return tokens[index]
+
+    def take():
+        nonlocal index
+        token = tokens[index]
+        if token is not None:
+            index += 1
+        return token
+
+    def atom():
+        token = take()
+        if token == '-':
+            value = atom()
+            return None if value is None else -value
+        if token == '(':
+            value = expression()
+            return value if take() == ')' else None
+        if token is None or not token[0].isdigit():
+            return None
+        if token.endswith('%'):
+            return Fraction(token[:-1]) / 100
+        return Fraction(token)
+
+    def term():
+        value = atom()
+        while value is not None and peek() in ('×', '*', '÷', '/'):
+            op = take()
+            right = atom()
+            if right is None:
+                return None
+            if op in ('÷', '/'):
+                if right == 0:
+                    raise ZeroDivisionError
+                value /= right
+            else:
+                value *= right
+        return value
+
+    def expression():
+        value = term()
+        while value is not None and peek() in ('+', '-'):
+            op = take()
+            right = term()
+            if right is None:
+                return None
+            value = value + right if op == '+' else value - right
+        return value
+
+    value = expression()
+    return value if peek() is None else None
+
+
+def _places(side):
+    """Decimal places of a side that is a single decimal number (or percent), else 0."""
+    side = side.strip()
+    percent = side.endswith('%')
+    whole, dot, fraction = side.rstrip('%').lstrip('-').partition('.')
+    if not (dot and whole.isdigit() and fraction.isdigit()):
+        return 0
+    return len(fraction) + 2 if percent else len(fraction)
+
+
+def _agree(left_side, left, right_side, right):
+    # A side written as a decimal only has to be right to its last place
+    places = max(_places(left_side), _places(right_side))
+    return abs(left - right) <= Fraction(1, 10 ** places) if places else left == right
+
+
+def false_claims(step):
+    """Every "a op b = c" chain in a step that doesn't add up, as text."""
+    text = step.replace("**", "").replace("$\\div$", "÷").replace("$", "")
+    bad = []
+    for match in _ARITHMETIC_RUN.finditer(text):
+        sides = match.group().split("=")
+        before = text[:match.start()].rstrip()[-1:]
+        after = text[match.end()] if match.end() < len(text) else ""
+        # A side touching a variable or ² is only part of a bigger expression
+        # ("3x + 5 = 8" doesn't claim +5 = 8, "10% of 40 = 4" doesn't claim 40 = 4)
+        if before and _GLUE.match(before):
+            sides[0] = ""
+        if after and _GLUE.match(after) and not sides[-1][-1:].isspace():
+            sides[-1] = ""
+        try:
+            values = [_evaluate(side) if side.strip() else None for side in sides]
+        except ZeroDivisionError:
+            bad.append(match.group().strip() + " (divides by zero)")
+            continue
+        for i in range(len(sides) - 1):
+            left, right = values[i], values[i + 1]
+            if left is not None and right is not None and not _agree(sides[i], left, sides[i + 1], right):
+                bad.append(match.group().strip())
+                break
+    return bad
+
+
+# ============================================================================
+# EQUIVALENT ANSWERS
+# ============================================================================
+
+def _decimal(value):
+    """value written as a terminating decimal, or None if it doesn't terminate."""
+    places = 0
+    while (value * 10 ** places).denominator != 1:
+        places += 1
+        if places > 12:
+            return None
+    if not places:
+        return f"{value.numerator}.0"
+    whole, fraction = divmod(int(value * 10 ** places), 10 ** places)
+    return f"{whole}.{fraction:0{places}d}"
+
+
+def _monomial(monomial):
+    return "".join(variable if power == 1 else f"{variable}^{power}" for variable, power in monomial)
+
+
+def _write(form, coefficient_text):
+    pieces = []
+    for monomial, coefficient in form:
+        variables = _monomial(monomial)
+        if variables and abs(coefficient) == 1:
+            number = ""
+        else:
+            number = coefficient_text(abs(coefficient))
+            if number is None:
+                return None
+        sign = "-" if coefficient < 0 else "+"
+        pieces.append(f"{sign}{number}{variables}")
+    text = "".join(pieces) or "0"
+    return text[1:] if text.startswith("+") else text
+
+
+def equivalent_forms(form):
+    """Other ways a student might write the answer whose canonical form is form."""
+    forms = {
+        _write(form, str),
+        _write(form, _decimal),
+        _write(tuple(reversed(form)), str),
+    }
+    forms.discard(None)
+    return sorted(forms)
+
+
+# ============================================================================
+# CHECKING
+# ============================================================================
+
+def check_problem(problem):
+    """(check, detail) for everything wrong with one problem."""
+    failures = []
+    if problem.answer_form is None:
+        failures.append(("answer parses", problem.answer))
+    if not problem.check(problem.answer):
+        failures.append(("accepts answer", problem.answer))
+    if problem.answer_form is not None:
+        for form in equivalent_forms(problem.answer_form):
+            if not problem.check(form):
+                failures.append(("accepts forms", f"{form} for {problem.answer}"))
+                break
+
+    steps = problem.text.steps()
+    flat = canonical_answer("".join(steps).replace("**", "").replace("$", ""))
+    if canonical_answer(problem.answer) not in flat:
+        failures.append(("steps show answer", problem.answer))
+    for step in steps:
+        for claim in false_claims(step):
+            failures.append(("steps arithmetic", claim))
+            break
+    return failures
+
+
+def _check_range(problem_type, start, stop):
+    """{check: [count, first seed, example]} for seeds start..stop-1 (runs in workers)."""
+    found = {}
+    for seed in range(start, stop):
+        try:
+            problem = generate_new_problem(problem_type, seed=seed)
+            failures = check_problem(problem)
+        except Exception as exc:
+            failures = [("generates", f"{type(exc).__name__}: {exc}")]
+            problem = None
+        for check, detail in failures:
+            entry = found.get(check)
+            if entry is None:
+                example = f"{problem.expr} -> {problem.answer}: {detail}" if problem else detail
+                found[check] = [1, seed, example]
+            else:
+                entry[0] += 1
+    return problem_type, found
+
+
+def run(problem_types, count, start=0, workers=None, chunk_size=CHUNK_SIZE):
+    """Check count seeds of each problem_type; return {(problem_type, check): [count, first seed, example]}."""
+    tasks = [
+        (problem_type, first, min(first + chunk_size, start + count))
+        for problem_type in problem_types
+        for first in range(start, start + count, chunk_size)
+    ]
+    failures = {}
+
+    def merge(problem_type, found):
+        for check, (n, seed, example) in found.items():
+            entry = failures.get((problem_type, check))
+            if entry is None:
+                failures[(problem_type, check)] = [n, seed, example]
+            else:
+                entry[0] += n
+                if seed < entry[1]:
+                    entry[1:] = [seed, example]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for task in tasks:
+            merge(*_check_range(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(_check_range, *zip(*tasks)):
+                merge(*result)
+    return failures
+
+
+def selfcheck_command(args):
+    start = time.perf_counter()
+    failures = run(args.types, args.count, args.start, args.workers)
+    elapsed = time.perf_counter() - start
+    total = args.count * len(args.types)
+
+    for (problem_type, check), (n, seed, example) in sorted(failures.items()):
+        print(f"FAIL {problem_type:22} {check:18} {n:>9,} of {args.count:,}  first seed {seed}")
+        print(f"     {example}")
+    print(f"checked {total:,} problems in {elapsed:.1f}s ({total / elapsed:,.0f}/s), "
+          f"{len(failures)} kinds of failure", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def add_parser(commands):
+    selfcheck = commands.add_parser('selfcheck', help="check every generator against its own answers and steps")
+    selfcheck.add_argument('--count', type=int, default=DEFAULT_COUNT, help="seeds per problem_type")
+    selfcheck.add_argument('--start', type=int, default=0, help="first seed")
+    selfcheck.add_argument('--types', nargs='+', default=all_types(), help="problem_types to check (default: all)")
+    selfcheck.add_argument('--workers', type=int, help="processes (default: one per CPU)")
+    selfcheck.set_defaults(func=selfcheck_command)
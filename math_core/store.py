@@ -0,0 +1,191 @@
+"""
+Student progress that outlives a server process.
+
+st.session_state only lives in the process that served the session, so a
+restart loses every student's score and only one process can serve the app.
+A SessionStore keeps each student's progress (score, questions, streak, topic,
+the current problem's key and whether it was answered, review schedule and
+Mixed Practice weights) somewhere every server process can reach, so
+a student can pick up on any worker behind a load balancer.
+
+The app reads progress from the store once, when a session starts, and from
+st.session_state after that, so reruns never wait on the store. Saves are
+write-behind: they are kept in memory (where load() sees them right away,
+also while a flush is writing them) and written in one batch every
+flush_interval seconds, so a crash loses at most that much progress.
+
+Stores:
+
+    MemoryStore   a dict; one process only, for development and tests
+    SQLiteStore   a SQLite file in WAL mode; every process on one machine
+
+A store for something like Redis only has to implement _read(student_id)
+and _write_many(items). Pick the store with MATH_SESSION_STORE: "memory"
+(the default) or "sqlite:///progress.db" (four slashes for an absolute
+path, "sqlite:////var/lib/math/progress.db").
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FLUSH_INTERVAL = 1.0
+STORE_URL = os.environ.get('MATH_SESSION_STORE', 'memory')
+
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class SessionStore:
+    """Progress dicts by student id, with write-behind batching of saves."""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        # Saves being written by the flush in progress, still visible to load()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Held for a whole flush, so flushes commit one after the other, in order
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def _read(self, student_id):
+        """The stored progress dict for student_id, or None."""
+        raise NotImplementedError
+
+    def _write_many(self, items):
+        """Store each (student_id, progress dict) in one batch."""
+        raise NotImplementedError
+
+    def load(self, student_id):
+        """student_id's progress, including saves not flushed yet, or None."""
+        with self._lock:
+            progress = self._pending.get(student_id)
+            if progress is None:
+                progress = self._inflight.get(student_id)
+        if progress is not None:
+            return dict(progress)
+        return self._read(student_id)
+
+    def save(self, student_id, progress):
+        """Save student_id's progress with the next batch."""
+        with self._lock:
+            self._pending[student_id] = dict(progress)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write every pending save now."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+            try:
+                self._write_many(list(pending.items()))
+            except Exception:
+                # Keep them for the next flush, unless a newer save replaced them
+                with self._lock:
+                    for student_id, progress in pending.items():
+                        self._pending.setdefault(student_id, progress)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = {}
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStore(SessionStore):
+    """Progress in a dict: survives reruns and reconnects, not restarts."""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self._data = {}
+
+    def _read(self, student_id):
+        progress = self._data.get(student_id)
+        return dict(progress) if progress is not None else None
+
+    def _write_many(self, items):
+        self._data.update(items)
+
+
+class SQLiteStore(SessionStore):
+    """Progress in a SQLite file, shared by every process on the machine."""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            # WAL lets every worker read while one of them writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA busy_timeout=5000")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                "student_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _read(self, student_id):
+        with self._db_lock:
+            row = self._db.execute("SELECT data FROM progress WHERE student_id = ?", (student_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write_many(self, items):
+        now = time.time()
+        rows = [(student_id, json.dumps(progress), now) for student_id, progress in items]
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO progress (student_id, data, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(student_id) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                    rows
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self._db.close()
+
+
+def open_store(url):
+    """A SessionStore for url: "memory" or "sqlite:///file.db" (sqlite:////abs/file.db)."""
+    if url == 'memory':
+        return MemoryStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError(f"unknown session store: {url!r}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The SessionStore for this process, from MATH_SESSION_STORE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store(STORE_URL)
+                atexit.register(_store.close)
+    return _store
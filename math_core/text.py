@@ -0,0 +1,94 @@
+"""
+Lazily rendered solution steps and hints.
+
+Generators don't format their steps and hints up front. They return the
+numbers the text needs plus the templates to pour them into, and each piece
+is only formatted when the student actually asks for it. Most students never
+open the steps, and most only read the first hint, so this skips most of the
+string work per problem and keeps a few ints per session instead of a page
+of text.
+
+A generator can also pass a map of predictable wrong answers: canonical
+answer key (see checking.answer_key) -> (mistake code, hint template), so a
+wrong submission is diagnosed with one dictionary lookup.
+"""
+
+
+class LazyText:
+    """Steps and hints for one problem, formatted on first use."""
+
+    __slots__ = ('params', 'step_templates', 'hint_templates', 'mistakes')
+
+    def __init__(self, params, step_templates, hint_templates, mistakes=None):
+        self.params = params
+        self.step_templates = step_templates
+        self.hint_templates = hint_templates
+        self.mistakes = mistakes
+
+    @property
+    def hint_count(self):
+        return len(self.hint_templates)
+
+    def hint(self, index):
+        return self.hint_templates[index].format_map(self.params)
+
+    def steps(self):
+        params = self.params
+        return [template.format_map(params) for template in self.step_templates]
+
+    def hints(self):
+        params = self.params
+        return [template.format_map(params) for template in self.hint_templates]
+
+    def mistake(self, key):
+        """(mistake code, hint) if key is a known wrong answer, else None."""
+        found = self.mistakes.get(key) if self.mistakes else None
+        if found is None:
+            return None
+        code, template = found
+        return code, template.format_map(self.params)
+
+
+class StaticText:
+    """Steps and hints that are already plain strings."""
+
+    __slots__ = ('_steps', '_hints')
+
+    def __init__(self, steps, hints):
+        self._steps = steps
+        self._hints = hints
+
+    @property
+    def hint_count(self):
+        return len(self._hints)
+
+    def hint(self, index):
+        return self._hints[index]
+
+    def steps(self):
+        return list(self._steps)
+
+    def hints(self):
+        return list(self._hints)
+
+    def mistake(self, key):
+        return None
+
+
+def mistake_map(answer_key, templates, *wrong_answers):
+    """Build a LazyText mistakes map from (answer key, mistake code) pairs.
+
+    templates maps each mistake code to its hint template. Wrong answers
+    that happen to equal the right one (answer_key) are left out, and the
+    first code listed wins when two mistakes give the same answer.
+    """
+    mistakes = {}
+    for key, code in wrong_answers:
+        if key != answer_key and key not in mistakes:
+            mistakes[key] = (code, templates[code])
+    return mistakes
+
+
+def sign(value):
+    """The '+' or '-' to write in front of abs(value)."""
+    return '+' if value >= 0 else '-'
@@ -0,0 +1,227 @@
+"""
+Process-wide cache of rendered steps, hints and mistake hints.
+
+Two sessions that get the same problem would otherwise each format their own
+copy of the same steps and hints. share_text() wraps a problem's LazyText in
+a SharedText that looks its strings up in one TextCache per process, keyed
+by the text's content: its templates and the numbers that go into them. Two
+seeds that draw the same numbers share one entry, and so do two sessions.
+
+Entries fill in piece by piece, as students ask: the first hint formats only
+that hint, the steps are formatted when someone opens them, and a mistake
+hint when someone makes that mistake. A SharedText keeps only the content
+key, which holds the numbers, and the problem's small mistakes map; the
+LazyText and its params dict are dropped, and an evicted entry is filled
+again by formatting the templates in the key.
+
+The cache is an LRU bounded by an estimate of the bytes it holds, not by a
+count, since a geometry walkthrough is many times the size of a one-step
+hint. Size it with MATH_TEXT_CACHE_MB (default 64).
+"""
+
+import collections
+import os
+import sys
+import threading
+
+from math_core.text import LazyText
+
+DEFAULT_MAX_MB = 64
+MAX_BYTES = int(float(os.environ.get('MATH_TEXT_CACHE_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+# ============================================================================
+# RENDERED TEXT
+# ============================================================================
+
+class RenderedText:
+    """The strings of one problem's text that have been asked for so far."""
+
+    __slots__ = ('steps', 'hints', 'mistakes', 'nbytes')
+
+    def __init__(self, hint_count):
+        self.steps = None
+        self.hints = [None] * hint_count
+        self.mistakes = {}
+        self.nbytes = sys.getsizeof(self) + sys.getsizeof(self.hints) + sys.getsizeof(self.mistakes)
+
+
+def content_key(text):
+    """What makes two LazyTexts render the same: their templates and their numbers.
+
+    The templates are module-level tuples, so comparing two keys mostly
+    compares the same objects; params are built in the same order by the
+    same generator every time.
+    """
+    return text.step_templates, text.hint_templates, tuple(text.params.items())
+
+
+def _params(key):
+    return dict(key[2])
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class TextCache:
+    """Thread-safe LRU of RenderedText by content key, holding at most max_bytes."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entry(self, key, hint_count):
+        """The RenderedText for key, added empty if it isn't cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            entry = self._entries[key] = RenderedText(hint_count)
+            self._grow(entry.nbytes)
+            return entry
+
+    def fill(self, key, entry, slot, index, value, nbytes):
+        """Store one rendered piece of entry (steps, hints[index] or mistakes[index]); returns the stored value.
+
+        If another thread stored it first, that value is kept and returned.
+        """
+        with self._lock:
+            if slot == 'steps':
+                if entry.steps is not None:
+                    return entry.steps
+                entry.steps = value
+            elif slot == 'hints':
+                if entry.hints[index] is not None:
+                    return entry.hints[index]
+                entry.hints[index] = value
+            else:
+                if index in entry.mistakes:
+                    return entry.mistakes[index]
+                entry.mistakes[index] = value
+            entry.nbytes += nbytes
+            # An entry evicted while it was being filled no longer counts
+            if self._entries.get(key) is entry:
+                self._grow(nbytes)
+            return value
+
+    def _grow(self, nbytes):
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, oldest = self._entries.popitem(last=False)
+            self.nbytes -= oldest.nbytes
+            self.evictions += 1
+
+    def stats(self):
+        """Entries, bytes and hit/miss/eviction counts, as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The TextCache shared by every session in this process."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = TextCache()
+    return _shared
+
+
+# ============================================================================
+# SHARED TEXT
+# ============================================================================
+
+class SharedText:
+    """A LazyText whose rendered strings live in the shared cache.
+
+    Holds the content key and the mistakes map only; anything not cached is
+    formatted from the templates and numbers in the key.
+    """
+
+    __slots__ = ('key', 'mistakes')
+
+    def __init__(self, text):
+        self.key = content_key(text)
+        self.mistakes = text.mistakes
+
+    def _entry(self):
+        return shared_cache().entry(self.key, self.hint_count)
+
+    @property
+    def hint_count(self):
+        return len(self.key[1])
+
+    def hint(self, index):
+        entry = self._entry()
+        hint = entry.hints[index]
+        if hint is None:
+            hint = self.key[1][index].format_map(_params(self.key))
+            hint = shared_cache().fill(self.key, entry, 'hints', index, hint, sys.getsizeof(hint))
+        return hint
+
+    def hints(self):
+        return [self.hint(index) for index in range(self.hint_count)]
+
+    def steps(self):
+        entry = self._entry()
+        steps = entry.steps
+        if steps is None:
+            params = _params(self.key)
+            steps = tuple(template.format_map(params) for template in self.key[0])
+            nbytes = sys.getsizeof(steps) + sum(sys.getsizeof(step) for step in steps)
+            steps = shared_cache().fill(self.key, entry, 'steps', None, steps, nbytes)
+        return list(steps)
+
+    def mistake(self, key):
+        # Only known mistakes are cached, so random wrong answers can't fill the entry
+        if not self.mistakes or key not in self.mistakes:
+            return None
+        entry = self._entry()
+        found = entry.mistakes.get(key)
+        if found is None:
+            code, template = self.mistakes[key]
+            found = code, template.format_map(_params(self.key))
+            nbytes = sys.getsizeof(key) + sys.getsizeof(found) + sum(sys.getsizeof(part) for part in found)
+            found = shared_cache().fill(self.key, entry, 'mistakes', key, found, nbytes)
+        return found
+
+
+def share_text(problem):
+    """Make problem read its steps and hints through the shared cache.
+
+    Only LazyText is shared: banked text already reads one copy of each
+    string from the bank, and static text is plain strings to begin with.
+    """
+    if isinstance(problem.text, LazyText):
+        problem.text = SharedText(problem.text)
+    return problem
@@ -10,10 +10,20 @@ Features:
 - Clear, colorful feedback
 """
 
+import uuid
+
 import streamlit as st
-import random
-from fractions import Fraction
-import re
+
+from math_core.adaptive import AdaptiveMix
+from math_core.events import log_event
+from math_core.generators import generate_new_problem, generate_review_problem
+from math_core.norepeat import NoRepeat
+from math_core.prefetch import ProblemQueue
+from math_core.review import ReviewScheduler, answer_quality
+from math_core.registry import MIXED_PRACTICE, focus_rule, menu_labels, type_for_menu_label
+from math_core.rng import session_rng
+from math_core.store import get_store
+from math_core.textcache import share_text
 
 # ============================================================================
 # PAGE CONFIGURATION
@@ -100,12 +110,8 @@ def init_session_state():
         st.session_state.total_questions = 0
     if 'streak' not in st.session_state:
         st.session_state.streak = 0
-    if 'current_problem' not in st.session_state:
-        st.session_state.current_problem = None
-    if 'current_answer' not in st.session_state:
-        st.session_state.current_answer = None
-    if 'current_steps' not in st.session_state:
-        st.session_state.current_steps = []
+    if 'problem' not in st.session_state:
+        st.session_state.problem = None
     if 'show_hint' not in st.session_state:
         st.session_state.show_hint = False
     if 'show_steps' not in st.session_state:
@@ -116,1317 +122,214 @@ def init_session_state():
         st.session_state.problem_type = 'simplify'
     if 'hint_level' not in st.session_state:
         st.session_state.hint_level = 0
-    if 'hints' not in st.session_state:
-        st.session_state.hints = []
-    if 'problem_label' not in st.session_state:
-        st.session_state.problem_label = ""
     if 'problem_choice' not in st.session_state:
         st.session_state.problem_choice = '📐 Simplifying Expressions'
+    if 'rng' not in st.session_state:
+        # Each student gets their own random stream; problem seeds come from it
+        st.session_state.rng = session_rng()
+    if 'no_repeat' not in st.session_state:
+        st.session_state.no_repeat = NoRepeat()
+    if 'mix' not in st.session_state:
+        # Mixed Practice leans towards the topics this student is missing
+        st.session_state.mix = AdaptiveMix()
+    if 'reviews' not in st.session_state:
+        # Missed skills come back on a spaced schedule; review is the one on screen
+        st.session_state.reviews = ReviewScheduler()
+        st.session_state.review = None
+    if 'problem_queue' not in st.session_state:
+        st.session_state.problem_queue = ProblemQueue(st.session_state.rng, no_repeat=st.session_state.no_repeat,
+                                                      sampler=st.session_state.mix)
+    if 'feedback' not in st.session_state:
+        # Result of the last submitted answer, kept until the next problem
+        st.session_state.feedback = None
+    if 'student_id' not in st.session_state:
+        resume_progress()
+
+
+def resume_progress():
+    """Pick up this student's saved progress, from any server process.
+
+    The student id rides in the page URL (?student=...), so a reload or a
+    session on another worker finds the same progress in the store.
+    """
+    student_id = st.query_params.get('student')
+    if not student_id:
+        student_id = uuid.uuid4().hex
+        st.query_params['student'] = student_id
+    st.session_state.student_id = student_id
+
+    saved = get_store().load(student_id)
+    if not saved:
+        return
+    st.session_state.score = saved['score']
+    st.session_state.total_questions = saved['total_questions']
+    st.session_state.streak = saved['streak']
+    if saved['problem_choice'] in menu_labels():
+        st.session_state.problem_choice = saved['problem_choice']
+        st.session_state.problem_type = saved['problem_type']
+    # The review on screen stays on screen, not due again as a new problem
+    review = tuple(saved['review']) if saved['problem'] and saved.get('review') else None
+    st.session_state.reviews = ReviewScheduler.from_list(saved.get('reviews', []), on_screen=review)
+    st.session_state.mix = AdaptiveMix.from_dict(saved.get('mix'))
+    st.session_state.problem_queue.sampler = st.session_state.mix
+    if saved['problem']:
+        problem_type, seed = saved['problem']
+        st.session_state.problem = share_text(generate_new_problem(problem_type, seed=seed))
+        st.session_state.review = review
+        # Where the student was on it, so a reload can't grade the same answer twice
+        st.session_state.answered = saved.get('answered', False)
+        feedback = saved.get('feedback')
+        st.session_state.feedback = dict(feedback) if feedback else None
+        if feedback and feedback['correct']:
+            st.session_state.feedback['balloons'] = False  # already celebrated
+        st.session_state.hint_level = saved.get('hint_level', 0)
+        st.session_state.show_hint = saved.get('show_hint', st.session_state.hint_level > 0)
+        st.session_state.show_steps = saved.get('show_steps', False)
+
+
+def save_progress():
+    """Queue this student's progress for the shared store."""
+    problem = st.session_state.problem
+    get_store().save(st.session_state.student_id, {
+        'score': st.session_state.score,
+        'total_questions': st.session_state.total_questions,
+        'streak': st.session_state.streak,
+        'problem_choice': st.session_state.problem_choice,
+        'problem_type': st.session_state.problem_type,
+        'problem': list(problem.key) if problem is not None and problem.seed is not None else None,
+        'answered': st.session_state.answered,
+        # A copy: the panel changes feedback after this save is queued
+        'feedback': dict(st.session_state.feedback) if st.session_state.feedback else None,
+        'hint_level': st.session_state.hint_level,
+        'show_hint': st.session_state.show_hint,
+        'show_steps': st.session_state.show_steps,
+        'review': list(st.session_state.review) if st.session_state.review is not None else None,
+        'reviews': st.session_state.reviews.to_list(),
+        'mix': st.session_state.mix.to_dict(),
+    })
 
 init_session_state()
 
 # ============================================================================
-# PROBLEM GENERATION FUNCTIONS
+# CALLBACKS
 # ============================================================================
-
-# Helper function to generate an algebraic expression answer string
-def format_answer_string(x_coef, constant):
-    answer = ""
-    
-    if x_coef == 1:
-        answer = "x"
-    elif x_coef == -1:
-        answer = "-x"
-    elif x_coef != 0:
-        answer = f"{x_coef}x"
-    
-    if constant > 0 and answer:
-        answer += f" + {constant}"
-    elif constant < 0 and answer:
-        answer += f" - {abs(constant)}"
-    elif constant != 0 and not answer:
-        answer = str(constant)
-    elif not answer and constant == 0:
-        answer = "0"
-        
-    return answer.replace(" ", "")
-
-# --- SIMPLIFYING EXPRESSION GENERATORS (Truncated for brevity, but included in full code) ---
-def gen_distribute_combine():
-    """Generate: a(bx + c) + dx + e"""
-    a = random.randint(-5, 5)
-    if a == 0: a = 2
-    b = random.randint(2, 8)
-    c = random.randint(-10, 10)
-    d = random.randint(-8, 8)
-    e = random.randint(-10, 10)
-    
-    x_coef = a * b + d
-    constant = a * c + e
-    
-    expr = f"{a}({b}x + {c}) + {d}x + {e}"
-    expr = expr.replace("+ -", "- ").replace("- -", "+ ")
-    
-    answer = format_answer_string(x_coef, constant)
-    
-    steps = [
-        f"🎯 **First, let's distribute!** Think of {a} as giving something to everyone inside the parentheses.",
-        f"   • {a} × {b}x = {a*b}x",
-        f"   • {a} × {c} = {a*c}",
-        f"📝 Now we have: **{a*b}x {('+' if a*c >= 0 else '-')} {abs(a*c)} {('+' if d >= 0 else '-')} {abs(d)}x {('+' if e >= 0 else '-')} {abs(e)}**",
-        f"🔍 **Combine the x terms**: {a*b}x + {d}x = **{x_coef}x**",
-        f"🔍 **Combine the numbers**: {a*c} + {e} = **{constant}**",
-        f"✨ **Final Answer: {answer}**"
-    ]
-    
-    hints = [
-        f"💡 **Think of it like sharing pizza!** 🍕 The {a} outside needs to multiply with EVERYTHING inside the ( ).",
-        f"💡 **Now play matchmaker!** 💑 Find all your 'x' terms and add them up. Then find all your plain numbers and add those up separately.",
-        f"💡 **Almost there, superstar!** ⭐ Combine your x terms ({a*b}x and {d}x) and your number buddies ({a*c} and {e})!"
-    ]
-    
-    return expr, answer, steps, hints
-
-def gen_distribute_negative():
-    """Generate: -a(bx - c)"""
-    a = random.randint(2, 7)
-    b = random.randint(2, 8)
-    c = random.randint(1, 10)
-    
-    x_coef = -a * b
-    constant = a * c
-    
-    expr = f"-{a}({b}x - {c})"
-    answer = format_answer_string(x_coef, constant)
-    
-    steps = [
-        f"🎯 **Watch out for the negative sign!** The minus applies to everything.",
-        f"**Step 1: Distribute -{a}:** -{a} × {b}x = {-a * b}x, and -{a} × (-{c}) = +{a * c}",
-        f"**Step 2: Final answer:** **{answer}**",
-        f"✨ **Remember:** A minus outside flips ALL the signs inside!"
-    ]
-    
-    hints = [
-        f"💡 **Distribute the minus!** The -{a} multiplies both terms: {b}x and -{c}.",
-        f"💡 **Change the signs!** -{a} × (-{c}) = +{a * c} because two negatives make a positive!",
-        f"💡 **Final result:** {-a * b}x {('+' if constant >= 0 else '-')} {abs(constant)}"
-    ]
-    
-    return expr, answer, steps, hints
-
-def gen_multi_distribute():
-    """Generate: a(bx + c) - d(ex + f)"""
-    a = random.randint(2, 5)
-    b = random.randint(2, 6)
-    c = random.randint(1, 8)
-    d = random.randint(2, 5)
-    e = random.randint(2, 6)
-    f = random.randint(1, 8)
-    
-    x_coef = a * b - d * e
-    constant = a * c - d * f
-    
-    expr = f"{a}({b}x + {c}) - {d}({e}x + {f})"
-    answer = format_answer_string(x_coef, constant)
-    
-    steps = [
-        f"🎯 **Two groups to distribute!** Handle each set of parentheses separately.",
-        f"**Step 1: Distribute {a}:** {a}({b}x + {c}) = {a * b}x + {a * c}",
-        f"**Step 2: Distribute -{d}:** -{d}({e}x + {f}) = -{d * e}x - {d * f}",
-        f"**Step 3: Combine like terms:** x terms: {a * b}x - {d * e}x = {x_coef}x",
-        f"**Step 4: Combine constants:** {a * c} - {d * f} = {constant}",
-        f"✨ **Final Answer: {answer}**"
-    ]
-    
-    hints = [
-        f"💡 **Distribute both groups!** First multiply {a} with everything in the first parentheses, then -{d} with everything in the second.",
-        f"💡 **Watch the minus sign!** When distributing -{d}, it becomes -{d * e}x - {d * f}.",
-        f"💡 **Combine like terms:** Add up all your x terms, then add up all the numbers."
-    ]
-    
-    return expr, answer, steps, hints
-
-def gen_fraction_simplify():
-    """Generate fraction simplification: (a/b)x + (c/d)x"""
-    denominators = [2, 3, 4, 5, 6]
-    b = random.choice(denominators)
-    d = random.choice(denominators)
-    a = random.randint(1, 5)
-    c = random.randint(1, 5)
-    
-    numerator = a * d + c * b
-    denominator = b * d
-    result = Fraction(numerator, denominator)
-    
-    expr = f"{a}/{b}x + {c}/{d}x"
-    
-    if result == 1:
-        answer = "x"
-    elif result == -1:
-        answer = "-x"
-    else:
-        answer = f"{result}x"
-    
-    steps = [
-        f"🎯 **Different denominators!** Need common denominator to add fractions.",
-        f"**Step 1: Find common denominator:** {b} × {d} = {denominator}",
-        f"**Step 2: Convert first fraction:** {a}/{b}x = ({a} × {d})/{denominator}x = {a * d}/{denominator}x",
-        f"**Step 3: Convert second fraction:** {c}/{d}x = ({c} × {b})/{denominator}x = {c * b}/{denominator}x",
-        f"**Step 4: Add numerators:** {a * d}/{denominator}x + {c * b}/{denominator}x = {numerator}/{denominator}x",
-        f"**Step 5: Simplify:** {numerator}/{denominator} = {result}",
-        f"✨ **Final Answer: {answer}**"
-    ]
-    
-    hints = [
-        f"💡 **Get common denominators first!** Multiply {b} × {d} = {denominator}",
-        f"💡 **Convert both fractions:** {a}/{b} becomes {a * d}/{denominator} and {c}/{d} becomes {c * b}/{denominator}",
-        f"💡 **Add the numerators:** {a * d} + {c * b} = {numerator}"
-    ]
-    
-    return expr, answer.replace(" ", ""), steps, hints
-
-def gen_fraction_simplify_mixed():
-    """Generate: (a/b)(cx + d) + ex"""
-    b = random.choice([2, 3, 4, 5])
-    a = random.randint(1, 4)
-    c = random.randint(2, 6)
-    d = random.randint(-8, 8)
-    e = random.randint(-6, 6)
-    
-    x_coef = Fraction(a * c + e * b, b)
-    constant = Fraction(a * d, b)
-    
-    expr = f"{a}/{b}({c}x + {d}) + {e}x"
-    
-    # Format the answer properly with both x term and constant
-    if constant == 0:
-        answer = format_answer_string(x_coef, 0)
+# Buttons change session state in on_click callbacks, which Streamlit runs
+# before the one rerun a click causes, so the page never has to call
+# st.rerun() and run the whole script a second time.
+
+CELEBRATIONS = ["Awesome!", "Perfect!", "You got it!", "Excellent!", "Nailed it!", "Outstanding!", "Amazing!"]
+
+
+def new_problem():
+    """New Problem / Skip / Next: the page takes a fresh problem on this run."""
+    if st.session_state.problem is not None and not st.session_state.answered:
+        log_event('skip', st.session_state.student_id, st.session_state.problem,
+                  hints=st.session_state.hint_level, steps=st.session_state.show_steps)
+        if st.session_state.review is not None:
+            st.session_state.reviews.skipped(st.session_state.review)
+    st.session_state.problem = None
+
+
+def change_topic():
+    """Sidebar topic picked: switch type and start a new problem (Mixed Practice keeps the current one)."""
+    chosen_type = type_for_menu_label(st.session_state.problem_choice)
+    log_event('topic', st.session_state.student_id, st.session_state.problem,
+              choice=chosen_type or MIXED_PRACTICE)
+    if chosen_type is not None and chosen_type != st.session_state.problem_type:
+        # A review left on screen goes back in the schedule, as with Skip
+        if st.session_state.review is not None and not st.session_state.answered:
+            st.session_state.reviews.skipped(st.session_state.review)
+        st.session_state.problem_type = chosen_type
+        st.session_state.problem = None
+
+
+def next_hint():
+    st.session_state.show_hint = True
+    if st.session_state.hint_level < st.session_state.problem.text.hint_count:
+        st.session_state.hint_level += 1
+    log_event('hint', st.session_state.student_id, st.session_state.problem, level=st.session_state.hint_level)
+    save_progress()
+
+
+def show_all_steps():
+    st.session_state.show_steps = True
+    log_event('steps', st.session_state.student_id, st.session_state.problem, hints=st.session_state.hint_level)
+    save_progress()
+
+
+def submit_answer():
+    """Grade the submitted answer and keep the result to show until the next problem."""
+    user_answer = st.session_state.temp_answer_input
+    if not user_answer:
+        return
+    problem = st.session_state.problem
+    st.session_state.total_questions += 1
+    st.session_state.answered = True
+    st.session_state.sidebar_stale = True
+    correct = problem.check(user_answer)
+    st.session_state.mix.record(problem.problem_type, correct)
+    review = st.session_state.review
+    if review is not None:
+        st.session_state.reviews.answered(review, answer_quality(correct, st.session_state.hint_level,
+                                                                 st.session_state.show_steps))
+        st.session_state.review = None
+    mistake = None if correct else problem.diagnose(user_answer)
+    log_event('submit', st.session_state.student_id, problem, answer=user_answer, correct=correct,
+              mistake=mistake[0] if mistake else None,
+              hints=st.session_state.hint_level, steps=st.session_state.show_steps)
+    if correct:
+        st.session_state.score += 1
+        st.session_state.streak += 1
+        st.session_state.feedback = {
+            'correct': True,
+            'message': st.session_state.rng.choice(CELEBRATIONS),
+            'streak': st.session_state.streak,
+            'balloons': st.session_state.streak >= 3,
+        }
     else:
-        # We need to combine the x term and constant with common denominator
-        if x_coef.denominator == 1:
-            # x_coef is a whole number
-            if constant.denominator == 1:
-                # Both whole numbers
-                answer = format_answer_string(x_coef.numerator, constant.numerator)
-            else:
-                # x_coef whole, constant fraction
-                answer = f"{x_coef.numerator}x + {constant}"
-        else:
-            # x_coef is a fraction
-            if constant == 0:
-                answer = f"{x_coef}x"
-            else:
-                # Both are fractions with same denominator
-                if constant.denominator == x_coef.denominator:
-                    answer = f"{x_coef.numerator}x + {constant.numerator}/{constant.denominator}"
-                else:
-                    answer = f"{x_coef}x + {constant}"
-    
-    steps = [
-        f"🎯 **Fraction distribution!** The {a}/{b} needs to multiply both terms inside the parentheses.",
-        f"**Step 1: Distribute {a}/{b}:** ({a}/{b}) × {c}x = {a*c}/{b}x, and ({a}/{b}) × {d} = {a*d}/{b}",
-        f"📝 Now we have: **{a*c}/{b}x {('+' if a*d >= 0 else '-')} {abs(a*d)}/{b} + {e}x**",
-        f"**Step 2: Get common denominator for x terms:** {e}x = {e*b}/{b}x",
-        f"**Step 3: Combine x terms:** {a*c}/{b}x + {e*b}/{b}x = {a*c + e*b}/{b}x",
-        f"✨ **Final Answer: {answer}**"
-    ]
-    
-    hints = [
-        f"💡 **Distribute the fraction!** {a}/{b} needs to be multiplied with EVERYTHING: {c}x and {d}",
-        f"💡 **Get common denominators!** Turn {e}x into a fraction with denominator {b}: {e}x = {e*b}/{b}x",
-        f"💡 **Combine the x terms!** Add {a*c}/{b}x + {e*b}/{b}x = {a*c + e*b}/{b}x = {x_coef}x"
-    ]
-    
-    return expr, answer.replace(" ", ""), steps, hints
-
-def gen_multi_variable_combine():
-    """Generate: ax^2 + bx + cy + d + ex^2 + fx + gy + h (Combine like terms)"""
-    a = random.randint(1, 8)
-    # ... (problem generation logic)
-    expr = "3x^2 + 5x + 2y + 4 + 2x^2 + 3x + y + 1" # Hardcoded for brevity
-    answer = "5x^2+8x+3y+5"
-    steps = ['s1', 's2', 's3']
-    hints = ['h1', 'h2', 'h3']
-    return expr, answer.replace(" ", ""), steps, hints
-
-
-# --- EQUATION GENERATORS (Truncated for brevity, but included in full code) ---
-def gen_linear_eq():
-    """Generate: ax + b = c"""
-    a = random.randint(-10, 10)
-    if a == 0: a = 3
-    b = random.randint(-15, 15)
-    c = random.randint(-20, 20)
-    
-    x_val = Fraction(c - b, a)
-    equation = f"{a}x + {b} = {c}".replace("+ -", "- ")
-    answer = str(x_val)
-    
-    steps = [
-        f"🎯 **Isolate x!** Get x by itself on one side.",
-        f"**Step 1: Subtract {b} from both sides:** {equation} becomes {a}x = {c - b}",
-        f"**Step 2: Divide both sides by {a}:** x = {c - b}/{a}",
-        f"**Step 3: Simplify:** x = **{x_val}**",
-        f"✨ **Remember:** Whatever you do to one side, do the same to the other! ⚖️"
-    ]
-    
-    hints = [
-        f"💡 **The Golden Rule:** What you do to one side, you MUST do to the other! First, get rid of {b} by subtracting it.",
-        f"💡 **Next step:** Now divide by {a} to isolate x. The equation is {a}x = {c - b}",
-        f"💡 **Final step:** x = {c - b} ÷ {a} = {x_val}"
-    ]
-    
-    return equation, answer, steps, hints
-
-def gen_fraction_eq():
-    """Generate: x/a + b = c (Equation with a fractional term)"""
-    a = random.choice([2, 3, 4, 5])
-    b = random.randint(-8, 8)
-    k = random.randint(-5, 5)
-    if k == 0: k = 2
-    c = b + k
-    x_val = k * a
-    equation = f"x/{a} + {b} = {c}".replace("+ -", "- ")
-    answer = str(x_val)
-    
-    steps = [
-        f"🎯 **Get rid of the fraction!** Isolate x by working backwards.",
-        f"**Step 1: Subtract {b} from both sides:** x/{a} = {c - b}",
-        f"**Step 2: Multiply both sides by {a}:** x = {c - b} × {a}",
-        f"**Step 3: Calculate:** x = **{x_val}**",
-        f"✨ **Remember:** To undo division by {a}, multiply by {a}!"
-    ]
-    
-    hints = [
-        f"💡 **First step:** Subtract {b} from both sides to get x/{a} by itself.",
-        f"💡 **Now multiply:** To get x alone, multiply both sides by {a}. This gives x = {c - b} × {a}",
-        f"💡 **Final answer:** x = {x_val}"
-    ]
-    
-    return equation, answer, steps, hints
-
-def gen_distribute_eq():
-    """Generate: a(bx + c) + dx + e = f"""
-    a = random.randint(-4, 4)
-    if a == 0: a = 2
-    b = random.randint(2, 5)
-    c = random.randint(-8, 8)
-    d = random.randint(-6, 6)
-    e = random.randint(-10, 10)
-    f = random.randint(-15, 15)
-    
-    x_coef = a * b + d
-    if x_coef == 0: x_coef = 1
-    const = a * c + e
-    
-    x_val = Fraction(f - const, x_coef)
-    equation = f"{a}({b}x + {c}) + {d}x + {e} = {f}"
-    answer = str(x_val)
-    
-    # Calculate intermediate values for steps
-    distributed_x = a * b
-    distributed_const = a * c
-    combined_x = distributed_x + d
-    combined_const = distributed_const + e
-    
-    steps = [
-        f"🎯 **Simplify first, then solve!** Distribute and combine like terms.",
-        f"**Step 1: Distribute {a}:** {a}({b}x + {c}) = {distributed_x}x + {distributed_const}",
-        f"**Step 2: Combine like terms:** {distributed_x}x + {d}x = {combined_x}x, and {distributed_const} + {e} = {combined_const}",
-        f"**Step 3: Simplified equation:** {combined_x}x + {combined_const} = {f}",
-        f"**Step 4: Subtract {combined_const} from both sides:** {combined_x}x = {f - combined_const}",
-        f"**Step 5: Divide by {combined_x}:** x = {f - combined_const}/{combined_x} = **{x_val}**",
-        f"✨ **You did it!** Step by step gets you there! 🎉"
-    ]
-    
-    hints = [
-        f"💡 **Start by distributing!** Multiply {a} with everything inside the parentheses: {a} × {b}x and {a} × {c}",
-        f"💡 **Combine like terms!** Add up all the x terms and all the plain numbers separately.",
-        f"💡 **Now solve!** After simplifying, use the Golden Rule: subtract, then divide to find x = {x_val}"
-    ]
-    
-    return equation, answer, steps, hints
-
-
-# ============================================================================
-# UNIT RATE AND RATIO GENERATORS
-# ============================================================================
-
-def gen_unit_rate_basic():
-    """Generate a basic word problem asking for a unit rate."""
-    
-    scenarios = [
-        ("miles", "hours", "a road trip"),
-        ("dollars", "pounds of bananas", "grocery shopping"),
-        ("words", "minutes", "typing a report"),
-        ("pages", "days", "reading a book"),
-        ("meters", "seconds", "running a race"),
-        ("gallons", "miles", "driving your car"),
-        ("cups", "servings", "making lemonade")
-    ]
-    
-    unit1, unit2, context = random.choice(scenarios)
-    
-    # Ensure the rate is a clean, whole number for basic problems
-    rate = random.randint(5, 50)
-    denominator = random.randint(2, 10)
-    numerator = rate * denominator
-    
-    answer_label = f"{unit1} per {unit2.rstrip('s')}"
-
-    problem = f"During {context}, you traveled **{numerator} {unit1}** in **{denominator} {unit2}**. What is the **unit rate**?"
-    
-    answer = str(rate)
-    
-    steps = [
-        "🎯 **Unit Rate Goal:** Find out how much for **1 unit** (e.g., 1 hour, 1 pound, 1 minute).",
-        f"**Step 1: Set up the division:** Rate = $\\frac{{\\text{{Total Quantity}}}}{{\\text{{Total Units}}}} = \\frac{{{numerator} \\text{{ {unit1}}}}}{{{denominator} \\text{{ {unit2}}}}}$",
-        f"**Step 2: Divide:** {numerator} $\\div$ {denominator} = **{rate}**",
-        f"✨ **Final Answer:** {rate} {answer_label}"
-    ]
-    
-    hints = [
-        f"💡 **Think simple division!** Just divide the first number ({numerator}) by the second number ({denominator}).",
-        "💡 **You're finding the amount for just ONE unit!** Divide the total by the count.",
-        f"💡 **Remember the question:** You need to find the rate in {unit1} **per 1** {unit2.rstrip('s')}."
-    ]
-    
-    return problem, answer, steps, hints, "Find the Unit Rate:"
-
-
-def gen_unit_rate_reverse():
-    """Generate a problem where you find the total given unit rate and number of units."""
-    
-    scenarios = [
-        ("miles per hour", "miles", "hours", "driving"),
-        ("pages per day", "pages", "days", "reading"),
-        ("words per minute", "words", "minutes", "typing"),
-        ("pounds per week", "pounds", "weeks", "weight loss"),
-        ("dollars per hour", "dollars", "hours", "working")
-    ]
-    
-    rate_label, unit1, unit2, context = random.choice(scenarios)
-    unit_rate = random.randint(10, 60)
-    units = random.randint(3, 10)
-    
-    total = unit_rate * units
-    
-    problem = f"If you're moving at a rate of **{unit_rate} {rate_label}** and you continue for **{units} {unit2}**, how many **{unit1}** will you travel?"
-    
-    answer = str(total)
-    
-    steps = [
-        "🎯 **Reverse Unit Rate:** You have the rate and need to find the total.",
-        f"**Step 1: Identify what you know:** Rate = {unit_rate} {rate_label}, Time = {units} {unit2}",
-        f"**Step 2: Multiply:** Total = Rate × Units = {unit_rate} × {units}",
-        f"**Step 3: Calculate:** {unit_rate} × {units} = **{total}**",
-        f"✨ **Final Answer:** {total} {unit1}"
-    ]
-    
-    hints = [
-        f"💡 **Think multiplication!** You have the rate ({unit_rate}) and you need to multiply it by {units}.",
-        "💡 **Rate × Time = Total!** If you know the speed, multiply by the time to get UNIT RATE × UNITS = TOTAL.",
-        f"💡 **Use the formula:** {unit_rate} × {units} = ?"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Total:"
-
-
-def gen_equivalent_ratios():
-    """Generate equivalent ratio problems."""
-    
-    scenarios = [
-        ("students", "computers", "the computer lab"),
-        ("cookies", "brownies", "baking"),
-        ("blue", "red", "mixing paint"),
-        ("dogs", "cats", "the pet store")
-    ]
-    
-    unit1, unit2, context = random.choice(scenarios)
-    
-    # Start with a simple ratio
-    a = random.randint(2, 5)
-    b = random.randint(2, 6)
-    
-    # Generate equivalent ratio
-    multiplier = random.randint(2, 5)
-    c = a * multiplier
-    d = b * multiplier
-    
-    problem = f"In {context}, the ratio of **{unit1} to {unit2}** is **{a}:{b}**. If there are **{c} {unit1}**, how many **{unit2}** are there?"
-    
-    answer = str(d)
-    
-    steps = [
-        f"🎯 **Equivalent Ratios:** A:{b} must equal {c}:?",
-        f"**Step 1: Set up the proportion:** $\\frac{{{a}}}{{{b}}} = \\frac{{{c}}}{{?}}$",
-        f"**Step 2: Identify the scale factor:** {c} $\\div$ {a} = {multiplier}",
-        f"**Step 3: Apply the scale factor:** {b} × {multiplier} = **{d}**",
-        f"✨ **Final Answer:** {d} {unit2}"
-    ]
-    
-    hints = [
-        f"💡 **Find the multiplier!** If {a} became {c}, you multiplied by {c}/{a}. Do the same to {b}!",
-        f"💡 **Proportion thinking:** The ratio {a}:{b} must stay the same. If {a} becomes {c} (×{multiplier}), then {b} becomes {b}×{multiplier}.",
-        f"💡 **Cross multiplication:** {a} × ? = {b} × {c}, so ? = ({b} × {c}) ÷ {a}"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Missing Value:"
-
-
-def gen_comparing_rates():
-    """Generate problems comparing two different rates."""
-    
-    items = [
-        ("beats per minute", "playlist"),
-        ("items per hour", "assembly line"),
-        ("miles per gallon", "car"),
-        ("problems per hour", "homework")
-    ]
-    
-    rate_label, context = random.choice(items)
-    
-    rate1 = random.randint(35, 80)
-    rate2 = random.randint(15, rate1 - 10)
-    
-    # Ensure rate1 is always larger so answer is predictable
-    diff = rate1 - rate2
-    
-    problem = f"You complete **{rate1} {rate_label}** on Task A and **{rate2} {rate_label}** on Task B. How many more {rate_label} does Task A complete?"
-    
-    answer = str(diff)
-    
-    steps = [
-        "🎯 **Comparing Rates:** Find the difference between the two rates.",
-        f"**Step 1: Identify both rates:** Task A: {rate1}, Task B: {rate2}",
-        f"**Step 2: Find the difference:** {rate1} - {rate2} = **{diff}**",
-        f"✨ **Final Answer:** Task A completes {diff} more {rate_label}"
-    ]
-    
-    hints = [
-        f"💡 **Subtract the rates!** {rate1} - {rate2} = ?",
-        f"💡 **Find the difference:** Subtract the smaller number ({rate2}) from the larger number ({rate1}).",
-        f"💡 **Task A has {diff} more {rate_label} than Task B.**"
-    ]
-    
-    return problem, answer, steps, hints, "Compare the Rates:"
-
-
-def gen_ratio_fractions():
-    """Generate ratio scaling problems using fractions."""
-
-    scenarios = [
-        ("cups of flour", "cups of sugar", "baking cookies"),
-        ("red paint", "blue paint", "mixing purple paint"),
-        ("boys", "girls", "the classroom"),
-        ("teachers", "students", "the school")
-    ]
-
-    unit1, unit2, context = random.choice(scenarios)
-
-    # Start with a simple ratio
-    a = random.randint(2, 6)
-    b = random.randint(2, 6)
-
-    # Use a fraction as multiplier (like 1/2, 1/3, 2/3, 3/2)
-    numerators = [1, 1, 2, 3, 1]
-    denominators = [2, 3, 3, 2, 4]
-    idx = random.randint(0, len(numerators) - 1)
-    mult_num = numerators[idx]
-    mult_den = denominators[idx]
-
-    # Calculate the new ratio
-    new_a = Fraction(a * mult_num, mult_den)
-    new_b = Fraction(b * mult_num, mult_den)
-
-    problem = f"A recipe uses **{a} {unit1}** for every **{b} {unit2}**. If you want to make **{mult_num}/{mult_den}** of the recipe, how many {unit1} do you need?"
-
-    answer = str(new_a)
-
-    steps = [
-        f"🎯 **Scaling with fractions:** Multiply the original amount by the scale factor.",
-        f"**Step 1: Identify the scale factor:** {mult_num}/{mult_den} of the recipe",
-        f"**Step 2: Multiply the {unit1}:** {a} × {mult_num}/{mult_den} = {a * mult_num}/{mult_den}",
-        f"**Step 3: Simplify if needed:** {a * mult_num}/{mult_den} = **{new_a}**",
-        f"✨ **Final Answer:** {new_a} {unit1}"
-    ]
-
-    hints = [
-        f"💡 **Think of it as finding a fraction of the amount!** What is {mult_num}/{mult_den} of {a}?",
-        f"💡 **Multiply!** {a} × {mult_num}/{mult_den} = ({a} × {mult_num}) ÷ {mult_den}",
-        f"💡 **Calculate:** ({a} × {mult_num}) ÷ {mult_den} = {a * mult_num} ÷ {mult_den} = {new_a}"
-    ]
-
-    return problem, answer, steps, hints, "Scale the Ratio:"
-
-
-def gen_solving_proportions():
-    """Generate proportion-solving problems using cross-multiplication."""
-
-    scenarios = [
-        ("miles", "hours", "driving"),
-        ("pages", "minutes", "reading"),
-        ("dollars", "items", "shopping"),
-        ("meters", "seconds", "running")
-    ]
-
-    unit1, unit2, context = random.choice(scenarios)
-
-    # Create a proportion: a/b = c/x
-    a = random.randint(3, 12)
-    b = random.randint(2, 10)
-    c = random.randint(4, 15)
-
-    # Calculate x using cross-multiplication
-    x = Fraction(b * c, a)
-
-    problem = f"If **{a} {unit1}** takes **{b} {unit2}**, how many {unit2} will **{c} {unit1}** take? (Solve using a proportion)"
-
-    answer = str(x)
-
-    steps = [
-        f"🎯 **Set up the proportion:** Two equal ratios!",
-        f"**Step 1: Write the proportion:** {a}/{b} = {c}/x",
-        f"**Step 2: Cross-multiply:** {a} × x = {b} × {c}",
-        f"**Step 3: Calculate the right side:** {b} × {c} = {b * c}",
-        f"**Step 4: Solve for x:** x = {b * c}/{a} = **{x}**",
-        f"✨ **Final Answer:** {x} {unit2}"
-    ]
-
-    hints = [
-        f"💡 **Set up your proportion!** {a} {unit1} / {b} {unit2} = {c} {unit1} / ? {unit2}",
-        f"💡 **Use cross-multiplication!** Multiply diagonally: {a} × ? = {b} × {c}",
-        f"💡 **Solve it!** ? = ({b} × {c}) ÷ {a} = {b * c} ÷ {a} = {x}"
-    ]
-
-    return problem, answer, steps, hints, "Solve the Proportion:"
-
-
-def gen_constant_proportionality():
-    """Generate problems about constant of proportionality (k in y = kx)."""
-
-    scenarios = [
-        ("cost (y)", "number of items (x)", "dollars", "items", "buying apples"),
-        ("distance (y)", "time (x)", "miles", "hours", "driving at constant speed"),
-        ("earnings (y)", "hours worked (x)", "dollars", "hours", "working a job"),
-        ("pages read (y)", "days (x)", "pages", "days", "reading a book")
-    ]
-
-    y_label, x_label, y_unit, x_unit, context = random.choice(scenarios)
-
-    # Create a simple proportional relationship y = kx
-    k = random.randint(3, 15)
-    x_val = random.randint(2, 10)
-    y_val = k * x_val
-
-    problem = f"When {context}, **{y_label}** is proportional to **{x_label}**. If **y = {y_val}** when **x = {x_val}**, what is the **constant of proportionality (k)**?"
-
-    answer = str(k)
-
-    steps = [
-        f"🎯 **Find k in y = kx:** The constant tells you the rate!",
-        f"**Step 1: Use the formula:** y = kx, so k = y/x",
-        f"**Step 2: Substitute the values:** k = {y_val}/{x_val}",
-        f"**Step 3: Divide:** k = **{k}**",
-        f"**Step 4: Interpret:** This means {k} {y_unit} per {x_unit}!",
-        f"✨ **Final Answer:** k = {k}"
-    ]
-
-    hints = [
-        f"💡 **Use the formula!** If y = kx, then k = y ÷ x",
-        f"💡 **Plug in the numbers:** k = {y_val} ÷ {x_val}",
-        f"💡 **The constant is the unit rate!** k = {k} {y_unit} per {x_unit}"
-    ]
-
-    return problem, answer, steps, hints, "Find k:"
-
-
-def gen_proportional_graph():
-    """Generate problems about proportional relationships shown in coordinate points."""
-
-    # Create a proportional relationship y = kx
-    k = random.randint(2, 8)
-
-    # Generate some coordinate points
-    x_values = [1, 2, 3, 4]
-    points = [(x, k * x) for x in x_values]
-
-    # Format points for display
-    points_str = ", ".join([f"({x}, {y})" for x, y in points])
-
-    problem = f"A graph shows these points on a line: **{points_str}**. This represents a proportional relationship y = kx. What is the **constant of proportionality (k)**?"
-
-    answer = str(k)
-
-    steps = [
-        f"🎯 **Proportional Graph:** In a proportional relationship, y/x is always the same (that's k!)",
-        f"**Step 1: Pick any point and use k = y/x.** Let's use ({points[0][0]}, {points[0][1]})",
-        f"**Step 2: Calculate k:** k = {points[0][1]}/{points[0][0]} = **{k}**",
-        f"**Step 3: Verify with another point!** ({points[1][0]}, {points[1][1]}): k = {points[1][1]}/{points[1][0]} = {k} ✓",
-        f"✨ **Final Answer:** k = {k}"
-    ]
-
-    hints = [
-        f"💡 **In a proportional relationship, y = kx!** So k = y ÷ x",
-        f"💡 **Pick ANY point and divide y by x!** Try ({points[0][0]}, {points[0][1]}): k = {points[0][1]} ÷ {points[0][0]}",
-        f"💡 **The answer is k = {k}!** This means y is always {k} times x."
-    ]
-
-    return problem, answer, steps, hints, "Find k from Graph:"
-
-
-def gen_unit_rate():
-    """Pick a random unit rate problem type."""
-    generators = [
-        gen_unit_rate_basic,
-        gen_unit_rate_reverse,
-        gen_equivalent_ratios,
-        gen_comparing_rates,
-        gen_ratio_fractions,
-        gen_solving_proportions,
-        gen_constant_proportionality,
-        gen_proportional_graph
-    ]
-    return random.choice(generators)()
-
-
-# ============================================================================
-# GEOMETRY PROBLEM GENERATORS
-# ============================================================================
-
-def gen_rectangle_area():
-    """Generate a problem to find the area of a rectangle."""
-    length = random.randint(5, 20)
-    width = random.randint(3, 15)
-    
-    area = length * width
-    
-    problem = f"Find the area of a rectangle with length **{length} units** and width **{width} units**."
-    answer = str(area)
-    
-    steps = [
-        f"🎯 **Finding rectangle area:** Multiply length × width.",
-        f"**Step 1: Identify the formula:** Area = Length × Width",
-        f"**Step 2: Substitute the values:** Area = {length} × {width}",
-        f"**Step 3: Calculate:** Area = **{area} square units**",
-        f"✨ **Final Answer:** {area} square units"
-    ]
-    
-    hints = [
-        f"💡 **Use the area formula!** Area of a rectangle = Length × Width",
-        f"💡 **Multiply the dimensions!** {length} × {width}",
-        f"💡 **Don't forget the units!** The answer should be in square units."
-    ]
-    
-    return problem, answer, steps, hints, "Find the Area:"
-
-
-def gen_triangle_area():
-    """Generate a problem to find the area of a triangle."""
-    base = random.randint(4, 20)
-    height = random.randint(3, 15)
-    
-    # Make sure the area is a whole number for simplicity
-    area = (base * height) // 2
-    
-    problem = f"Find the area of a triangle with base **{base} units** and height **{height} units**."
-    answer = str(area)
-    
-    steps = [
-        f"🎯 **Finding triangle area:** Use the formula Area = (base × height) ÷ 2.",
-        f"**Step 1: Identify the formula:** Area = (Base × Height) ÷ 2",
-        f"**Step 2: Substitute the values:** Area = ({base} × {height}) ÷ 2",
-        f"**Step 3: Multiply first:** {base} × {height} = {base * height}",
-        f"**Step 4: Divide by 2:** {base * height} ÷ 2 = **{area}**",
-        f"✨ **Final Answer:** {area} square units"
-    ]
-    
-    hints = [
-        f"💡 **Use the triangle area formula!** Area = (Base × Height) ÷ 2",
-        f"💡 **Multiply first, then divide!** ({base} × {height}) ÷ 2",
-        f"💡 **Don't forget to divide by 2!** That's what makes it a triangle formula."
-    ]
-    
-    return problem, answer, steps, hints, "Find the Area:"
-
-
-def gen_perimeter():
-    """Generate a problem to find the perimeter of a polygon."""
-    # Choose between rectangle, square, or triangle
-    shape_type = random.choice(["rectangle", "square", "triangle"])
-    
-    if shape_type == "rectangle":
-        length = random.randint(5, 20)
-        width = random.randint(3, 15)
-        perimeter = 2 * (length + width)
-        
-        problem = f"Find the perimeter of a rectangle with length **{length} units** and width **{width} units**."
-        
-        steps = [
-            f"🎯 **Finding rectangle perimeter:** Add all sides (or use the formula).",
-            f"**Step 1: Identify the formula:** Perimeter = 2 × (Length + Width)",
-            f"**Step 2: Substitute the values:** Perimeter = 2 × ({length} + {width})",
-            f"**Step 3: Calculate inside parentheses:** {length} + {width} = {length + width}",
-            f"**Step 4: Multiply by 2:** 2 × {length + width} = **{perimeter}**",
-            f"✨ **Final Answer:** {perimeter} units"
-        ]
-        
-        hints = [
-            f"💡 **Use the perimeter formula!** Perimeter = 2 × (Length + Width)",
-            f"💡 **Or add all four sides!** {length} + {width} + {length} + {width}",
-            f"💡 **Remember:** Perimeter is the distance around the shape."
-        ]
-        
-    elif shape_type == "square":
-        side = random.randint(5, 20)
-        perimeter = 4 * side
-        
-        problem = f"Find the perimeter of a square with side length **{side} units**."
-        
-        steps = [
-            f"🎯 **Finding square perimeter:** Multiply the side length by 4.",
-            f"**Step 1: Identify the formula:** Perimeter = 4 × Side Length",
-            f"**Step 2: Substitute the value:** Perimeter = 4 × {side}",
-            f"**Step 3: Calculate:** 4 × {side} = **{perimeter}**",
-            f"✨ **Final Answer:** {perimeter} units"
-        ]
-        
-        hints = [
-            f"💡 **Use the square perimeter formula!** Perimeter = 4 × Side Length",
-            f"💡 **Or add all four sides!** {side} + {side} + {side} + {side}",
-            f"💡 **Remember:** A square has 4 equal sides."
-        ]
-        
-    else:  # triangle
-        side1 = random.randint(5, 15)
-        side2 = random.randint(5, 15)
-        side3 = random.randint(max(side1, side2) - min(side1, side2) + 1, side1 + side2 - 1)  # Triangle inequality
-        perimeter = side1 + side2 + side3
-        
-        problem = f"Find the perimeter of a triangle with sides **{side1} units**, **{side2} units**, and **{side3} units**."
-        
-        steps = [
-            f"🎯 **Finding triangle perimeter:** Add all three sides.",
-            f"**Step 1: Identify the formula:** Perimeter = Side 1 + Side 2 + Side 3",
-            f"**Step 2: Substitute the values:** Perimeter = {side1} + {side2} + {side3}",
-            f"**Step 3: Calculate:** {side1} + {side2} + {side3} = **{perimeter}**",
-            f"✨ **Final Answer:** {perimeter} units"
-        ]
-        
-        hints = [
-            f"💡 **Add all three sides!** Perimeter = {side1} + {side2} + {side3}",
-            f"💡 **Remember:** Perimeter is the distance around the shape.",
-            f"💡 **Just add them up!** No special formula needed for triangle perimeter."
-        ]
-    
-    answer = str(perimeter)
-    return problem, answer, steps, hints, "Find the Perimeter:"
-
-
-def gen_circle_area():
-    """Generate a problem to find the area of a circle."""
-    # Use simple radius values to avoid complex calculations
-    radius = random.randint(1, 10)
-    
-    # Use 3.14 for pi to keep calculations simple
-    pi = 3.14
-    area = pi * radius * radius
-    
-    # Round to 2 decimal places for simplicity
-    area = round(area, 2)
-    
-    problem = f"Find the area of a circle with radius **{radius} units**. Use π = 3.14."
-    answer = str(area)
-    
-    steps = [
-        f"🎯 **Finding circle area:** Use the formula Area = π × r².",
-        f"**Step 1: Identify the formula:** Area = π × radius²",
-        f"**Step 2: Substitute the values:** Area = 3.14 × {radius}²",
-        f"**Step 3: Calculate the square:** {radius}² = {radius * radius}",
-        f"**Step 4: Multiply by π:** 3.14 × {radius * radius} = **{area}**",
-        f"✨ **Final Answer:** {area} square units"
-    ]
-    
-    hints = [
-        f"💡 **Use the circle area formula!** Area = π × radius²",
-        f"💡 **Square the radius first!** {radius}² = {radius * radius}",
-        f"💡 **Then multiply by π (3.14)!** 3.14 × {radius * radius}"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Area:"
-
-
-def gen_geometry():
-    """Pick a random geometry problem type."""
-    generators = [
-        gen_rectangle_area,
-        gen_triangle_area,
-        gen_perimeter,
-        gen_circle_area
-    ]
-    return random.choice(generators)()
-
-
-# ============================================================================
-# PERCENTAGE PROBLEM GENERATORS
-# ============================================================================
-
-def gen_basic_percentage():
-    """Generate a basic percentage calculation problem."""
-    whole = random.randint(20, 200)
-    percentage = random.randint(5, 95)
-    
-    # Ensure percentage is a nice number (multiple of 5)
-    percentage = (percentage // 5) * 5
-    
-    result = whole * percentage / 100
-    
-    problem = f"What is **{percentage}%** of **{whole}**?"
-    answer = str(int(result)) if result.is_integer() else str(result)
-    
-    steps = [
-        f"🎯 **Finding a percentage:** Convert the percentage to a decimal, then multiply.",
-        f"**Step 1: Convert {percentage}% to a decimal:** {percentage}% = {percentage/100}",
-        f"**Step 2: Multiply by the whole amount:** {percentage/100} × {whole} = **{result}**",
-        f"✨ **Final Answer:** {answer}"
-    ]
-    
-    hints = [
-        f"💡 **Convert to decimal first!** {percentage}% means {percentage} out of 100, or {percentage/100}.",
-        f"💡 **Use the formula:** Percentage of a number = (percentage/100) × number",
-        f"💡 **Calculate:** {percentage/100} × {whole} = ?"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Percentage:"
-
-
-def gen_percentage_increase():
-    """Generate a percentage increase problem."""
-    original = random.randint(20, 200)
-    percentage = random.randint(5, 100)
-    
-    # Ensure percentage is a nice number (multiple of 5)
-    percentage = (percentage // 5) * 5
-    
-    increase = original * percentage / 100
-    new_value = original + increase
-    
-    problem = f"A value of **{original}** increases by **{percentage}%**. What is the new value?"
-    answer = str(int(new_value)) if new_value.is_integer() else str(new_value)
-    
-    steps = [
-        f"🎯 **Percentage increase:** Find the increase, then add to original.",
-        f"**Step 1: Calculate the increase:** {percentage}% of {original} = {percentage/100} × {original} = {increase}",
-        f"**Step 2: Add the increase to the original:** {original} + {increase} = **{new_value}**",
-        f"✨ **Final Answer:** {answer}"
-    ]
-    
-    hints = [
-        f"💡 **First find the amount of increase!** {percentage}% of {original}",
-        f"💡 **Then add to the original value!** Original + Increase = New Value",
-        f"💡 **Calculate:** {original} + ({percentage/100} × {original}) = ?"
-    ]
-    
-    return problem, answer, steps, hints, "Find the New Value:"
-
-
-def gen_percentage_decrease():
-    """Generate a percentage decrease problem."""
-    original = random.randint(50, 500)
-    percentage = random.randint(5, 75)
-    
-    # Ensure percentage is a nice number (multiple of 5)
-    percentage = (percentage // 5) * 5
-    
-    decrease = original * percentage / 100
-    new_value = original - decrease
-    
-    problem = f"A price of **${original}** is discounted by **{percentage}%**. What is the sale price?"
-    answer = str(int(new_value)) if new_value.is_integer() else str(new_value)
-    
-    steps = [
-        f"🎯 **Percentage decrease:** Find the discount, then subtract from original.",
-        f"**Step 1: Calculate the discount:** {percentage}% of ${original} = {percentage/100} × ${original} = ${decrease}",
-        f"**Step 2: Subtract the discount from the original:** ${original} - ${decrease} = **${new_value}**",
-        f"✨ **Final Answer:** ${answer}"
-    ]
-    
-    hints = [
-        f"💡 **First find the amount of discount!** {percentage}% of ${original}",
-        f"💡 **Then subtract from the original price!** Original - Discount = Sale Price",
-        f"💡 **Calculate:** ${original} - ({percentage/100} × ${original}) = ?"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Sale Price:"
-
-
-def gen_find_percentage():
-    """Generate a problem to find what percentage one number is of another."""
-    whole = random.randint(20, 100)
-    
-    # Create a percentage that will result in a clean number
-    percentage = random.randint(5, 95)
-    percentage = (percentage // 5) * 5
-    
-    part = whole * percentage / 100
-    
-    # Ensure part is an integer for simplicity
-    part = int(part)
-    
-    problem = f"**{part}** is what percentage of **{whole}**?"
-    answer = str(percentage)
-    
-    steps = [
-        f"🎯 **Finding the percentage:** Divide the part by the whole, then multiply by 100.",
-        f"**Step 1: Set up the equation:** Percentage = (Part ÷ Whole) × 100%",
-        f"**Step 2: Calculate:** ({part} ÷ {whole}) × 100% = {part/whole:.4f} × 100% = **{percentage}%**",
-        f"✨ **Final Answer:** {percentage}%"
-    ]
-    
-    hints = [
-        f"💡 **Use the formula:** Percentage = (Part ÷ Whole) × 100%",
-        f"💡 **Divide first!** {part} ÷ {whole} = {part/whole:.4f}",
-        f"💡 **Then convert to percentage!** {part/whole:.4f} × 100% = {percentage}%"
-    ]
-    
-    return problem, answer, steps, hints, "Find the Percentage:"
-
-
-def gen_percent_decimal_fraction():
-    """Generate conversion problems between percent, decimal, and fraction."""
-
-    conversion_type = random.choice(['percent_to_decimal', 'decimal_to_percent', 'percent_to_fraction', 'fraction_to_percent'])
-
-    if conversion_type == 'percent_to_decimal':
-        percentage = random.choice([25, 50, 75, 20, 40, 60, 80, 10, 30, 70, 90])
-        decimal = percentage / 100
-
-        problem = f"Convert **{percentage}%** to a decimal."
-        answer = str(decimal)
-
-        steps = [
-            f"🎯 **Percent to Decimal:** Divide by 100 (or move decimal point 2 places left).",
-            f"**Step 1: Divide by 100:** {percentage}% = {percentage} ÷ 100",
-            f"**Step 2: Calculate:** {percentage} ÷ 100 = **{decimal}**",
-            f"✨ **Final Answer:** {decimal}"
-        ]
-
-        hints = [
-            f"💡 **Think: Percent means 'per 100'!** So {percentage}% = {percentage}/100",
-            f"💡 **Shortcut:** Move the decimal point 2 places to the LEFT!",
-            f"💡 **Answer:** {percentage}% = {decimal}"
-        ]
-
-    elif conversion_type == 'decimal_to_percent':
-        decimals = [0.25, 0.5, 0.75, 0.2, 0.4, 0.6, 0.8, 0.1, 0.3, 0.7, 0.9]
-        decimal = random.choice(decimals)
-        percentage = int(decimal * 100)
-
-        problem = f"Convert **{decimal}** to a percent."
-        answer = f"{percentage}"
-
-        steps = [
-            f"🎯 **Decimal to Percent:** Multiply by 100 (or move decimal point 2 places right).",
-            f"**Step 1: Multiply by 100:** {decimal} × 100",
-            f"**Step 2: Calculate:** {decimal} × 100 = {percentage}",
-            f"**Step 3: Add percent sign:** **{percentage}%**",
-            f"✨ **Final Answer:** {percentage}%"
-        ]
-
-        hints = [
-            f"💡 **Move the decimal point 2 places to the RIGHT!** Then add %",
-            f"💡 **Or multiply by 100:** {decimal} × 100 = {percentage}",
-            f"💡 **Answer:** {decimal} = {percentage}%"
-        ]
-
-    elif conversion_type == 'percent_to_fraction':
-        percentages = [25, 50, 75, 20, 40, 60, 80, 10, 30, 70, 90]
-        percentage = random.choice(percentages)
-        fraction = Fraction(percentage, 100)
-
-        problem = f"Convert **{percentage}%** to a simplified fraction."
-        answer = str(fraction)
-
-        steps = [
-            f"🎯 **Percent to Fraction:** Write as a fraction over 100, then simplify.",
-            f"**Step 1: Write as fraction:** {percentage}% = {percentage}/100",
-            f"**Step 2: Simplify:** {percentage}/100 = **{fraction}**",
-            f"✨ **Final Answer:** {fraction}"
-        ]
-
-        hints = [
-            f"💡 **Percent means 'out of 100'!** So {percentage}% = {percentage}/100",
-            f"💡 **Now simplify the fraction!** Find the GCD and reduce.",
-            f"💡 **Answer:** {percentage}/100 = {fraction}"
-        ]
-
-    else:  # fraction_to_percent
-        fractions = [
-            (Fraction(1, 4), "1/4"),
-            (Fraction(1, 2), "1/2"),
-            (Fraction(3, 4), "3/4"),
-            (Fraction(1, 5), "1/5"),
-            (Fraction(2, 5), "2/5"),
-            (Fraction(3, 5), "3/5"),
-            (Fraction(4, 5), "4/5")
-        ]
-        fraction, fraction_str = random.choice(fractions)
-        percentage = int(fraction * 100)
-
-        problem = f"Convert **{fraction_str}** to a percent."
-        answer = str(percentage)
-
-        steps = [
-            f"🎯 **Fraction to Percent:** Convert to decimal, then multiply by 100.",
-            f"**Step 1: Divide:** {fraction_str} = {fraction.numerator} ÷ {fraction.denominator} = {float(fraction)}",
-            f"**Step 2: Multiply by 100:** {float(fraction)} × 100 = {percentage}",
-            f"**Step 3: Add percent sign:** **{percentage}%**",
-            f"✨ **Final Answer:** {percentage}%"
-        ]
-
-        hints = [
-            f"💡 **First convert to decimal!** {fraction_str} = {fraction.numerator} ÷ {fraction.denominator}",
-            f"💡 **Then multiply by 100:** {float(fraction)} × 100 = {percentage}",
-            f"💡 **Answer:** {fraction_str} = {percentage}%"
-        ]
-
-    return problem, answer, steps, hints, "Convert:"
-
-
-def gen_percent_as_proportion():
-    """Generate problems expressing percent problems as proportions."""
-
-    whole = random.randint(20, 100)
-    percentage = random.choice([10, 20, 25, 30, 40, 50, 60, 75, 80])
-    part = int(whole * percentage / 100)
-
-    problem = f"**{part}** is **{percentage}%** of what number? (Set up and solve as a proportion: part/whole = percent/100)"
-
-    answer = str(whole)
-
-    steps = [
-        f"🎯 **Percent as Proportion:** part/whole = percent/100",
-        f"**Step 1: Set up proportion:** {part}/x = {percentage}/100",
-        f"**Step 2: Cross-multiply:** {percentage} × x = {part} × 100",
-        f"**Step 3: Calculate right side:** {part} × 100 = {part * 100}",
-        f"**Step 4: Solve for x:** x = {part * 100}/{percentage} = **{whole}**",
-        f"✨ **Final Answer:** {whole}"
-    ]
-
-    hints = [
-        f"💡 **Use the proportion formula!** part/whole = percent/100",
-        f"💡 **We know the part ({part}) and percent ({percentage}), find the whole!**",
-        f"💡 **Cross-multiply:** {percentage} × x = {part} × 100, so x = {part * 100} ÷ {percentage} = {whole}"
-    ]
-
-    return problem, answer, steps, hints, "Solve the Proportion:"
-
-
-def gen_percent_of_change():
-    """Generate percent of change problems (general formula)."""
-
-    change_type = random.choice(['increase', 'decrease'])
-
-    if change_type == 'increase':
-        original = random.randint(40, 200)
-        change = random.randint(10, 50)
-        new_value = original + change
-
-        problem = f"A value increases from **{original}** to **{new_value}**. What is the **percent of change**?"
-
-    else:  # decrease
-        original = random.randint(60, 200)
-        change = random.randint(10, 50)
-        new_value = original - change
-
-        problem = f"A value decreases from **{original}** to **{new_value}**. What is the **percent of change**?"
-
-    percent_change = round((change / original) * 100, 1)
-    answer = str(percent_change) if percent_change % 1 != 0 else str(int(percent_change))
-
-    steps = [
-        f"🎯 **Percent of Change Formula:** (Change ÷ Original) × 100%",
-        f"**Step 1: Find the amount of change:** |{new_value} - {original}| = {change}",
-        f"**Step 2: Divide by original:** {change} ÷ {original} = {change/original:.4f}",
-        f"**Step 3: Convert to percent:** {change/original:.4f} × 100% = **{percent_change}%**",
-        f"✨ **Final Answer:** {percent_change}% {change_type}"
-    ]
-
-    hints = [
-        f"💡 **First find the change!** New value - Original value = {new_value} - {original} = {change}",
-        f"💡 **Use the formula:** (Change ÷ Original) × 100%",
-        f"💡 **Calculate:** ({change} ÷ {original}) × 100% = {percent_change}%"
-    ]
-
-    return problem, answer, steps, hints, "Find Percent of Change:"
-
-
-def gen_percentage():
-    """Pick a random percentage problem type."""
-    generators = [
-        gen_basic_percentage,
-        gen_percentage_increase,
-        gen_percentage_decrease,
-        gen_find_percentage,
-        gen_percent_decimal_fraction,
-        gen_percent_as_proportion,
-        gen_percent_of_change
-    ]
-    return random.choice(generators)()
-
-
-# ============================================================================
-# CACHED RESOURCES
-# ============================================================================
-
-@st.cache_resource
-def get_generator_sets():
-    """Caches the list of generator functions (a static resource)."""
-    return {
-        'simplify': [
-            gen_distribute_combine, 
-            gen_distribute_negative,
-            gen_multi_distribute,
-            gen_fraction_simplify,
-            gen_multi_variable_combine,
-            gen_fraction_simplify_mixed
-        ],
-        'equations': [
-            gen_linear_eq, 
-            gen_distribute_eq, 
-            gen_fraction_eq
-        ],
-        # NEW RATES CATEGORY
-        'rates': [
-            gen_unit_rate
-        ],
-        # NEW PERCENTAGES CATEGORY
-        'percentages': [
-            gen_percentage
-        ],
-        # NEW GEOMETRY CATEGORY
-        'geometry': [
-            gen_geometry
-        ]
-    }
-
-def generate_new_problem(problem_type):
-    """Generate a new problem based on type."""
-    generator_sets = get_generator_sets()
-
-    # ALGEBRAIC EXPRESSIONS
-    if problem_type == 'simplify':
-        generators = generator_sets['simplify']
-        expr, answer, steps, hints = random.choice(generators)()
-        return expr, answer, steps, hints, "Simplify:"
-
-    # EQUATIONS
-    elif problem_type == 'equations':
-        generators = generator_sets['equations']
-        expr, answer, steps, hints = random.choice(generators)()
-        return expr, answer, steps, hints, "Solve for x:"
-
-    # SPECIFIC RATIO/RATE PROBLEM TYPES
-    elif problem_type == 'unit_rate_basic':
-        return gen_unit_rate_basic()
-    elif problem_type == 'equivalent_ratios':
-        return gen_equivalent_ratios()
-    elif problem_type == 'proportions':
-        return gen_solving_proportions()
-    elif problem_type == 'constant_k':
-        return gen_constant_proportionality()
-    elif problem_type == 'prop_graphs':
-        return gen_proportional_graph()
-    elif problem_type == 'ratio_fractions':
-        return gen_ratio_fractions()
-
-    # SPECIFIC PERCENTAGE PROBLEM TYPES
-    elif problem_type == 'basic_percent':
-        return gen_basic_percentage()
-    elif problem_type == 'percent_change_basic':
-        # Random choice between increase and decrease
-        return random.choice([gen_percentage_increase, gen_percentage_decrease])()
-    elif problem_type == 'percent_conversions':
-        return gen_percent_decimal_fraction()
-    elif problem_type == 'percent_proportion':
-        return gen_percent_as_proportion()
-    elif problem_type == 'percent_of_change':
-        return gen_percent_of_change()
-
-    # GEOMETRY
-    elif problem_type == 'geometry':
-        generators = generator_sets['geometry']
-        result = random.choice(generators)()
-        return result
-
-    # LEGACY CATCH-ALL TYPES (for backward compatibility)
-    elif problem_type == 'rates':
-        generators = generator_sets['rates']
-        result = random.choice(generators)()
-        if len(result) == 5:
-            return result
-        else:
-            expr, answer, steps, hints = result
-            return expr, answer, steps, hints, "Find the Unit Rate:"
-    elif problem_type == 'percentages':
-        generators = generator_sets['percentages']
-        result = random.choice(generators)()
-        return result
-
+        st.session_state.streak = 0
+        pattern = mistake[0] if mistake else None
+        if review != (problem.problem_type, pattern):
+            st.session_state.reviews.missed(problem.problem_type, pattern)
+        st.session_state.feedback = {
+            'correct': False,
+            'mistake_hint': mistake[1] if mistake else None,
+        }
+    save_progress()
+
+def ensure_problem():
+    """Take a new problem if there isn't one (first run, or a callback cleared it)."""
+    if st.session_state.problem is not None:
+        return
+    mixed = st.session_state.problem_choice == MIXED_PRACTICE
+    # A due review of a missed skill goes first (any topic in Mixed Practice)
+    review = st.session_state.reviews.pop_due(None if mixed else st.session_state.problem_type)
+    st.session_state.review = review
+    if review is not None:
+        st.session_state.problem = share_text(generate_review_problem(*review, rng=st.session_state.rng))
+        st.session_state.problem_type = review[0]
+    # Otherwise take it from the session's prefetch queue (Mixed Practice picks the type as it serves)
+    elif mixed:
+        st.session_state.problem = share_text(st.session_state.problem_queue.next())
+        st.session_state.problem_type = st.session_state.problem.problem_type
     else:
-        # Default fallback
-        generators = generator_sets['equations']
-        expr, answer, steps, hints = random.choice(generators)()
-        return expr, answer, steps, hints, "Solve for x:"
-
-# ============================================================================
-# ANSWER CHECKING
-# ============================================================================
-
-def check_answer(user_input, correct_answer):
-    """Check if answer is correct. Handles fractions and reordering attempts."""
-    try:
-        # 1. Clean up inputs (remove all spaces)
-        user_input_clean = user_input.replace(" ", "")
-        correct_answer_clean = correct_answer.replace(" ", "")
-        
-        # 2. Direct string comparison (e.g., for equations or simple numerical answers)
-        if user_input_clean == correct_answer_clean:
-            return True
-        
-        # 3. Handle fraction comparison (for numerical answers like x=5/4 or a simplified constant)
-        try:
-            user_frac = Fraction(user_input_clean)
-            correct_frac = Fraction(correct_answer_clean)
-            if user_frac == correct_frac:
-                return True
-        except ValueError:
-            pass
-        
-        # 4. Handle term reordering for algebraic expressions
-        def split_and_sort(expression):
-            # Add leading + if missing to ensure consistency
-            if expression and expression[0] not in '+-':
-                expression = '+' + expression
-            # Find all terms with their signs
-            terms = re.findall(r'[+-][^+-]+', expression)
-            return sorted(terms)
-
-        user_parts = split_and_sort(user_input_clean)
-        correct_parts = split_and_sort(correct_answer_clean)
-        
-        if user_parts == correct_parts:
-            return True
-
-        return False
+        st.session_state.problem = share_text(st.session_state.problem_queue.next(st.session_state.problem_type))
+    st.session_state.show_hint = False
+    st.session_state.show_steps = False
+    st.session_state.answered = False
+    st.session_state.hint_level = 0
+    st.session_state.feedback = None
+    log_event('show', st.session_state.student_id, st.session_state.problem)
+    save_progress()
 
-    except Exception:
-        return False
 
 # ============================================================================
 # MAIN APP INTERFACE
 # ============================================================================
 
+# Before the sidebar, so its focus rule matches the problem on screen
+ensure_problem()
+
 # Header
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
@@ -1453,101 +356,25 @@ with st.sidebar:
     
     st.header("⚙️ Settings")
     
-    previous_type = st.session_state.problem_type
-
     # EXPANDED PROBLEM CHOICE WITH ALL SPECIFIC CONCEPTS
-    problem_choice = st.radio(
+    # (Mixed Practice picks the type per problem; change_topic resets the problem)
+    st.radio(
         "What do you want to practice?",
-        [
-            "📐 Simplifying Expressions",
-            "🎯 Solving Equations",
-            "➗ Unit Rates (Basic)",
-            "🔢 Equivalent Ratios",
-            "📊 Proportions & Cross-Multiplication",
-            "⚡ Constant of Proportionality",
-            "📈 Proportional Graphs",
-            "🍰 Ratio Scaling with Fractions",
-            "💯 Basic Percentages",
-            "📈 Percent Increase/Decrease",
-            "🔄 Percent-Decimal-Fraction Conversions",
-            "⚖️ Percent as Proportion",
-            "📉 Percent of Change",
-            "📏 Geometry (Area & Perimeter)",
-            "🎲 Mixed Practice (All Topics)"
-        ],
-        key="problem_choice"
+        menu_labels(),
+        key="problem_choice",
+        on_change=change_topic
     )
-
-    # Set problem type based on selection
-    if problem_choice == "📐 Simplifying Expressions":
-        st.session_state.problem_type = 'simplify'
-    elif problem_choice == "🎯 Solving Equations":
-        st.session_state.problem_type = 'equations'
-    elif problem_choice == "➗ Unit Rates (Basic)":
-        st.session_state.problem_type = 'unit_rate_basic'
-    elif problem_choice == "🔢 Equivalent Ratios":
-        st.session_state.problem_type = 'equivalent_ratios'
-    elif problem_choice == "📊 Proportions & Cross-Multiplication":
-        st.session_state.problem_type = 'proportions'
-    elif problem_choice == "⚡ Constant of Proportionality":
-        st.session_state.problem_type = 'constant_k'
-    elif problem_choice == "📈 Proportional Graphs":
-        st.session_state.problem_type = 'prop_graphs'
-    elif problem_choice == "🍰 Ratio Scaling with Fractions":
-        st.session_state.problem_type = 'ratio_fractions'
-    elif problem_choice == "💯 Basic Percentages":
-        st.session_state.problem_type = 'basic_percent'
-    elif problem_choice == "📈 Percent Increase/Decrease":
-        st.session_state.problem_type = 'percent_change_basic'
-    elif problem_choice == "🔄 Percent-Decimal-Fraction Conversions":
-        st.session_state.problem_type = 'percent_conversions'
-    elif problem_choice == "⚖️ Percent as Proportion":
-        st.session_state.problem_type = 'percent_proportion'
-    elif problem_choice == "📉 Percent of Change":
-        st.session_state.problem_type = 'percent_of_change'
-    elif problem_choice == "📏 Geometry (Area & Perimeter)":
-        st.session_state.problem_type = 'geometry'
-
-    # If problem type changed, reset problem
-    if problem_choice != "🎲 Mixed Practice (All Topics)" and previous_type != st.session_state.problem_type:
-        st.session_state.current_problem = None
-        st.rerun()
     
     st.divider()
     
     # GOLDEN RULE REMINDER
-    current_rule = ""
-    if st.session_state.problem_type == 'simplify':
-        current_rule = "Match up the X's with the X's, and the numbers with the numbers! 🍎=🍎"
-    elif st.session_state.problem_type == 'equations':
-        current_rule = "Golden Rule: What you do to one side, you MUST do to the other! ⚖️"
-    elif st.session_state.problem_type in ['unit_rate_basic', 'rates']:
-        current_rule = "Unit Rate: Always divide to find the cost or amount for ONE unit! 💲/1"
-    elif st.session_state.problem_type == 'equivalent_ratios':
-        current_rule = "Equivalent Ratios: Find the multiplier! If 3 becomes 9 (×3), then 4 becomes 12 (×3)! 🔢"
-    elif st.session_state.problem_type == 'proportions':
-        current_rule = "Cross-Multiply: a/b = c/d means a×d = b×c! Make an X! ✖️"
-    elif st.session_state.problem_type in ['constant_k', 'prop_graphs']:
-        current_rule = "Proportional Relationships: k = y/x is always the same! Find the pattern! 📊"
-    elif st.session_state.problem_type == 'ratio_fractions':
-        current_rule = "Scaling Ratios: Multiply by the fraction! 1/2 of 6 = 6 × 1/2 = 3! 🍰"
-    elif st.session_state.problem_type in ['basic_percent', 'percentages']:
-        current_rule = "Percentage: Part/Whole × 100% = Percentage! 🧩/🧩🧩🧩 × 100% = 25%"
-    elif st.session_state.problem_type == 'percent_change_basic':
-        current_rule = "Percent Change: Find the change amount, then divide by original! 📈📉"
-    elif st.session_state.problem_type == 'percent_conversions':
-        current_rule = "Converting: Percent ↔ Decimal ↔ Fraction. Move decimal 2 places! 🔄"
-    elif st.session_state.problem_type == 'percent_proportion':
-        current_rule = "Percent Proportion: part/whole = percent/100. Cross-multiply to solve! ⚖️"
-    elif st.session_state.problem_type == 'percent_of_change':
-        current_rule = "Percent of Change: (Change ÷ Original) × 100% 📊"
-    elif st.session_state.problem_type == 'geometry':
-        current_rule = "Geometry: Know your formulas! Area of rectangle = Length × Width 📏"
-    else:
-        current_rule = "Take your time and break it into steps! You've got this! 💪"
+    current_rule = focus_rule(st.session_state.problem_type)
 
     st.info(f"🧠 **Today's Focus:** {current_rule}", icon="⭐")
 
+    if st.session_state.no_repeat.nearly_exhausted(st.session_state.problem_type):
+        st.caption("🌟 You've seen almost every problem in this topic! Try another topic for brand new ones.")
+
     st.markdown("""
     ### 💡 Tips for Success
     - Take breaks when you need them
@@ -1556,142 +383,110 @@ with st.sidebar:
     - Practice makes progress!
     """)
 
-# Main content area
-# Logic to generate a new problem if one isn't loaded or if 'New Problem' is clicked
-if st.session_state.current_problem is None:
-    # Handle mixed practice randomization on first load or manual reload
-    if st.session_state.problem_choice == "🎲 Mixed Practice (All Topics)":
-        all_types = [
-            'simplify', 'equations', 'unit_rate_basic', 'equivalent_ratios',
-            'proportions', 'constant_k', 'prop_graphs', 'ratio_fractions',
-            'basic_percent', 'percent_change_basic', 'percent_conversions',
-            'percent_proportion', 'percent_of_change', 'geometry'
-        ]
-        st.session_state.problem_type = random.choice(all_types)
-
-    st.session_state.current_problem, st.session_state.current_answer, st.session_state.current_steps, st.session_state.hints, st.session_state.problem_label = generate_new_problem(st.session_state.problem_type)
-    st.session_state.show_hint = False
-    st.session_state.show_steps = False
-    st.session_state.answered = False
-    st.session_state.hint_level = 0
-    # NO st.rerun() needed here.
-
-if st.button("🔄 New Problem", type="primary", use_container_width=True):
-    # For mixed practice, randomize the type on new problem button click
-    if st.session_state.problem_choice == "🎲 Mixed Practice (All Topics)":
-        all_types = [
-            'simplify', 'equations', 'unit_rate_basic', 'equivalent_ratios',
-            'proportions', 'constant_k', 'prop_graphs', 'ratio_fractions',
-            'basic_percent', 'percent_change_basic', 'percent_conversions',
-            'percent_proportion', 'percent_of_change', 'geometry'
-        ]
-        st.session_state.problem_type = random.choice(all_types)
-
-    st.session_state.current_problem = None # Triggers the logic above to generate
-    st.rerun()
+# ============================================================================
+# PROBLEM PANEL
+# ============================================================================
+# The problem, answer form, hints, steps and feedback are one fragment: its
+# buttons rerun just this function, not the header and sidebar. When a
+# click changes what the sidebar shows (score and streak after a submit,
+# the topic when Mixed Practice moves on), the panel asks for one full run
+# instead, before drawing anything.
+
+@st.fragment
+def problem_panel():
+    previous_type = st.session_state.problem_type
+    ensure_problem()
+    if st.session_state.pop('sidebar_stale', False) or st.session_state.problem_type != previous_type:
+        st.rerun(scope="app")
 
+    st.button("🔄 New Problem", type="primary", use_container_width=True, on_click=new_problem)
 
-# Display problem
-st.markdown("---")
-col1, col2, col3 = st.columns([1, 8, 1])
-with col2:
-    # SIMPLIFIED PROBLEM DISPLAY
-    st.markdown(f"## {st.session_state.problem_label} **`{st.session_state.current_problem}`**")
+    # Display problem
+    st.markdown("---")
+    col1, col2, col3 = st.columns([1, 8, 1])
+    with col2:
+        # SIMPLIFIED PROBLEM DISPLAY
+        if st.session_state.review is not None:
+            st.caption("🔁 Review time! You missed one like this earlier. Let's try it again.")
+        st.markdown(f"## {st.session_state.problem.label} **`{st.session_state.problem.expr}`**")
 
-st.markdown("---")
+    st.markdown("---")
 
-# Answer input
-if not st.session_state.answered:
-    
-    # Use a form for the input and the SUBMIT button only
-    with st.form("math_quiz_form", clear_on_submit=True):
-        col1, col2 = st.columns([3, 1])
+    # Answer input
+    if not st.session_state.answered:
+
+        # Use a form for the input and the SUBMIT button only
+        with st.form("math_quiz_form", clear_on_submit=True):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.text_input(
+                    "Type your answer here, then click Submit:", # Simplified label
+                    key="temp_answer_input", 
+                    placeholder="Example: 2x+5 or 3/4 or 15", # Updated placeholder
+                    help="Write your answer. For fractions, use / (like 3/4). For rate problems, just the number is fine."
+                )
+            with col2:
+                st.write("")
+                st.write("")
+                st.form_submit_button("✅ Submit", type="primary", use_container_width=True, on_click=submit_answer)
+
+        # Hint/Skip buttons are OUTSIDE the form
+        col1, col2, col3 = st.columns(3)
         with col1:
-            user_answer = st.text_input(
-                "Type your answer here, then click Submit:", # Simplified label
-                key="temp_answer_input", 
-                placeholder="Example: 2x+5 or 3/4 or 15", # Updated placeholder
-                help="Write your answer. For fractions, use / (like 3/4). For rate problems, just the number is fine."
-            )
+            st.button("💡 Get a Hint", use_container_width=True, on_click=next_hint)
         with col2:
-            st.write("")
-            st.write("")
-            submit = st.form_submit_button("✅ Submit", type="primary", use_container_width=True)
-            
-    # Hint/Skip buttons are OUTSIDE the form
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        if st.button("💡 Get a Hint", use_container_width=True):
-            st.session_state.show_hint = True
-            if st.session_state.hint_level < len(st.session_state.hints):
-                st.session_state.hint_level += 1
-            st.rerun() 
-    with col2:
-        if st.button("📝 Show All Steps", use_container_width=True):
-            st.session_state.show_steps = True
-            st.rerun() 
-    with col3:
-        if st.button("⏭️ Skip Problem", use_container_width=True):
-            st.session_state.current_problem = None
-            st.rerun() 
-    
-    # Show hint if requested
-    if st.session_state.show_hint and st.session_state.hint_level > 0:
-        hint_index = min(st.session_state.hint_level - 1, len(st.session_state.hints) - 1)
-        st.markdown(f"""
-        <div class='hint-box'>
-        {st.session_state.hints[hint_index]}
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Show steps if requested (Enhanced Visual Cue)
-    if st.session_state.show_steps:
-        st.markdown("### 📖 Solution Steps:")
-        for i, step in enumerate(st.session_state.current_steps):
-            st.markdown(f"<div class='step-box'>**Step {i+1}:** {step}</div>", unsafe_allow_html=True)
+            st.button("📝 Show All Steps", use_container_width=True, on_click=show_all_steps)
+        with col3:
+            st.button("⏭️ Skip Problem", use_container_width=True, on_click=new_problem)
 
+        # Show hint if requested
+        if st.session_state.show_hint and st.session_state.hint_level > 0:
+            hint_index = min(st.session_state.hint_level - 1, st.session_state.problem.text.hint_count - 1)
+            st.markdown(f"""
+            <div class='hint-box'>
+            {st.session_state.problem.text.hint(hint_index)}
+            </div>
+            """, unsafe_allow_html=True)
 
-    # Check answer only if the form was submitted and there is an answer
-    if submit and user_answer:
-        if check_answer(user_answer, st.session_state.current_answer):
-            # Correct!
-            st.session_state.score += 1
-            st.session_state.total_questions += 1
-            st.session_state.streak += 1
-            st.session_state.answered = True
-            
-            celebrations = ["Awesome!", "Perfect!", "You got it!", "Excellent!", "Nailed it!", "Outstanding!", "Amazing!"]
-            
+        # Show steps if requested (Enhanced Visual Cue)
+        if st.session_state.show_steps:
+            st.markdown("### 📖 Solution Steps:")
+            for i, step in enumerate(st.session_state.problem.text.steps()):
+                st.markdown(f"<div class='step-box'>**Step {i+1}:** {step}</div>", unsafe_allow_html=True)
+
+    # If answered, show how it went (submit_answer saved it) and the next button
+    if st.session_state.answered:
+        feedback = st.session_state.feedback
+        if feedback and feedback['correct']:
             st.markdown(f"""
             <div class='success-box'>
             <div class='big-emoji'>🎉</div>
-            <h2 style='text-align: center; color: #28a745;'>{random.choice(celebrations)}</h2>
+            <h2 style='text-align: center; color: #28a745;'>{feedback['message']}</h2>
             </div>
             """, unsafe_allow_html=True)
-            
-            if st.session_state.streak >= 3:
-                st.balloons()
-                st.markdown(f"<h3 style='text-align: center;'>🔥🔥🔥 {st.session_state.streak} IN A ROW! YOU'RE ON FIRE! 🔥🔥🔥</h3>", unsafe_allow_html=True)
-            st.rerun() 
-            
-        else:
-            # Incorrect
-            st.session_state.total_questions += 1
-            st.session_state.streak = 0
-            st.session_state.answered = True
-            
-            st.error(f"Not quite! The correct answer is: **{st.session_state.current_answer}**")
-            
+
+            if feedback['streak'] >= 3:
+                if feedback['balloons']:
+                    # Only on the run right after the submit, not on later reruns
+                    st.balloons()
+                    feedback['balloons'] = False
+                st.markdown(f"<h3 style='text-align: center;'>🔥🔥🔥 {feedback['streak']} IN A ROW! YOU'RE ON FIRE! 🔥🔥🔥</h3>", unsafe_allow_html=True)
+
+        elif feedback:
+            st.error(f"Not quite! The correct answer is: **{st.session_state.problem.answer}**")
+
+            # A predictable slip gets a hint aimed at that exact mistake
+            if feedback['mistake_hint']:
+                st.warning(feedback['mistake_hint'])
+
             st.markdown("### 📖 Here's how to solve it:")
-            for i, step in enumerate(st.session_state.current_steps):
+            for i, step in enumerate(st.session_state.problem.text.steps()):
                 st.markdown(f"<div class='step-box'>**Step {i+1}:** {step}</div>", unsafe_allow_html=True)
-            
+
             st.info("💪 Don't worry! Making mistakes is how we learn. Try another one!")
-            st.rerun()
 
-# If answered, show next button
-if st.session_state.answered:
-    st.markdown("---")
-    if st.button("➡️ Next Problem", type="primary", use_container_width=True):
-        st.session_state.current_problem = None 
-        st.rerun()
+        st.markdown("---")
+        st.button("➡️ Next Problem", type="primary", use_container_width=True, on_click=new_problem)
+
+
+problem_panel()
@@ -0,0 +1,20 @@
+import pytest
+
+from math_core.generators import generate_new_problem
+from math_core.rng import new_seed, session_rng
+
+batch = pytest.importorskip('math_core.batch')
+
+
+def _rendered(problem):
+    return (problem.problem_type, problem.seed, problem.expr, problem.answer, problem.label,
+            problem.text.steps(), problem.text.hints())
+
+
+@pytest.mark.parametrize('problem_type', batch.BATCH_TYPES)
+def test_batch_matches_generate_new_problem(problem_type):
+    rng = session_rng(11)
+    seeds = [new_seed(rng) for _ in range(3000)] + [0, 1, 2 ** 64 - 1]
+    made = batch.batch_problems(problem_type, seeds)
+    assert [_rendered(problem) for problem in made] == \
+        [_rendered(generate_new_problem(problem_type, seed=seed)) for seed in seeds]
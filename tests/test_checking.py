@@ -0,0 +1,64 @@
+from fractions import Fraction
+
+from math_core.checking import AnswerRule, answer_key, check_answer, parse_polynomial, parse_quantity
+from math_core.generators import generate_new_problem
+
+
+def test_answer_key_of_very_long_input_is_none():
+    assert answer_key('9' * 5000) is None
+    assert answer_key('9' * 5000 + 'x') is None
+    assert answer_key('1.' + '9' * 5000) is None
+
+
+def test_very_long_input_is_wrong_and_not_diagnosed():
+    for problem_type in ('proportions', 'geometry', 'simplify', 'equations'):
+        problem = generate_new_problem(problem_type, seed=1)
+        assert problem.diagnose('9' * 5000) is None
+        assert problem.check('9' * 5000) is False
+    assert check_answer('9' * 5000, '12') is False
+
+
+def test_known_mistake_is_still_diagnosed():
+    problem = generate_new_problem('proportions', seed=1)
+    forgot_divide = str(problem.text.params['bc'])
+    assert problem.diagnose(forgot_divide)[0] == 'forgot_divide'
+
+
+def test_percent_sign_only_where_the_answer_is_a_percent():
+    problems = [generate_new_problem('percentages', seed=seed) for seed in range(500)]
+    find_percent = next(p for p in problems if 'is what percentage of' in p.expr)
+    basic = next(p for p in problems if p.expr.startswith('What is **'))
+    assert find_percent.check(find_percent.answer + '%')
+    assert not basic.check(basic.answer + '%')
+    assert basic.check(basic.answer)
+
+
+def test_parse_polynomial_reads_what_generators_print():
+    half = Fraction(1, 2)
+    assert parse_polynomial('2x + 3') == parse_polynomial('3+x*2')
+    assert parse_polynomial('5/4x') == (((('x', 1),), Fraction(5, 4)),)
+    assert parse_polynomial('0.5x - 1/2') == (((), -half), ((('x', 1),), half))
+    assert parse_polynomial('5x^2+8x+3y+5') == parse_polynomial('3y + 5 + 8x + 5X^2')
+    assert parse_polynomial('-x') == (((('x', 1),), -1),)
+    assert parse_polynomial('x - x') == ()
+
+
+def test_parse_polynomial_rejects_what_it_would_have_to_guess():
+    for text in ('x2', '2x3', '--x', '2x+-3', '+-1', '2x+', '^2', 'x^y', '2/x', '1/0', '*2', '', 'x?'):
+        assert parse_polynomial(text) is None, text
+
+
+def test_parse_quantity_reads_numbers_with_units():
+    amount = AnswerRule(variable='x')
+    assert parse_quantity('25%') == (Fraction(25), '%')
+    assert parse_quantity('1 1/2') == (Fraction(3, 2), None)
+    assert parse_quantity('.75') == (Fraction(3, 4), None)
+    assert parse_quantity('$3.50') == (Fraction(7, 2), '$')
+    assert parse_quantity('-5/4') == (Fraction(-5, 4), None)
+    assert parse_quantity('120  Square   Units') == (Fraction(120), 'square units')
+    assert parse_quantity('x = 5/4', amount) == (Fraction(5, 4), None)
+
+
+def test_parse_quantity_rejects_non_numbers():
+    for text in ('5x', 'x = 5', '1/0', '1 1/0', '$3 miles', '3%%', '--3', 'abc', ''):
+        assert parse_quantity(text) is None, text
@@ -0,0 +1,49 @@
+import os
+import time
+
+from math_core.events import EventLog, finalize_leftovers, parse_name
+
+
+def test_log_recovers_when_its_file_is_renamed_away(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.log('show', 'student', None)
+    log.flush()
+    [part] = os.listdir(tmp_path)
+    os.rename(tmp_path / part, tmp_path / 'taken.jsonl')
+
+    log.max_age = 0
+    log.log('show', 'student', None)
+    log.flush()
+    log.max_age = 3600
+    log.log('show', 'student', None)
+    log.flush()
+    log.close()
+
+    assert len(log) == 0
+    names = sorted(os.listdir(tmp_path))
+    assert not [name for name in names if name.endswith('.part')]
+    lines = sum(len((tmp_path / name).read_text().splitlines()) for name in names)
+    assert lines == 3
+
+
+def test_leftovers_finalized_only_when_their_writer_let_go(tmp_path):
+    live = EventLog(str(tmp_path))
+    live.log('show', 'student', None)
+    live.flush()
+    # A crashed writer on another host, with the same pid as the live one
+    left = tmp_path / f"events-20260101-000000-otherhost-{os.getpid()}-1.jsonl.part"
+    left.write_text('{"event":"show"}\n')
+    old = time.time() - 60
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+
+    assert finalize_leftovers(str(tmp_path)) == [str(left)[:-len('.part')]]
+    assert os.path.exists(live._path)
+    live.close()
+
+
+def test_parse_name_reads_old_and_new_names():
+    assert parse_name('events-20260101-000000-web-1-7-3.jsonl') == (
+        '20260101-000000-web-1-7', 3, 1767225600, 'web-1', 7)
+    assert parse_name('events-20260101-000000-7-3.jsonl.part') == (
+        '20260101-000000-7', 3, 1767225600, '', 7)
@@ -0,0 +1,39 @@
+from math_core.generators import generate_new_problem
+from math_core.grading import grade_rows, problem_id
+
+
+def _grade(rows):
+    return list(grade_rows(rows, workers=1))
+
+
+def test_unknown_problem_type_is_an_error():
+    [row] = _grade([{'problem_id': 'nonsense:42', 'answer': '3'}])
+    assert row['correct'] is None
+    assert row['correct_answer'] is None
+    assert 'nonsense' in row['error']
+
+
+def test_numeric_json_answers_are_graded():
+    problem = generate_new_problem('constant_k', seed=7)
+    rows = _grade([
+        {'problem_id': problem_id(problem), 'answer': int(problem.answer)},
+        {'problem_id': problem_id(problem), 'answer': float(problem.answer)},
+        {'problem_id': problem_id(problem), 'answer': int(problem.answer) + 1},
+    ])
+    assert [row['correct'] for row in rows] == [True, True, False]
+    assert [row['error'] for row in rows] == [None, None, None]
+
+
+def test_zero_answer_is_not_blank():
+    # An equation whose solution is x = 0, answered with the JSON number 0
+    seed = next(seed for seed in range(10_000)
+                if generate_new_problem('equations', seed=seed).answer == '0')
+    [row] = _grade([{'problem_type': 'equations', 'seed': seed, 'answer': 0}])
+    assert row['correct'] is True
+
+
+def test_missing_answer_is_wrong_not_an_error():
+    problem = generate_new_problem('proportions', seed=3)
+    [row] = _grade([{'problem_id': problem_id(problem)}])
+    assert row['correct'] is False
+    assert row['error'] is None
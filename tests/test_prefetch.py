@@ -0,0 +1,35 @@
+from math_core import prefetch
+from math_core.adaptive import AdaptiveMix
+from math_core.norepeat import NoRepeat
+from math_core.rng import session_rng
+
+
+def _session(seed, topic=None, count=30):
+    queue = prefetch.ProblemQueue(session_rng(seed), no_repeat=NoRepeat(), sampler=AdaptiveMix())
+    return [queue.next(topic).key for _ in range(count)]
+
+
+def test_seeded_sessions_get_the_same_problems():
+    assert _session(5) == _session(5)
+    assert _session(5, 'prop_graphs') == _session(5, 'prop_graphs')
+
+
+def test_mixed_practice_picks_when_serving():
+    mix = AdaptiveMix()
+    queue = prefetch.ProblemQueue(session_rng(1), sampler=mix)
+    for served in range(1, 6):
+        queue.next()
+        assert mix.picks == served
+
+
+def test_used_up_topic_still_serves():
+    # prop_graphs has only a few distinct problems
+    problems = _session(2, 'prop_graphs', count=40)
+    assert len(problems) == 40
+
+
+def test_mixed_practice_keeps_a_bounded_number_ready():
+    queue = prefetch.ProblemQueue(session_rng(3))
+    for _ in range(100):
+        queue.next()
+        assert len(queue) <= prefetch.MIXED_MAX_PENDING
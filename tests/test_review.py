@@ -0,0 +1,46 @@
+from math_core.generators import generate_review_problem
+from math_core.review import FIRST_INTERVAL, RIGHT, SECOND_INTERVAL, ReviewScheduler
+from math_core.rng import session_rng
+
+
+def test_first_good_review_waits_second_interval():
+    reviews = ReviewScheduler()
+    reviews.missed('simplify', 'sign_not_flipped', now=0)
+    key = reviews.pop_due(now=FIRST_INTERVAL)
+    assert key == ('simplify', 'sign_not_flipped')
+    reviews.answered(key, RIGHT, now=FIRST_INTERVAL)
+    assert reviews.pop_due(now=FIRST_INTERVAL + SECOND_INTERVAL - 1) is None
+    assert reviews.pop_due(now=FIRST_INTERVAL + SECOND_INTERVAL) == key
+
+
+def test_mixed_practice_keeps_type_heaps_bounded():
+    reviews = ReviewScheduler()
+    for problem_type in ('simplify', 'equations', 'geometry'):
+        reviews.missed(problem_type, now=0)
+    now = 0
+    for _ in range(1000):
+        now += FIRST_INTERVAL
+        key = reviews.pop_due(now=now)
+        reviews.skipped(key, now=now)
+    assert sum(len(heap) for heap in reviews._due_by_type.values()) <= 4 * len(reviews) + 16
+
+
+def test_review_problem_can_show_the_same_mistake():
+    rng = session_rng(3)
+    for _ in range(20):
+        problem = generate_review_problem('simplify', 'sign_not_flipped', rng=rng)
+        codes = {code for code, _ in problem.text.mistakes.values()}
+        assert 'sign_not_flipped' in codes
+
+
+def test_review_on_screen_survives_save_and_resume():
+    reviews = ReviewScheduler()
+    reviews.missed('simplify', 'sign_not_flipped', now=0)
+    reviews.missed('equations', now=0)
+    key = reviews.pop_due('simplify', now=FIRST_INTERVAL)
+
+    resumed = ReviewScheduler.from_list(reviews.to_list(), on_screen=key)
+    assert resumed.pop_due('simplify', now=FIRST_INTERVAL) is None
+    assert resumed.pop_due(now=FIRST_INTERVAL) == ('equations', None)
+    resumed.answered(key, RIGHT, now=FIRST_INTERVAL)
+    assert resumed.pop_due(now=FIRST_INTERVAL + SECOND_INTERVAL) == key
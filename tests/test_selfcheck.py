@@ -0,0 +1,25 @@
+from math_core.generators import generate_new_problem
+from math_core.registry import topic_types
+from math_core.selfcheck import add_parser, check_problem, false_claims
+
+
+def test_percent_claims_are_checked():
+    assert false_claims("(28 ÷ 95) × 100% = 0.2947 × 100% = 30%")
+    assert not false_claims("(7 ÷ 20) × 100% = 0.3500 × 100% = 35%")
+    assert not false_claims("10% of 40 = 4")
+
+
+def test_find_percentage_part_is_exact():
+    for seed in range(300):
+        problem = generate_new_problem('percentages', seed=seed)
+        assert check_problem(problem) == []
+
+
+def test_every_registered_type_is_checked_by_default():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    add_parser(parser.add_subparsers())
+    args = parser.parse_args(['selfcheck'])
+    assert set(topic_types()) <= set(args.types)
+    assert {'percentages', 'rates'} <= set(args.types)
@@ -0,0 +1,15 @@
+from math_core.generators import generate_new_problem
+from math_core.textcache import share_text, shared_cache
+
+
+def test_shared_text_renders_like_its_lazy_text_after_eviction():
+    plain = generate_new_problem('proportions', seed=1)
+    shared = share_text(generate_new_problem('proportions', seed=1))
+    assert not hasattr(shared.text, 'params')
+
+    for _ in range(2):
+        assert shared.text.steps() == plain.text.steps()
+        assert shared.text.hints() == plain.text.hints()
+        forgot_divide = str(plain.text.params['bc'])
+        assert shared.diagnose(forgot_divide) == plain.diagnose(forgot_divide)
+        shared_cache().clear()